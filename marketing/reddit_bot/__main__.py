@@ -0,0 +1,107 @@
+"""
+Single entry point for the bot:
+
+    python -m marketing.reddit_bot <command> [options]
+    python -m marketing.reddit_bot scan --subreddit excel --incremental
+    python -m marketing.reddit_bot <command> --help
+
+Only the module behind the chosen command is imported, so each command pays
+for the dependencies it uses (praw, requests, numpy, playwright) and nothing else.
+The old `python -m marketing.reddit_bot.<module>` invocations keep working.
+
+    python -m marketing.reddit_bot startup-bench
+
+times `--help` of every command both ways, as a check on import cost.
+"""
+import runpy
+import subprocess
+import sys
+import time
+
+PACKAGE = __spec__.parent if __spec__ else "marketing.reddit_bot"
+
+# command: (module, description)
+COMMANDS = {
+    "scan": ("monitor_rss", "Scan subreddits via RSS (no login)"),
+    "monitor": ("monitor", "Scan via the Reddit API or answer the inbox (--mode scan|inbox)"),
+    "publish": ("publisher", "Publish a post from a template via the API"),
+    "publish-browser": ("publisher_browser", "Publish a post from a template with a browser"),
+    "report": ("report_tasks", "Send the daily task report to Feishu"),
+    "digest": ("digest", "Send a Feishu digest of recent matches"),
+    "trends": ("trends", "Update keyword trends and alert on spikes"),
+    "daemon": ("daemon", "Run all jobs on an in-process schedule"),
+    "backfill": ("backfill", "Crawl a subreddit's history through the matcher (resumable)"),
+    "bulk": ("bulk_analyze", "Replay an NDJSON post dump through the matcher (offline)"),
+    "export": ("export", "Hit-rate stats over the Parquet scan history (--export)"),
+    "search": ("match_store", "Search stored matches"),
+    "templates": ("template_library", "Validate the content templates"),
+    "profile": ("profiling", "Inspect or diff --profile output"),
+    "bench": ("benchmarks.run", "Offline benchmarks of the scan pipeline"),
+}
+
+# Commands started by cron or by hand; timed by startup-bench
+BENCH_COMMANDS = ["scan", "monitor", "publish", "publish-browser", "report", "digest", "daemon"]
+
+
+def usage():
+    lines = [f"usage: python -m {PACKAGE} <command> [options]", "", "commands:"]
+    for name, (_, description) in COMMANDS.items():
+        lines.append(f"  {name:<16}{description}")
+    lines.append(f"  {'startup-bench':<16}Time command startup (--help) via this entry point vs. the module")
+    return "\n".join(lines)
+
+
+def _time_command(argv, runs):
+    """
+    Returns the median wall time in seconds of running argv in a fresh interpreter.
+    """
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        times.append(time.perf_counter() - started)
+    times.sort()
+    return times[len(times) // 2]
+
+
+def startup_bench(runs=5):
+    """
+    Compares `--help` startup of each command through this dispatcher with the same
+    command run as its own module. Both now import lazily; the figure to watch is the
+    absolute time, which is what every cron run pays before doing any work.
+    """
+    python = sys.executable
+    baseline = _time_command([python, "-c", "pass"], runs)
+    print(f"Bare interpreter: {baseline * 1000:.0f} ms (median of {runs})")
+    print(f"{'command':<12}{'dispatcher ms':>15}{'module ms':>12}")
+    for name in BENCH_COMMANDS:
+        module = COMMANDS[name][0]
+        via_dispatcher = _time_command([python, "-m", PACKAGE, name, "--help"], runs)
+        via_module = _time_command([python, "-m", f"{PACKAGE}.{module}", "--help"], runs)
+        print(f"{name:<12}{via_dispatcher * 1000:>15.0f}{via_module * 1000:>12.0f}")
+    print(f"\nImport time per module: {python} -X importtime -m {PACKAGE}.<module> --help")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return 0
+    command, rest = argv[0], argv[1:]
+    if command == "startup-bench":
+        runs = int(rest[rest.index("--runs") + 1]) if "--runs" in rest else 5
+        startup_bench(runs)
+        return 0
+    if command not in COMMANDS:
+        print(f"Unknown command: {command}\n\n{usage()}", file=sys.stderr)
+        return 2
+
+    module = COMMANDS[command][0]
+    # Run the module exactly as `python -m` would, with its own arguments
+    sys.argv = [sys.argv[0]] + rest
+    runpy.run_module(f"{PACKAGE}.{module}", run_name="__main__", alter_sys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""
+Resumable backfill of a subreddit's history through the keyword matcher.
+
+Pages through a subreddit listing 100 posts at a time, newest first, and stops at
+--since. Each page is matched and scored as one batch, and its results are appended
+to an NDJSON file. The listing cursor is checkpointed after every page, so an
+interrupted crawl resumes where it stopped (run the same command again).
+
+Reddit serves at most ~1000 posts per listing, however far back you page. On an
+active subreddit, /new therefore only reaches back weeks, not months. The crawl
+says so when the listing runs out before --since. Running it again with
+--listing top --time-filter year/all picks up older, popular posts from a
+different ~1000-item window. Matches already written are not repeated.
+
+    python -m marketing.reddit_bot.backfill excel --since 2026-01-01
+    python -m marketing.reddit_bot.backfill excel --since 2026-01-01 --listing top --time-filter year --store
+"""
+import json
+import os
+import time
+from . import config, metrics
+from .match_store import MatchStore, parse_date
+from .matcher import get_matcher, match_fields, unique_keywords
+from .rate_limit import priority
+from .scoring import score_documents, text_length
+from .storage import read_json, write_json
+
+BACKFILL_SUBDIR = "backfill"
+PAGE_SIZE = 100
+# Reddit stops paginating a listing after roughly this many items.
+LISTING_CAP = 1000
+
+
+def _checkpoint_path(subreddit, listing, time_filter):
+    suffix = f"-{time_filter}" if listing != "new" else ""
+    return config.data_path(BACKFILL_SUBDIR, f"{subreddit}-{listing}{suffix}.checkpoint.json")
+
+
+def _drop_partial_line(output_path):
+    """
+    Cuts off a half-written last line left by a crash mid-write.
+    """
+    if not os.path.exists(output_path):
+        return
+    with open(output_path, 'r+b') as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # Scan back to the last complete line
+        pos = size
+        while pos > 0:
+            step = min(4096, pos)
+            f.seek(pos - step)
+            chunk = f.read(step)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                f.truncate(pos - step + newline + 1)
+                return
+            pos -= step
+        f.truncate(0)
+
+
+def _seen_ids(output_path):
+    """
+    Entry IDs already in the output file (from earlier crawls of other listings).
+    """
+    seen = set()
+    if os.path.exists(output_path):
+        with open(output_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    seen.add(json.loads(line)["id"])
+                except (ValueError, KeyError):
+                    continue
+    return seen
+
+
+def match_page(subreddit_name, submissions, matcher):
+    """
+    Matches and scores one page of submissions as a batch.
+    Returns a result dict per submission that hit at least one keyword.
+    """
+    scanned = [
+        (submission, *match_fields(matcher, subreddit_name, submission.title, submission.selftext))
+        for submission in submissions
+    ]
+    scores = score_documents(
+        [(title_hits, body_hits) for _, _, _, title_hits, body_hits in scanned],
+        [(text_length(title_text), text_length(body_text)) for _, title_text, body_text, _, _ in scanned],
+    )
+    results = []
+    for score, (submission, title_text, body_text, title_hits, body_hits) in zip(scores, scanned):
+        if not (title_hits or body_hits):
+            continue
+        results.append({
+            "id": submission.fullname,
+            "subreddit": subreddit_name,
+            "title": submission.title,
+            "link": f"https://www.reddit.com{submission.permalink}",
+            "created_utc": submission.created_utc,
+            "keywords": unique_keywords(title_hits + body_hits),
+            "score": float(score),
+            "text": title_text + " " + body_text,
+        })
+    return results
+
+
+@priority("backlog")
+def backfill(subreddit_name, since=None, until=None, listing="new", time_filter="all", output_path=None,
+             store_matches=False, restart=False, max_pages=None, reddit=None):
+    """
+    Crawls subreddit_name from newest to oldest between since and until (unix timestamps),
+    appending matches to output_path as NDJSON. Resumes from the checkpoint unless restart.
+    Returns the final checkpoint dict.
+    """
+    if reddit is None:
+        from .reddit_client import get_reddit
+        reddit = get_reddit()
+
+    backfill_dir = config.data_path(BACKFILL_SUBDIR)
+    os.makedirs(backfill_dir, exist_ok=True)
+    output_path = output_path or os.path.join(backfill_dir, f"{subreddit_name}.ndjson")
+    checkpoint_path = _checkpoint_path(subreddit_name, listing, time_filter)
+    params = {"since": since, "until": until, "output": os.path.abspath(output_path)}
+
+    checkpoint = None if restart else read_json(checkpoint_path)
+    if checkpoint is not None and checkpoint["params"] != params:
+        print("Checkpoint was written for different options; starting over.")
+        checkpoint = None
+    if checkpoint is not None and checkpoint["done"]:
+        print(f"Backfill of r/{subreddit_name} ({listing}) already finished; use --restart to crawl again.")
+        return checkpoint
+    if checkpoint is None:
+        checkpoint = {"params": params, "after": None, "pages": 0, "scanned": 0, "matched": 0,
+                      "oldest_utc": None, "done": False}
+    else:
+        print(f"Resuming r/{subreddit_name} ({listing}) after page {checkpoint['pages']} "
+              f"({checkpoint['scanned']} posts scanned, {checkpoint['matched']} matched).")
+
+    # The page after the checkpoint is fetched again on resume; matches it already wrote are skipped via seen.
+    _drop_partial_line(output_path)
+    seen = _seen_ids(output_path)
+
+    matcher = get_matcher()
+    path = f"r/{subreddit_name}/{listing}"
+    store = MatchStore() if store_matches else None
+    reached_since = False
+    try:
+        with open(output_path, 'a', encoding='utf-8') as out:
+            while max_pages is None or checkpoint["pages"] < max_pages:
+                request = {"limit": PAGE_SIZE, "raw_json": 1}
+                if checkpoint["after"]:
+                    request["after"] = checkpoint["after"]
+                if listing != "new":
+                    request["t"] = time_filter
+                with metrics.timer("fetch"):
+                    page = reddit.get(path, params=request)
+                submissions = list(page)
+                if not submissions:
+                    break
+
+                in_range = []
+                for submission in submissions:
+                    if until is not None and submission.created_utc >= until:
+                        continue
+                    if since is not None and submission.created_utc < since:
+                        # /new is ordered by time, so everything after this is older still
+                        reached_since = listing == "new"
+                        continue
+                    in_range.append(submission)
+
+                with metrics.timer("match"):
+                    results = [r for r in match_page(subreddit_name, in_range, matcher) if r["id"] not in seen]
+                for result in results:
+                    out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                    seen.add(result["id"])
+                    if store is not None:
+                        store.add("backfill", subreddit_name, result["id"], result["title"], result["link"],
+                                  result["keywords"], result["text"], result["created_utc"], result["score"])
+                out.flush()
+                os.fsync(out.fileno())
+                if store is not None:
+                    store.flush()
+                metrics.incr("entries", len(submissions))
+
+                checkpoint["after"] = page.after
+                checkpoint["pages"] += 1
+                checkpoint["scanned"] += len(submissions)
+                checkpoint["matched"] += len(results)
+                checkpoint["oldest_utc"] = min(s.created_utc for s in submissions)
+                checkpoint["done"] = reached_since or not page.after
+                write_json(checkpoint_path, checkpoint)
+
+                oldest = time.strftime("%Y-%m-%d", time.gmtime(checkpoint["oldest_utc"]))
+                print(f"Page {checkpoint['pages']}: {len(submissions)} posts back to {oldest}, "
+                      f"{len(results)} matches ({checkpoint['matched']} total).")
+                if checkpoint["done"]:
+                    break
+    finally:
+        if store is not None:
+            store.close()
+
+    if checkpoint["done"] and not reached_since and since is not None and listing == "new":
+        oldest = time.strftime("%Y-%m-%d", time.gmtime(checkpoint["oldest_utc"] or time.time()))
+        print(f"Note: Reddit ended the listing at {oldest} after {checkpoint['scanned']} posts "
+              f"(listings stop around {LISTING_CAP}); older posts can't be reached through /new. "
+              f"Try --listing top --time-filter year/all for popular older posts.")
+    print(f"Backfill {'finished' if checkpoint['done'] else 'paused'}: {checkpoint['scanned']} posts scanned, "
+          f"{checkpoint['matched']} matches written to {output_path}.")
+    return checkpoint
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Crawl a subreddit's history through the keyword matcher.")
+    parser.add_argument("subreddit")
+    parser.add_argument("--since", help="Oldest date to crawl back to (YYYY-MM-DD)")
+    parser.add_argument("--until", help="Skip posts from this date on (YYYY-MM-DD)")
+    parser.add_argument("--listing", choices=["new", "top", "controversial"], default="new")
+    parser.add_argument("--time-filter", choices=["hour", "day", "week", "month", "year", "all"], default="all",
+                        help="Time window for top/controversial listings")
+    parser.add_argument("--output", help="NDJSON file for matches (default: data/backfill/<subreddit>.ndjson)")
+    parser.add_argument("--store", action="store_true", help="Also add matches to the match store (search/digest)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and crawl from the newest post")
+    parser.add_argument("--max-pages", type=int, help="Stop after this many pages in total (resume later)")
+    args = parser.parse_args()
+
+    valid, msg = config.validate_config()
+    if not valid:
+        print(f"Error: {msg}")
+        raise SystemExit(1)
+
+    metrics.init("backfill")
+    backfill(args.subreddit,
+             since=parse_date(args.since) if args.since else None,
+             until=parse_date(args.until) if args.until else None,
+             listing=args.listing, time_filter=args.time_filter, output_path=args.output,
+             store_matches=args.store, restart=args.restart, max_pages=args.max_pages)
@@ -0,0 +1,285 @@
+"""
+Offline benchmarks for the scan pipeline.
+
+Runs the parse -> normalize -> match -> score stages of monitor_rss, the listing scan of monitor and
+publisher.parse_template against the recorded documents in fixtures/ and against
+synthetic feeds built from them (no network). Reports time, entries/sec and peak
+memory per stage, and compares throughput with a stored baseline.
+
+    python -m marketing.reddit_bot.benchmarks.run
+    python -m marketing.reddit_bot.benchmarks.run --scales 1000 100000
+    python -m marketing.reddit_bot.benchmarks.run --update-baseline
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+from .. import config
+from ..feed_parser import parse_feed
+from ..matcher import get_matcher, match_fields, normalize_text
+from ..scoring import score_documents, text_length
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+ATOM_FIXTURE = os.path.join(FIXTURES_DIR, "reddit_excel_new.atom")
+LISTING_FIXTURE = os.path.join(FIXTURES_DIR, "reddit_excel_new.json")
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "content_templates")
+
+# Baselines are machine specific, so they live with the other local state.
+BASELINE_NAME = "bench_baseline.json"
+DEFAULT_SCALES = [1000, 10000]
+# A stage is flagged when its throughput drops more than this below the baseline.
+DEFAULT_TOLERANCE = 0.25
+# Small inputs are looped until one timed sample takes at least this long, like timeit does.
+MIN_SAMPLE_SECONDS = 0.05
+STREAM_CHUNK_SIZE = 16 * 1024
+SUBREDDIT = "excel"
+
+
+def synthetic_atom(n):
+    """
+    Builds an Atom document with n entries by repeating the recorded ones with unique IDs.
+    """
+    with open(ATOM_FIXTURE, "rb") as f:
+        doc = f.read()
+    head_end = doc.index(b"<entry>")
+    tail_start = doc.rindex(b"</feed>")
+    entries = doc[head_end:tail_start].split(b"</entry>")[:-1]
+    parts = [doc[:head_end]]
+    for i in range(n):
+        entry = entries[i % len(entries)]
+        parts.append(entry.replace(b"<id>t3_", b"<id>t3_%d_" % i, 1))
+        parts.append(b"</entry>")
+    parts.append(doc[tail_start:])
+    return b"".join(parts)
+
+
+def synthetic_listing(n):
+    """
+    Builds a listing JSON document with n children from the recorded listing.
+    """
+    with open(LISTING_FIXTURE, "r", encoding="utf-8") as f:
+        listing = json.load(f)
+    children = listing["data"]["children"]
+    out = []
+    for i in range(n):
+        child = json.loads(json.dumps(children[i % len(children)]))
+        child["data"]["name"] = f"{child['data']['name']}_{i}"
+        out.append(child)
+    listing["data"]["children"] = out
+    listing["data"]["dist"] = n
+    return json.dumps(listing).encode("utf-8")
+
+
+def chunked(data, size=STREAM_CHUNK_SIZE):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def scan_listing(listing_doc, matcher):
+    """
+    The monitor's path for an API listing: parse the JSON, then normalize and match every post.
+    """
+    listing = json.loads(listing_doc)
+    return [
+        match_fields(matcher, SUBREDDIT, child["data"].get("title", ""), child["data"].get("selftext", ""))
+        for child in listing["data"]["children"]
+    ]
+
+
+def measure(fn, repeat):
+    """
+    Returns (best wall time per call over `repeat` samples, peak traced memory in bytes of one extra call).
+    An untimed first call takes the lazy imports and cache warm-up out of the samples.
+    Memory is traced separately because tracemalloc slows the timed runs down.
+    """
+    fn()
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= MIN_SAMPLE_SECONDS:
+            break
+        loops *= 10
+
+    best = elapsed / loops
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, (time.perf_counter() - started) / loops)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def bench_scale(label, atom_doc, listing_doc, repeat):
+    """
+    Benchmarks every scan stage on one document size. Each stage gets the previous stage's output
+    as prepared input, so the numbers isolate that stage.
+    """
+    matcher = get_matcher()
+    chunks = chunked(atom_doc)
+    entries = parse_feed(chunks)
+    titles = [e.title for e in entries]
+    summaries = [e.summary for e in entries]
+    normalized = [(normalize_text(t), normalize_text(s)) for t, s in zip(titles, summaries)]
+    hits = [
+        (matcher.match_subreddit(SUBREDDIT, t, normalized=True), matcher.match_subreddit(SUBREDDIT, b, normalized=True))
+        for t, b in normalized
+    ]
+    lengths = [(text_length(t), text_length(b)) for t, b in normalized]
+    listing_items = len(json.loads(listing_doc)["data"]["children"])
+
+    # scan_listing runs parse + normalize + match end to end, as monitor.py does for API listings.
+    stages = [
+        ("parse_atom", lambda: parse_feed(chunks)),
+        ("scan_listing", lambda: scan_listing(listing_doc, matcher)),
+        ("normalize", lambda: [(normalize_text(t), normalize_text(s)) for t, s in zip(titles, summaries)]),
+        ("match", lambda: [
+            (matcher.match_subreddit(SUBREDDIT, t, normalized=True), matcher.match_subreddit(SUBREDDIT, b, normalized=True))
+            for t, b in normalized
+        ]),
+        ("score", lambda: score_documents(hits, lengths)),
+    ]
+    results = []
+    for stage, fn in stages:
+        seconds, peak = measure(fn, repeat)
+        items = listing_items if stage == "scan_listing" else len(entries)
+        results.append(result_row(stage, label, items, seconds, peak))
+    return results
+
+
+def bench_templates(repeat, rounds=200):
+    """
+    Parses every content template `rounds` times (the repeated --dry-run pattern).
+    """
+    from ..publisher import parse_template
+
+    paths = sorted(glob.glob(os.path.join(TEMPLATES_DIR, "*.md")))
+    valid = []
+    for path in paths:
+        try:
+            parse_template(path)
+            valid.append(path)
+        except ValueError:
+            continue
+    if not valid:
+        return []
+
+    def run():
+        for _ in range(rounds):
+            for path in valid:
+                parse_template(path)
+
+    seconds, peak = measure(run, repeat)
+    return [result_row("parse_template", "templates", rounds * len(valid), seconds, peak)]
+
+
+def result_row(stage, scale, items, seconds, peak):
+    return {
+        "stage": stage,
+        "scale": str(scale),
+        "items": items,
+        "seconds": seconds,
+        "items_per_sec": items / seconds if seconds > 0 else float("inf"),
+        "peak_kb": peak / 1024,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Annotates each result with its throughput and peak memory change vs. the baseline.
+    Returns [(row, reason), ...] for stages that got slower or hungrier than the tolerance allows.
+    """
+    regressions = []
+    for row in results:
+        base = baseline.get(f"{row['stage']}@{row['scale']}")
+        row["delta"] = row["mem_delta"] = None
+        if not base:
+            continue
+        row["delta"] = row["items_per_sec"] / base["items_per_sec"] - 1.0
+        row["mem_delta"] = row["peak_kb"] / max(base["peak_kb"], 1.0) - 1.0
+        if row["delta"] < -tolerance:
+            regressions.append((row, f"throughput {row['delta'] * 100:+.0f}%"))
+        # Ignore noise on tiny allocations
+        if row["mem_delta"] > tolerance and row["peak_kb"] - base["peak_kb"] > 64:
+            regressions.append((row, f"peak memory {row['mem_delta'] * 100:+.0f}%"))
+    return regressions
+
+
+def print_table(results):
+    print(f"{'stage':<16}{'scale':>10}{'items':>10}{'time (ms)':>12}{'items/s':>14}{'peak KB':>12}"
+          f"{'speed vs base':>15}{'mem vs base':>13}")
+    for row in results:
+        delta = "" if row.get("delta") is None else f"{row['delta'] * 100:+.0f}%"
+        mem_delta = "" if row.get("mem_delta") is None else f"{row['mem_delta'] * 100:+.0f}%"
+        print(f"{row['stage']:<16}{row['scale']:>10}{row['items']:>10}{row['seconds'] * 1000:>12.2f}"
+              f"{row['items_per_sec']:>14,.0f}{row['peak_kb']:>12,.0f}{delta:>15}{mem_delta:>13}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the reddit_bot scan pipeline.")
+    parser.add_argument("--scales", type=int, nargs="*", default=DEFAULT_SCALES,
+                        help="Synthetic feed sizes in entries (the recorded feed always runs)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage; the best one counts")
+    parser.add_argument("--baseline", help="Baseline file (default: bench_baseline.json under DATA_DIR)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--json", help="Also write the raw results to this file")
+    args = parser.parse_args(argv)
+    args.baseline = args.baseline or config.data_path(BASELINE_NAME)
+
+    with open(ATOM_FIXTURE, "rb") as f:
+        atom_doc = f.read()
+    with open(LISTING_FIXTURE, "rb") as f:
+        listing_doc = f.read()
+
+    results = bench_scale("recorded", atom_doc, listing_doc, args.repeat)
+    for n in args.scales:
+        print(f"Building synthetic feed with {n} entries...", file=sys.stderr)
+        results.extend(bench_scale(n, synthetic_atom(n), synthetic_listing(n), args.repeat))
+    results.extend(bench_templates(args.repeat))
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    print_table(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        for row in results:
+            baseline[f"{row['stage']}@{row['scale']}"] = {
+                key: row[key] for key in ("stage", "scale", "items", "seconds", "items_per_sec", "peak_kb")
+            }
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not baseline:
+        print("No baseline yet - run with --update-baseline to record one.")
+    elif regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance * 100:.0f}%:")
+        for row, reason in regressions:
+            print(f"  {row['stage']}@{row['scale']}: {reason}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
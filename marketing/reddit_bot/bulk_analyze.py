@@ -0,0 +1,243 @@
+"""
+Offline keyword analysis over post dumps (for tuning KEYWORDS without the network).
+
+Reads NDJSON submissions, one JSON object per line with at least "title" and
+optionally "selftext", "subreddit" and "id" (the Pushshift/Arctic Shift dump
+format). The file may be plain, .gz, .bz2, .xz or .zst (the last needs the
+optional `zstandard` package). It runs every post through the same matcher the
+monitors use and reports:
+
+- per keyword: posts hit, title vs. body hits and share of all posts,
+- keyword co-occurrence (posts hitting both),
+- matches per subreddit,
+- a few example posts per keyword (uniform random sample over the whole dump).
+
+The file is decompressed and split into chunks of lines as it streams. Chunks
+are spread over a multiprocessing pool, with only a few in flight at once, and
+every worker returns a small fixed-size summary. So memory stays flat
+whatever the dump size, and throughput grows with --workers.
+
+    python -m marketing.reddit_bot.bulk_analyze RS_2025-01.zst --subreddit excel
+    python -m marketing.reddit_bot.bulk_analyze dump.ndjson.gz --keywords "merg*" "vlookup" "power query" --json report.json
+"""
+import bz2
+import gzip
+import heapq
+import io
+import json
+import lzma
+import multiprocessing
+import os
+import random
+import time
+from collections import Counter, deque
+from itertools import combinations
+from .matcher import KEYWORD_PROFILES, KeywordMatcher, get_matcher, match_fields, unique_keywords
+
+CHUNK_LINES = 5000
+# Chunks queued per worker; bounds memory while keeping every worker busy.
+IN_FLIGHT_PER_WORKER = 2
+SAMPLES_PER_KEYWORD = 5
+# Pushshift dumps use a long zstd window
+ZSTD_MAX_WINDOW = 2 ** 31
+
+
+def open_dump(path):
+    """
+    Opens a (possibly compressed) NDJSON dump as a text stream, picking the codec by extension.
+    """
+    if path.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise SystemExit("Reading .zst dumps needs the zstandard package: pip install zstandard")
+        raw = open(path, 'rb')
+        reader = zstandard.ZstdDecompressor(max_window_size=ZSTD_MAX_WINDOW).stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(io.BufferedReader(reader), encoding='utf-8', errors='replace')
+    if path.endswith(".gz"):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    if path.endswith(".bz2"):
+        return bz2.open(path, 'rt', encoding='utf-8', errors='replace')
+    if path.endswith(".xz"):
+        return lzma.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, 'r', encoding='utf-8', errors='replace')
+
+
+def read_chunks(stream, chunk_lines=CHUNK_LINES):
+    chunk = []
+    for line in stream:
+        chunk.append(line)
+        if len(chunk) >= chunk_lines:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+_worker_matcher = None
+_worker_subreddits = None
+
+
+def _init_worker(keywords, subreddits):
+    global _worker_matcher, _worker_subreddits
+    # Built once per process, not per chunk
+    _worker_matcher = KeywordMatcher({"default": keywords}) if keywords else get_matcher()
+    _worker_subreddits = set(subreddits) if subreddits else None
+    random.seed()
+
+
+def _empty_summary():
+    return {
+        "posts": 0, "matched": 0, "bad_lines": 0,
+        "keywords": Counter(), "title_hits": Counter(), "body_hits": Counter(),
+        "pairs": Counter(), "subreddits": Counter(), "samples": {},
+    }
+
+
+def analyze_chunk(lines):
+    """
+    Matches one chunk of NDJSON lines. Returns a mergeable summary whose size
+    depends on the number of keywords, not on the number of lines.
+    """
+    summary = _empty_summary()
+    for line in lines:
+        try:
+            post = json.loads(line)
+            title = post["title"]
+        except (ValueError, KeyError, TypeError):
+            summary["bad_lines"] += 1
+            continue
+        subreddit = (post.get("subreddit") or "").lower()
+        if _worker_subreddits is not None and subreddit not in _worker_subreddits:
+            continue
+        summary["posts"] += 1
+        _, _, title_hits, body_hits = match_fields(_worker_matcher, subreddit, title, post.get("selftext") or "")
+        if not (title_hits or body_hits):
+            continue
+        keywords = unique_keywords(title_hits + body_hits)
+        summary["matched"] += 1
+        summary["subreddits"][subreddit] += 1
+        summary["keywords"].update(keywords)
+        summary["title_hits"].update(unique_keywords(title_hits))
+        summary["body_hits"].update(unique_keywords(body_hits))
+        summary["pairs"].update(combinations(sorted(keywords), 2))
+        for keyword in keywords:
+            _offer_sample(summary["samples"], keyword, random.random(), {
+                "id": post.get("id"), "subreddit": subreddit, "title": title[:200],
+            })
+    return summary
+
+
+def _offer_sample(samples, keyword, priority, item):
+    """
+    Bottom-k sampling: keep the SAMPLES_PER_KEYWORD items with the smallest random priority.
+    Merging two such samples and keeping the smallest k again is still a uniform sample.
+    """
+    heap = samples.setdefault(keyword, [])
+    entry = (-priority, item["id"] or "", item)
+    if len(heap) < SAMPLES_PER_KEYWORD:
+        heapq.heappush(heap, entry)
+    elif entry > heap[0]:
+        heapq.heapreplace(heap, entry)
+
+
+def merge_summary(total, part):
+    for key in ("posts", "matched", "bad_lines"):
+        total[key] += part[key]
+    for key in ("keywords", "title_hits", "body_hits", "pairs", "subreddits"):
+        total[key].update(part[key])
+    for keyword, heap in part["samples"].items():
+        for neg_priority, _, item in heap:
+            _offer_sample(total["samples"], keyword, -neg_priority, item)
+    return total
+
+
+def analyze(path, workers=None, keywords=None, subreddits=None, chunk_lines=CHUNK_LINES, progress=True):
+    """
+    Runs the whole dump through the matcher on a process pool and returns the merged summary.
+    """
+    workers = workers or os.cpu_count() or 1
+    subreddits = [s.lower() for s in subreddits] if subreddits else None
+    total = _empty_summary()
+    started = last_progress = time.time()
+    # Not pool.imap: its feeder thread reads the whole input ahead of the workers.
+    max_in_flight = workers * IN_FLIGHT_PER_WORKER
+    with open_dump(path) as stream, multiprocessing.Pool(workers, _init_worker, (keywords, subreddits)) as pool:
+        pending = deque()
+        for chunk in read_chunks(stream, chunk_lines):
+            pending.append(pool.apply_async(analyze_chunk, (chunk,)))
+            while len(pending) >= max_in_flight or (pending and pending[0].ready()):
+                merge_summary(total, pending.popleft().get())
+            if progress and time.time() - last_progress >= 1.0:
+                last_progress = time.time()
+                rate = total["posts"] / (last_progress - started)
+                print(f"\r{total['posts']:,} posts, {total['matched']:,} matched ({rate:,.0f} posts/s)",
+                      end="", flush=True)
+        while pending:
+            merge_summary(total, pending.popleft().get())
+    total["seconds"] = time.time() - started
+    if progress and last_progress > started:
+        print()
+    return total
+
+
+def format_report(summary, top_pairs=15):
+    posts = summary["posts"] or 1
+    lines = [
+        f"{summary['posts']:,} posts analyzed in {summary['seconds']:.1f}s "
+        f"({summary['posts'] / max(summary['seconds'], 1e-9):,.0f} posts/s), "
+        f"{summary['matched']:,} matched ({summary['matched'] / posts:.1%}), {summary['bad_lines']:,} unreadable lines.",
+        "",
+        f"{'keyword':<20}{'posts':>10}{'share':>9}{'in title':>10}{'in body':>10}",
+    ]
+    for keyword, count in summary["keywords"].most_common():
+        lines.append(f"{keyword:<20}{count:>10,}{count / posts:>9.2%}"
+                     f"{summary['title_hits'][keyword]:>10,}{summary['body_hits'][keyword]:>10,}")
+    if summary["pairs"]:
+        lines += ["", "Most frequent keyword pairs:"]
+        for (a, b), count in summary["pairs"].most_common(top_pairs):
+            lines.append(f"  {a} + {b}: {count:,}")
+    if len(summary["subreddits"]) > 1:
+        lines += ["", "Matches per subreddit:"]
+        for subreddit, count in summary["subreddits"].most_common(15):
+            lines.append(f"  r/{subreddit or '?'}: {count:,}")
+    lines += ["", "Examples:"]
+    for keyword, _ in summary["keywords"].most_common():
+        lines.append(f"  [{keyword}]")
+        for _, _, item in sorted(summary["samples"].get(keyword, []), reverse=True):
+            lines.append(f"    r/{item['subreddit']}: {item['title']}")
+    return "\n".join(lines)
+
+
+def to_json(summary):
+    return {
+        "posts": summary["posts"], "matched": summary["matched"], "bad_lines": summary["bad_lines"],
+        "seconds": summary["seconds"],
+        "keywords": {k: {"posts": n, "title": summary["title_hits"][k], "body": summary["body_hits"][k]}
+                     for k, n in summary["keywords"].most_common()},
+        "pairs": [{"keywords": list(pair), "posts": n} for pair, n in summary["pairs"].most_common()],
+        "subreddits": dict(summary["subreddits"].most_common()),
+        "samples": {k: [item for _, _, item in sorted(heap, reverse=True)] for k, heap in summary["samples"].items()},
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Replay an NDJSON post dump through the keyword matcher.")
+    parser.add_argument("dump", help="NDJSON file (.zst, .gz, .bz2, .xz or plain)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (default: all cores)")
+    parser.add_argument("--subreddit", action="append", help="Only posts from this subreddit (repeatable)")
+    parser.add_argument("--keywords", nargs="+",
+                        help=f"Candidate keyword list to try instead of the configured one ({', '.join(KEYWORD_PROFILES['default'])})")
+    parser.add_argument("--chunk-lines", type=int, default=CHUNK_LINES)
+    parser.add_argument("--json", help="Also write the report as JSON to this file")
+    args = parser.parse_args()
+
+    # Call through the package module so workers can unpickle the task under any start method
+    from . import bulk_analyze
+    summary = bulk_analyze.analyze(args.dump, args.workers, args.keywords, args.subreddit, args.chunk_lines)
+    print(bulk_analyze.format_report(summary))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(bulk_analyze.to_json(summary), f, indent=2, ensure_ascii=False)
+        print(f"\nJSON report written to {args.json}")
@@ -1,25 +1,54 @@
 import os
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+# Settings are read on first access (module __getattr__), so importing this module is free
+# and commands that never touch a setting don't pay for python-dotenv or the .env file.
+_settings = None
 
-REDDIT_CLIENT_ID = os.getenv("REDDIT_CLIENT_ID")
-REDDIT_CLIENT_SECRET = os.getenv("REDDIT_CLIENT_SECRET")
-REDDIT_USER_AGENT = os.getenv("REDDIT_USER_AGENT", "python:excel-cleaner-bot:v1.0 (by /u/YourUsername)")
-REDDIT_USERNAME = os.getenv("REDDIT_USERNAME")
-REDDIT_PASSWORD = os.getenv("REDDIT_PASSWORD")
-PROXY_SERVER = os.getenv("PROXY_SERVER", "http://127.0.0.1:7890") # Default to common local proxy
-FEISHU_WEBHOOK_URL = os.getenv("FEISHU_WEBHOOK_URL", "https://open.feishu.cn/open-apis/bot/v2/hook/5676dfc2-ebe7-4deb-b699-b70b0081e927")
+def _load():
+    global _settings
+    if _settings is None:
+        from dotenv import load_dotenv
+
+        # Load environment variables from .env file
+        load_dotenv()
+
+        _settings = {
+            "REDDIT_CLIENT_ID": os.getenv("REDDIT_CLIENT_ID"),
+            "REDDIT_CLIENT_SECRET": os.getenv("REDDIT_CLIENT_SECRET"),
+            "REDDIT_USER_AGENT": os.getenv("REDDIT_USER_AGENT", "python:excel-cleaner-bot:v1.0 (by /u/YourUsername)"),
+            "REDDIT_USERNAME": os.getenv("REDDIT_USERNAME"),
+            "REDDIT_PASSWORD": os.getenv("REDDIT_PASSWORD"),
+            "PROXY_SERVER": os.getenv("PROXY_SERVER", "http://127.0.0.1:7890"), # Default to common local proxy
+            "FEISHU_WEBHOOK_URL": os.getenv("FEISHU_WEBHOOK_URL", "https://open.feishu.cn/open-apis/bot/v2/hook/5676dfc2-ebe7-4deb-b699-b70b0081e927"),
+            # Local state (seen entries, caches, match history). Kept out of git.
+            "DATA_DIR": os.getenv("REDDIT_BOT_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")),
+        }
+    return _settings
+
+def __getattr__(name):
+    settings = _load()
+    if name not in settings:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # Cache as a real module attribute so later lookups skip __getattr__
+    globals()[name] = settings[name]
+    return settings[name]
+
+def data_path(*parts):
+    """
+    A path under DATA_DIR. Modules call this when they need the path, not at import time,
+    since reading DATA_DIR loads .env.
+    """
+    return os.path.join(_load()["DATA_DIR"], *parts)
 
 # Validation
 def validate_config():
+    settings = _load()
     missing = []
-    if not REDDIT_CLIENT_ID: missing.append("REDDIT_CLIENT_ID")
-    if not REDDIT_CLIENT_SECRET: missing.append("REDDIT_CLIENT_SECRET")
-    if not REDDIT_USERNAME: missing.append("REDDIT_USERNAME")
-    if not REDDIT_PASSWORD: missing.append("REDDIT_PASSWORD")
-    
+    if not settings["REDDIT_CLIENT_ID"]: missing.append("REDDIT_CLIENT_ID")
+    if not settings["REDDIT_CLIENT_SECRET"]: missing.append("REDDIT_CLIENT_SECRET")
+    if not settings["REDDIT_USERNAME"]: missing.append("REDDIT_USERNAME")
+    if not settings["REDDIT_PASSWORD"]: missing.append("REDDIT_PASSWORD")
+
     if missing:
         return False, f"Missing configuration: {', '.join(missing)}"
     return True, "Configuration valid"
@@ -5,7 +5,17 @@ PROJECT_DIR="/Users/Zhuanz/zch/skillCollection/excel-cleaner-mvp"
 PYTHON_EXEC="python3"
 
 # 1. Scan r/excel for keywords (Using RSS - No Login) - Every 2 hours
-# 0 */2 * * * cd $PROJECT_DIR && $PYTHON_EXEC -m marketing.reddit_bot.monitor_rss --subreddit excel >> marketing/reddit_bot/logs/scan.log 2>&1
+#    --incremental skips unchanged feeds (HTTP 304) and entries already reported
+#    Several subreddits share one run: repeat --subreddit, or list them in a file with --feeds-file
+#    --digest pushes new matches to Feishu as a few digest cards once the digest window (2h) has passed
+#    --trends alerts on Feishu when a keyword suddenly gets many more matches in a subreddit than usual
+#    --export (needs pyarrow) also appends every scanned entry to data/scan_history as Parquet;
+#    analyze it with: python -m marketing.reddit_bot export stats --by week
+# 0 */2 * * * cd $PROJECT_DIR && $PYTHON_EXEC -m marketing.reddit_bot.monitor_rss --subreddit excel --subreddit csv --subreddit dataengineering --incremental --digest --trends >> marketing/reddit_bot/logs/scan.log 2>&1
+
+# 1b. (Optional) Scan new comments of the same subreddits via the API (Requires Reddit app credentials in .env) - Every 15 minutes
+#    One combined comment listing per run; thread context is looked up in batches and cached
+# */15 * * * * cd $PROJECT_DIR && $PYTHON_EXEC -m marketing.reddit_bot.monitor --mode comments --subreddit excel --subreddit csv --subreddit dataengineering >> marketing/reddit_bot/logs/comments.log 2>&1
 
 # 2. (Optional) Auto-Post using Browser Simulation (Requires valid User/Pass in .env) - Weekly
 # 0 9 * * 1 cd $PROJECT_DIR && $PYTHON_EXEC -m marketing.reddit_bot.publisher_browser marketing/content_templates/weekly_update.md --subreddit test >> marketing/reddit_bot/logs/publish.log 2>&1
@@ -13,4 +23,9 @@ PYTHON_EXEC="python3"
 # 3. Daily Task Report to Feishu (Runs at 9:00 AM)
 # 0 9 * * * cd $PROJECT_DIR && $PYTHON_EXEC -m marketing.reddit_bot.report_tasks >> marketing/reddit_bot/logs/report.log 2>&1
 
+# Alternative to all of the above: one long-running process that schedules the scan, comments, inbox and report jobs
+# itself, adapts each feed's poll interval to its activity and records every run for the daily report.
+# Don't enable it together with the cron jobs above.
+# @reboot cd $PROJECT_DIR && $PYTHON_EXEC -m marketing.reddit_bot.daemon --subreddit excel --subreddit csv --subreddit dataengineering --digest --trends --comments-minutes 15 >> marketing/reddit_bot/logs/daemon.log 2>&1
+
 echo "Cron templates prepared (Browser/RSS Mode). Run 'crontab -e' to enable."
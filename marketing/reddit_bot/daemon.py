@@ -0,0 +1,327 @@
+"""
+Long-running scheduler for the bot (alternative to the crontab in cron_setup.sh).
+
+One process runs the RSS scan, comment scan, inbox and daily report jobs itself, so praw,
+feedparser and requests are imported once, .env is read once, and the Reddit
+client, HTTP connection pool, keyword matcher and reply rules stay warm between
+runs. Each feed gets its own poll interval, adapted to how many new entries it
+yields. Every job run is written to the run ledger (data/runs.db), which the
+daily report reads.
+
+    python -m marketing.reddit_bot.daemon --subreddit excel --subreddit csv --digest
+"""
+import os
+import signal
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from . import config, metrics
+from .monitor_rss import DEFAULT_CONCURRENCY, feed_for, load_feeds, monitor_subreddit_rss
+from .run_ledger import RunLedger
+from .scoring import DEFAULT_MIN_SCORE
+
+MIN_POLL_SECONDS = 5 * 60
+MAX_POLL_SECONDS = 2 * 3600
+DEFAULT_POLL_SECONDS = 30 * 60
+# Poll a feed again once about this many new entries are expected (a /new feed only holds 25).
+TARGET_NEW_ENTRIES = 8
+# A feed that came back (nearly) full may have overflowed since the last poll.
+FULL_FEED_ENTRIES = 20
+# Weight of the latest poll in the smoothed entries-per-second rate.
+RATE_SMOOTHING = 0.3
+DEFAULT_INBOX_SECONDS = 10 * 60
+DEFAULT_COMMENTS_SECONDS = 10 * 60
+DEFAULT_REPORT_TIME = "09:00"
+# How often Feishu messages that failed to send are retried from the spool.
+SPOOL_RETRY_SECONDS = 10 * 60
+# The loop never sleeps longer than this, so PAUSED and signals are noticed quickly.
+MAX_SLEEP_SECONDS = 60
+
+
+class FeedSchedule:
+    """
+    Poll timing of one feed. The interval follows a smoothed rate of new entries so busy
+    feeds are polled often and quiet ones rarely, within MIN/MAX_POLL_SECONDS.
+    After failed polls the feed is retried with an exponential backoff instead.
+    """
+
+    def __init__(self, name, url, interval=DEFAULT_POLL_SECONDS, rate=0.0, last_polled=0.0):
+        self.name = name
+        self.url = url
+        self.interval = interval
+        self.rate = rate
+        self.last_polled = last_polled
+        self.failures = 0
+        self.retry_at = 0.0
+
+    @property
+    def next_due(self):
+        if self.failures:
+            return self.retry_at
+        return self.last_polled + self.interval
+
+    def failed(self, now):
+        """
+        Backs off after a poll that raised: MIN_POLL_SECONDS, doubling up to MAX_POLL_SECONDS.
+        last_polled and the rate are left alone, so the next successful poll measures the whole gap.
+        """
+        self.failures += 1
+        self.retry_at = now + min(MAX_POLL_SECONDS, MIN_POLL_SECONDS * 2 ** (self.failures - 1))
+
+    def update(self, new_entries, now):
+        """
+        Adapts the interval to a poll's result (new entry count, 0 if not modified, None on error).
+        """
+        if new_entries is not None and self.last_polled:
+            observed = new_entries / max(1.0, now - self.last_polled)
+            self.rate = (1 - RATE_SMOOTHING) * self.rate + RATE_SMOOTHING * observed
+            if new_entries >= FULL_FEED_ENTRIES:
+                self.interval = MIN_POLL_SECONDS
+            elif self.rate > 0:
+                self.interval = TARGET_NEW_ENTRIES / self.rate
+            else:
+                self.interval = MAX_POLL_SECONDS
+            self.interval = max(MIN_POLL_SECONDS, min(MAX_POLL_SECONDS, self.interval))
+        self.last_polled = now
+        self.failures = 0
+
+
+def next_daily(at, now=None):
+    """
+    Returns the timestamp of the next local HH:MM after now.
+    """
+    now = datetime.fromtimestamp(now if now is not None else time.time())
+    hour, minute = (int(part) for part in at.split(":"))
+    due = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if due <= now:
+        due += timedelta(days=1)
+    return due.timestamp()
+
+
+class Daemon:
+    def __init__(self, feeds, inbox_interval=DEFAULT_INBOX_SECONDS, report_time=DEFAULT_REPORT_TIME,
+                 send_replies=False, digest=False, min_score=DEFAULT_MIN_SCORE, concurrency=DEFAULT_CONCURRENCY,
+                 comments_interval=0, trends=False, export=False):
+        self.inbox_interval = inbox_interval
+        self.trends = trends
+        self.export = export
+        self.comments_interval = comments_interval
+        self.report_time = report_time
+        self.send_replies = send_replies
+        self.digest = digest
+        self.min_score = min_score
+        self.concurrency = concurrency
+        self.stop_event = threading.Event()
+        self.ledger = RunLedger()
+
+        saved = self.ledger.load_feed_schedule()
+        self.feeds = [FeedSchedule(name, url, *saved.get(url, ())) for name, url in feeds]
+        now = time.time()
+        self.inbox_due = now if inbox_interval else None
+        self.comments_due = now if comments_interval else None
+        self.report_due = next_daily(report_time, now) if report_time else None
+        # Leftovers of an earlier run are retried right away
+        self.spool_due = now
+        self._reddit = None
+        self._rules = None
+
+    @property
+    def reddit(self):
+        # Created on first use and kept, so the OAuth token is reused across inbox runs.
+        if self._reddit is None:
+            from .reddit_client import get_reddit
+            self._reddit = get_reddit()
+        return self._reddit
+
+    @property
+    def rules(self):
+        if self._rules is None:
+            from .reply_rules import RuleTable
+            self._rules = RuleTable()
+        return self._rules
+
+    def paused(self):
+        return os.path.exists(os.path.join(os.path.dirname(os.path.abspath(__file__)), "PAUSED"))
+
+    def run_job(self, job, fn):
+        """
+        Runs one job under the ledger. Failures are logged and never stop the daemon.
+        """
+        print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] Running {job}...")
+        try:
+            with self.ledger.record(job) as run:
+                fn(run)
+        except Exception:
+            traceback.print_exc()
+        finally:
+            metrics.flush()
+
+    def scan_feeds(self, due):
+        def job(run):
+            try:
+                summary = monitor_subreddit_rss([f.url for f in due], incremental=True, concurrency=self.concurrency,
+                                                min_score=self.min_score, export=self.export)
+            except Exception:
+                # Without this the feeds stay due and the scan reruns every second
+                now = time.time()
+                for feed in due:
+                    feed.failed(now)
+                    print(f"  r/{feed.name}: scan failed, retry in {(feed.retry_at - now) / 60:.0f} min")
+                raise
+            now = time.time()
+            for feed in due:
+                feed.update(summary["feeds"].get(feed.url), now)
+                self.ledger.save_feed_schedule(feed.url, feed.interval, feed.rate, feed.last_polled)
+                print(f"  r/{feed.name}: next poll in {feed.interval / 60:.0f} min")
+            run.items = summary["entries"]
+            run.note = f"{len(due)} feeds, {summary['relevant']} relevant"
+
+        self.run_job("rss", job)
+        self.check_trends()
+        if self.digest:
+            from .digest import send_digest
+
+            def digest_job(run):
+                run.items = send_digest(min_score=self.min_score)
+
+            self.run_job("digest", digest_job)
+
+    def check_inbox(self):
+        from .monitor import check_inbox_and_reply
+
+        def job(run):
+            run.items = check_inbox_and_reply(send_replies=self.send_replies, rules=self.rules, reddit=self.reddit)
+
+        self.run_job("inbox", job)
+
+    def scan_comments(self):
+        from .monitor import monitor_comments
+        # Comments of every monitored subreddit come from one combined listing
+        names = sorted({feed.name for feed in self.feeds})
+
+        def job(run):
+            run.items = monitor_comments(names, min_score=self.min_score, reddit=self.reddit, export=self.export)
+
+        self.run_job("comments", job)
+        self.check_trends()
+
+    def check_trends(self):
+        if not self.trends:
+            return
+        from .trends import check_trends
+
+        def job(run):
+            run.items = len(check_trends())
+
+        self.run_job("trends", job)
+
+    def retry_notifications(self):
+        """
+        Re-queues Feishu messages left in the spool. The notifier only drains it by itself when
+        it is created, which happens once in this process.
+        """
+        if not config.FEISHU_WEBHOOK_URL:
+            return
+        from .notifier import get_notifier
+        get_notifier().drain_spool()
+
+    def send_report(self):
+        from .report_tasks import send_feishu_report
+
+        def job(run):
+            send_feishu_report()
+            run.items = 1
+
+        self.run_job("report", job)
+        self.ledger.prune()
+
+    def run_once(self, now):
+        """
+        Runs every job that is due. Returns the time the next one is due.
+        """
+        if now >= self.spool_due:
+            self.retry_notifications()
+            self.spool_due = now + SPOOL_RETRY_SECONDS
+
+        if self.report_due is not None and now >= self.report_due:
+            self.send_report()
+            self.report_due = next_daily(self.report_time)
+
+        if self.paused():
+            return now + MAX_SLEEP_SECONDS
+
+        due = [feed for feed in self.feeds if feed.next_due <= now]
+        if due:
+            self.scan_feeds(due)
+
+        if self.inbox_due is not None and now >= self.inbox_due:
+            valid, msg = config.validate_config()
+            if valid:
+                self.check_inbox()
+                self.inbox_due = time.time() + self.inbox_interval
+            else:
+                print(f"Inbox job disabled: {msg}")
+                self.inbox_due = None
+
+        if self.comments_due is not None and now >= self.comments_due:
+            valid, msg = config.validate_config()
+            if valid and self.feeds:
+                self.scan_comments()
+                self.comments_due = time.time() + self.comments_interval
+            else:
+                print(f"Comments job disabled: {msg if not valid else 'no subreddits'}")
+                self.comments_due = None
+
+        upcoming = [feed.next_due for feed in self.feeds]
+        upcoming += [t for t in (self.inbox_due, self.comments_due, self.report_due) if t is not None]
+        return min(upcoming, default=now + MAX_SLEEP_SECONDS)
+
+    def run(self):
+        print(f"Daemon started: {len(self.feeds)} feed(s), inbox every {self.inbox_interval / 60:.0f} min, "
+              f"comments every {self.comments_interval / 60:.0f} min, report at {self.report_time or 'never'}.")
+        while not self.stop_event.is_set():
+            next_due = self.run_once(time.time())
+            self.stop_event.wait(max(1.0, min(MAX_SLEEP_SECONDS, next_due - time.time())))
+        self.ledger.close()
+        print("Daemon stopped.")
+
+    def stop(self, *_):
+        self.stop_event.set()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the scan, inbox and report jobs on an in-process schedule.")
+    parser.add_argument("--subreddit", action="append", help="Subreddit to scan (repeatable, default: excel)")
+    parser.add_argument("--feeds-file", help="File with one subreddit name or feed URL per line")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Max feeds fetched at once")
+    parser.add_argument("--min-score", type=float, default=DEFAULT_MIN_SCORE)
+    parser.add_argument("--digest", action="store_true", help="Send a Feishu digest after scans once the digest window has passed")
+    parser.add_argument("--inbox-minutes", type=float, default=DEFAULT_INBOX_SECONDS / 60,
+                        help="Minutes between inbox checks (0 disables the inbox job)")
+    parser.add_argument("--send", action="store_true", help="Inbox job: actually reply and mark replied messages read")
+    parser.add_argument("--trends", action="store_true", help="Update keyword trends after scans and alert on spikes")
+    parser.add_argument("--export", action="store_true", help="Append every scanned entry to the Parquet scan history (needs pyarrow)")
+    parser.add_argument("--comments-minutes", type=float, default=0,
+                        help=f"Minutes between comment scans of the subreddits (0 disables, e.g. {DEFAULT_COMMENTS_SECONDS // 60})")
+    parser.add_argument("--report-at", default=DEFAULT_REPORT_TIME, help="Local HH:MM for the daily report ('' disables it)")
+    args = parser.parse_args()
+
+    feeds = [feed_for(name) for name in (args.subreddit or ([] if args.feeds_file else ["excel"]))]
+    if args.feeds_file:
+        feeds.extend(load_feeds(args.feeds_file))
+    feeds = list({url: (name, url) for name, url in feeds}.values())
+
+    if args.export:
+        # Missing pyarrow should stop the daemon now, not fail every scan
+        from .export import require_pyarrow
+        require_pyarrow()
+
+    metrics.init("daemon")
+    daemon = Daemon(feeds, inbox_interval=args.inbox_minutes * 60, report_time=args.report_at,
+                    send_replies=args.send, digest=args.digest, min_score=args.min_score, concurrency=args.concurrency,
+                    comments_interval=args.comments_minutes * 60, trends=args.trends, export=args.export)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    daemon.run()
@@ -0,0 +1,187 @@
+import hashlib
+import re
+import struct
+import time
+from functools import lru_cache
+from . import config
+from .matcher import normalize_text
+from .storage import connect
+
+DB_NAME = "dedupe.db"
+
+# MinHash signature length, split into BANDS bands of ROWS values for LSH.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Posts whose word sets overlap at least this much (estimated Jaccard) are the same question.
+# Reposts with a few words edited land around 0.7-0.9; unrelated posts in one subreddit below 0.25.
+# With 16 bands of 4, a pair at 0.6 shares a band 89% of the time, at 0.7 98%.
+THRESHOLD = 0.6
+# Fingerprints older than this are evicted; reposts after that are reported again.
+TTL_SECONDS = 30 * 24 * 3600
+# Below this many distinct words a signature says too little to call two posts the same.
+MIN_TOKENS = 6
+
+_TOKEN_RE = re.compile(r"\w+")
+# Words too common to say anything about which question it is.
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from have how i if in is it me my of on or so that the
+this to was we what when where which with you your
+""".split())
+
+_PRIME = (1 << 61) - 1
+# Fixed seeds so signatures stay comparable across runs
+_PERMUTATIONS = [
+    (int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), "big") % (_PRIME - 1) + 1,
+     int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), "big") % _PRIME)
+    for i in range(NUM_PERM)
+]
+
+
+@lru_cache(maxsize=65536)
+def _token_hash(token):
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big") % _PRIME
+
+
+def tokens(text):
+    return {t for t in _TOKEN_RE.findall(normalize_text(text)) if t not in STOPWORDS}
+
+
+def minhash(words):
+    """
+    MinHash signature of a set of words: for each of NUM_PERM hash permutations, the smallest value.
+    The share of positions two signatures agree on estimates the Jaccard similarity of the sets.
+    """
+    hashes = [_token_hash(word) for word in words]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def similarity(signature, other):
+    return sum(1 for x, y in zip(signature, other) if x == y) / NUM_PERM
+
+
+def band_keys(signature):
+    """
+    One 63-bit key per band; posts sharing any key are the candidates to compare.
+    """
+    keys = []
+    for band in range(BANDS):
+        values = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(struct.pack(f"<H{ROWS}Q", band, *values), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "big") >> 1)
+    return keys
+
+
+def _pack(signature):
+    return struct.pack(f"<{NUM_PERM}Q", *signature)
+
+
+def _unpack(blob):
+    return struct.unpack(f"<{NUM_PERM}Q", blob)
+
+
+class DedupeIndex:
+    """
+    Near-duplicate detection across everything the monitors matched recently.
+    Each post gets a MinHash signature of its normalized title + body words. The
+    band keys of each signature are indexed in SQLite (LSH), so a lookup compares
+    only the few posts sharing a band instead of the whole history.
+    """
+
+    def __init__(self, db_path=None, threshold=THRESHOLD, ttl_seconds=TTL_SECONDS):
+        db_path = db_path or config.data_path(DB_NAME)
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.conn = connect(db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS posts (
+                id INTEGER PRIMARY KEY,
+                entry_id TEXT UNIQUE NOT NULL,
+                signature BLOB NOT NULL,
+                subreddit TEXT NOT NULL,
+                title TEXT NOT NULL,
+                link TEXT,
+                duplicate_of TEXT,
+                seen_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_posts_seen_at ON posts(seen_at);
+            CREATE TABLE IF NOT EXISTS lsh_bands (
+                key INTEGER NOT NULL,
+                post_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_lsh_bands_key ON lsh_bands(key);
+            CREATE INDEX IF NOT EXISTS idx_lsh_bands_post ON lsh_bands(post_id);
+        """)
+        self.conn.commit()
+
+    def _post(self, entry_id):
+        row = self.conn.execute(
+            "SELECT entry_id, subreddit, title, link, duplicate_of FROM posts WHERE entry_id = ?", (entry_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"entry_id": row[0], "subreddit": row[1], "title": row[2], "link": row[3], "duplicate_of": row[4]}
+
+    def find(self, signature, keys=None):
+        """
+        Returns the first copy of the most similar stored post at or above the threshold
+        as a dict (entry_id, subreddit, title, link, similarity), or None.
+        """
+        keys = keys or band_keys(signature)
+        best = None
+        best_score = 0.0
+        rows = self.conn.execute(f"""
+            SELECT entry_id, signature FROM posts
+            WHERE id IN (SELECT post_id FROM lsh_bands WHERE key IN ({",".join("?" * len(keys))}))
+        """, keys)
+        for entry_id, blob in rows:
+            score = similarity(signature, _unpack(blob))
+            if score >= self.threshold and score > best_score:
+                best, best_score = entry_id, score
+        if best is None:
+            return None
+        post = self._post(best)
+        # Point at the first copy while it is still indexed
+        original = self._post(post["duplicate_of"]) if post["duplicate_of"] else None
+        post = original or post
+        post["similarity"] = best_score
+        return post
+
+    def check(self, entry_id, subreddit, title, link, text):
+        """
+        Looks up a matched post and records it. Returns the first copy of the post it
+        repeats (see find), or None if it is new. A post seen again keeps the verdict of
+        its first check, and texts too short to compare reliably are never flagged.
+        """
+        if not entry_id:
+            return None
+        known = self._post(entry_id)
+        if known is not None:
+            return self._post(known["duplicate_of"]) if known["duplicate_of"] else None
+        words = tokens(text)
+        if len(words) < MIN_TOKENS:
+            return None
+        signature = minhash(words)
+        keys = band_keys(signature)
+        original = self.find(signature, keys)
+        with self.conn:
+            cursor = self.conn.execute("""
+                INSERT OR IGNORE INTO posts (entry_id, signature, subreddit, title, link, duplicate_of, seen_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (entry_id, _pack(signature), subreddit.lower(), title, link,
+                  original["entry_id"] if original else None, time.time()))
+            if cursor.rowcount:
+                self.conn.executemany("INSERT INTO lsh_bands (key, post_id) VALUES (?, ?)",
+                                      [(key, cursor.lastrowid) for key in keys])
+        return original
+
+    def prune(self):
+        cutoff = time.time() - self.ttl_seconds
+        with self.conn:
+            self.conn.execute("DELETE FROM lsh_bands WHERE post_id IN (SELECT id FROM posts WHERE seen_at < ?)",
+                              (cutoff,))
+            self.conn.execute("DELETE FROM posts WHERE seen_at < ?", (cutoff,))
+
+    def close(self):
+        self.prune()
+        self.conn.close()
@@ -0,0 +1,164 @@
+import json
+import re
+import time
+from datetime import datetime
+from . import config
+from .enrichment import EnrichmentCache, describe
+from .match_store import MatchStore
+from .storage import read_json, write_json
+from .scoring import DEFAULT_MIN_SCORE
+
+DIGEST_STATE_NAME = "digest_state.json"
+# Minimum time between two digests; matches found in between are collected into one.
+DEFAULT_WINDOW_MINUTES = 120
+# Feishu rejects cards around 30 KB; stay well below that, and keep cards readable.
+MAX_CARD_BYTES = 24 * 1024
+MAX_MATCHES_PER_CARD = 30
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def _load_state():
+    return read_json(config.data_path(DIGEST_STATE_NAME)) or {"last_id": 0, "last_sent_at": 0}
+
+
+def _save_state(state):
+    write_json(config.data_path(DIGEST_STATE_NAME), state)
+
+
+def dedupe(matches):
+    """
+    Collapses crossposts/reposts: matches with the same link or the same normalized title
+    become one item listing every subreddit. Returns items sorted by best score.
+    """
+    items = []
+    by_key = {}
+    for match in matches:
+        keys = [("link", match["link"]), ("title", _NON_WORD.sub(" ", match["title"].lower()).strip())]
+        item = next((by_key[k] for k in keys if k in by_key), None)
+        if item is None:
+            item = dict(match, subreddits=[match["subreddit"]], keyword_list=match["keywords"].split(","))
+            items.append(item)
+        else:
+            if match["subreddit"] not in item["subreddits"]:
+                item["subreddits"].append(match["subreddit"])
+            for keyword in match["keywords"].split(","):
+                if keyword not in item["keyword_list"]:
+                    item["keyword_list"].append(keyword)
+            item["score"] = max(item["score"] or 0, match["score"] or 0)
+        for k in keys:
+            by_key.setdefault(k, item)
+    items.sort(key=lambda item: -(item["score"] or 0))
+    return items
+
+
+def _match_element(item):
+    subreddits = ", ".join(f"r/{s}" for s in item["subreddits"])
+    score = f"{item['score']:.1f}" if item["score"] is not None else "-"
+    title = item["title"].replace("[", "(").replace("]", ")")
+    details = f" · {describe(item['details'])}" if item.get("details") else ""
+    return {
+        "tag": "div",
+        "text": {
+            "tag": "lark_md",
+            "content": f"**[{title}]({item['link']})**\n{subreddits} · score {score} · {', '.join(item['keyword_list'])}{details}"
+        }
+    }
+
+
+def build_digest_cards(items, window_start, window_end):
+    """
+    Packs digest items into as few cards as possible, splitting whenever a card
+    would exceed MAX_CARD_BYTES or MAX_MATCHES_PER_CARD.
+    """
+    from .report_tasks import build_card
+
+    period = f"{datetime.fromtimestamp(window_start):%m-%d %H:%M} – {datetime.fromtimestamp(window_end):%m-%d %H:%M}"
+    chunks = []
+    current = []
+    current_bytes = 0
+    for item in items:
+        element = _match_element(item)
+        size = len(json.dumps(element, ensure_ascii=False).encode('utf-8'))
+        if current and (current_bytes + size > MAX_CARD_BYTES or len(current) >= MAX_MATCHES_PER_CARD):
+            chunks.append(current)
+            current, current_bytes = [], 0
+        current.append(element)
+        current_bytes += size
+    if current:
+        chunks.append(current)
+
+    cards = []
+    for i, elements in enumerate(chunks, 1):
+        part = f" ({i}/{len(chunks)})" if len(chunks) > 1 else ""
+        header = {
+            "tag": "div",
+            "text": {
+                "tag": "lark_md",
+                "content": f"**{len(items)} relevant posts** · {period}"
+            }
+        }
+        cards.append(build_card(f"🔎 Reddit Match Digest{part}", [header, {"tag": "hr"}] + elements, template="green"))
+    return cards
+
+
+def send_digest(window_minutes=DEFAULT_WINDOW_MINUTES, min_score=DEFAULT_MIN_SCORE, force=False, dry_run=False):
+    """
+    Sends every match recorded since the last digest as a handful of Feishu cards,
+    unless the previous digest went out less than window_minutes ago.
+    Returns the number of cards queued.
+    """
+    state = _load_state()
+    now = time.time()
+    if not force and now - state["last_sent_at"] < window_minutes * 60:
+        remaining = (state["last_sent_at"] + window_minutes * 60 - now) / 60
+        print(f"Digest window still open ({remaining:.0f} min left).")
+        return 0
+
+    store = MatchStore()
+    try:
+        # Snapshot the end first: a match a monitor adds meanwhile waits for the next digest
+        # instead of being skipped by the cursor.
+        last_id = store.max_id()
+        matches = store.since_id(state["last_id"], min_score=min_score, until_id=last_id)
+    finally:
+        store.close()
+
+    items = dedupe(matches)
+    # Votes and comment counts the scan already looked up; the digest fetches nothing itself.
+    cache = EnrichmentCache()
+    try:
+        details = cache.get_many([item["entry_id"] for item in items if item["entry_id"]])
+    finally:
+        cache.close()
+    for item in items:
+        item["details"] = details.get(item["entry_id"])
+    window_start = state["last_sent_at"] or (min((m["matched_at"] for m in matches), default=now))
+    cards = build_digest_cards(items, window_start, now) if items else []
+    print(f"Digest: {len(matches)} matches -> {len(items)} unique posts -> {len(cards)} card(s).")
+
+    if dry_run:
+        for card in cards:
+            print(json.dumps(card, ensure_ascii=False, indent=2))
+        return len(cards)
+
+    if cards:
+        from .notifier import get_notifier
+        notifier = get_notifier()
+        for card in cards:
+            notifier.send(card)
+    # Cards are spooled, so the cursor can move on even if Feishu is down right now.
+    _save_state({"last_id": last_id, "last_sent_at": now if cards else state["last_sent_at"]})
+    return len(cards)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Send a Feishu digest of recent monitor matches.")
+    parser.add_argument("--window", type=float, default=DEFAULT_WINDOW_MINUTES, help="Minutes between digests")
+    parser.add_argument("--min-score", type=float, default=DEFAULT_MIN_SCORE)
+    parser.add_argument("--force", action="store_true", help="Send now even if the window is still open")
+    parser.add_argument("--dry-run", action="store_true", help="Print the cards instead of sending them")
+    args = parser.parse_args()
+
+    send_digest(args.window, args.min_score, args.force, args.dry_run)
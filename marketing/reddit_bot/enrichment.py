@@ -0,0 +1,147 @@
+import json
+import time
+from . import config, metrics
+from .http_client import get_session
+from .storage import TTLStore
+
+DB_NAME = "enrichment.db"
+
+# Public JSON listing of posts by fullname (no login, like the RSS feeds).
+BY_ID_URL = "https://www.reddit.com/by_id/{}.json"
+# Fullnames per by_id request; Reddit serves at most 100 items per listing.
+BATCH_SIZE = 100
+# Votes and comment counts keep moving, but a post matched on this scan needn't be
+# fetched again on the next one (the cron scan runs every 2 hours).
+ENRICHMENT_TTL_SECONDS = 3 * 3600
+ENRICHMENT_MAX_ENTRIES = 20000
+
+
+def post_metadata(data):
+    """
+    Picks the fields worth showing from a post's JSON.
+    """
+    return {
+        "score": data.get("score"),
+        "num_comments": data.get("num_comments"),
+        "upvote_ratio": data.get("upvote_ratio"),
+        "flair": data.get("link_flair_text"),
+        "author": data.get("author"),
+        "created_utc": data.get("created_utc"),
+        "over_18": bool(data.get("over_18")),
+        "locked": bool(data.get("locked")),
+        "removed": bool(data.get("removed_by_category")),
+    }
+
+
+def describe(metadata):
+    """
+    One-line summary, e.g. '12 points · 5 comments · flair: Waiting on OP'.
+    """
+    if not metadata:
+        return ""
+    parts = [f"{metadata['score']} points", f"{metadata['num_comments']} comments"]
+    if metadata.get("flair"):
+        parts.append(f"flair: {metadata['flair']}")
+    if metadata.get("removed"):
+        parts.append("removed")
+    elif metadata.get("locked"):
+        parts.append("locked")
+    return " · ".join(parts)
+
+
+class EnrichmentCache(TTLStore):
+    """
+    Post metadata by fullname with a TTL, so a post is fetched at most once per TTL.
+    """
+
+    TABLE = "post_metadata"
+    KEY = "fullname"
+    TIME_COLUMN = "fetched_at"
+
+    def __init__(self, db_path=None, ttl_seconds=ENRICHMENT_TTL_SECONDS, max_entries=ENRICHMENT_MAX_ENTRIES):
+        super().__init__(db_path or config.data_path(DB_NAME), ttl_seconds, max_entries)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS post_metadata (
+                fullname TEXT PRIMARY KEY,
+                metadata TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_post_metadata_fetched_at ON post_metadata(fetched_at);
+        """)
+        self.conn.commit()
+
+    def get_many(self, fullnames):
+        """
+        Returns {fullname: metadata} for the cached, unexpired fullnames.
+        """
+        fullnames = list(set(fullnames))
+        if not fullnames:
+            return {}
+        placeholders = ",".join("?" * len(fullnames))
+        rows = self.conn.execute(
+            f"SELECT fullname, metadata FROM post_metadata WHERE fullname IN ({placeholders}) AND fetched_at >= ?",
+            fullnames + [time.time() - self.ttl_seconds],
+        )
+        return {fullname: json.loads(metadata) for fullname, metadata in rows}
+
+    def put_many(self, metadata_by_fullname):
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO post_metadata (fullname, metadata, fetched_at) VALUES (?, ?, ?)",
+            [(fullname, json.dumps(metadata), now) for fullname, metadata in metadata_by_fullname.items()],
+        )
+        self.conn.commit()
+
+
+def fetch_metadata(fullnames, session=None):
+    """
+    Fetches metadata for post fullnames (t3_...) with one by_id request per BATCH_SIZE.
+    Posts Reddit doesn't return (deleted, private) are missing from the result.
+    """
+    session = session or get_session()
+    result = {}
+    for i in range(0, len(fullnames), BATCH_SIZE):
+        batch = fullnames[i:i + BATCH_SIZE]
+        with metrics.timer("enrich"):
+            # verify=False for the same reason as the RSS feeds (see monitor_rss.fetch_feed)
+            response = session.get(BY_ID_URL.format(",".join(batch)), params={"raw_json": 1}, timeout=30, verify=False)
+            response.raise_for_status()
+            listing = response.json()
+        for child in listing.get("data", {}).get("children", []):
+            data = child.get("data", {})
+            if data.get("name"):
+                result[data["name"]] = post_metadata(data)
+    return result
+
+
+def enrich(fullnames, session=None, cache=None):
+    """
+    Returns {fullname: metadata} for the given posts, from the cache where possible
+    and otherwise fetched in bulk (and cached). A failed fetch only costs the details,
+    never the scan: the posts concerned are left out.
+    """
+    import requests
+
+    wanted = sorted({f for f in fullnames if f and f.startswith("t3_")})
+    if not wanted:
+        return {}
+    own_cache = cache is None
+    cache = cache or EnrichmentCache()
+    try:
+        result = cache.get_many(wanted)
+        missing = [f for f in wanted if f not in result]
+        metrics.incr("enrich_cache_hits", len(result))
+        if missing:
+            try:
+                fetched = fetch_metadata(missing, session)
+            except (requests.RequestException, ValueError) as e:
+                metrics.error("enrich")
+                print(f"Could not fetch post details: {e}")
+                fetched = {}
+            cache.put_many(fetched)
+            result.update(fetched)
+            metrics.incr("enriched", len(fetched))
+    finally:
+        if own_cache:
+            cache.close()
+    return result
@@ -0,0 +1,359 @@
+"""
+Columnar history of every scanned entry, for analytics.
+
+With --export, the monitors record each entry they scan, matched or not, as one row:
+where it came from, its keywords and hit counts, its relevance score and what became
+of it (matched / relevant / duplicate). An entry is recorded only the first time a
+monitor scans it, so feeds re-read on every run don't inflate the counts. Rows are
+buffered and written as Parquet, partitioned by scan date and subreddit (Hive layout):
+
+    data/scan_history/date=2026-10-18/subreddit=excel/part-<ms>-<pid>-<rand>.parquet
+
+Writing only ever adds files, so monitors running at the same time never touch each
+other's output. `compact` merges the many small files of past days into one per
+partition. `stats` aggregates with columnar scans: only the partitions in range and the
+columns it needs are read, so it stays fast over millions of rows.
+
+Needs the optional pyarrow package (pip install pyarrow).
+
+    python -m marketing.reddit_bot.export stats --since 2026-09-01 --by week
+    python -m marketing.reddit_bot.export stats --subreddit excel --by day --top 10
+    python -m marketing.reddit_bot.export compact
+"""
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import quote
+from . import config
+
+EXPORT_SUBDIR = "scan_history"
+# Entries already exported, per source. Readers skip files starting with '_'.
+SEEN_DB_NAME = "_seen.db"
+# Keys per seen-set lookup, well under SQLite's limit on query parameters
+SEEN_CHUNK = 500
+
+# Rows buffered before they are written; a scan usually writes once, when it closes.
+BATCH_ROWS = 50000
+COMPRESSION = "zstd"
+
+
+def require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise SystemExit("The Parquet export needs the pyarrow package: pip install pyarrow")
+    return pyarrow
+
+
+def row_schema(pa):
+    """
+    Columns of the exported files. date and subreddit live in the partition path.
+    """
+    return pa.schema([
+        ("scanned_at", pa.timestamp("s", tz="UTC")),
+        ("source", pa.string()),
+        ("entry_id", pa.string()),
+        ("title", pa.string()),
+        ("published_at", pa.timestamp("s", tz="UTC")),
+        ("keywords", pa.list_(pa.string())),
+        ("title_hits", pa.int32()),
+        ("body_hits", pa.int32()),
+        ("score", pa.float32()),
+        ("matched", pa.bool_()),
+        ("relevant", pa.bool_()),
+        ("duplicate", pa.bool_()),
+    ])
+
+
+def partitioning(pa):
+    import pyarrow.dataset as ds
+
+    return ds.partitioning(pa.schema([("date", pa.string()), ("subreddit", pa.string())]), flavor="hive")
+
+
+def _partition_dir(export_dir, date, subreddit):
+    # Feeds given as a URL without /r/<name> use the URL as their subreddit. Hive
+    # partitioning URL-decodes values on read, so percent-encoding keeps them one segment.
+    return os.path.join(export_dir, f"date={date}", f"subreddit={quote(subreddit, safe='')}")
+
+
+def _write_atomic(table, directory):
+    """
+    Writes table as a new part file. Readers skip files starting with '.', so a
+    half-written file is never seen.
+    """
+    import pyarrow.parquet as pq
+
+    os.makedirs(directory, exist_ok=True)
+    name = f"part-{int(time.time() * 1000)}-{os.getpid()}-{uuid.uuid4().hex[:8]}.parquet"
+    tmp_path = os.path.join(directory, f".{name}.tmp")
+    pq.write_table(table, tmp_path, compression=COMPRESSION)
+    os.replace(tmp_path, os.path.join(directory, name))
+    return os.path.join(directory, name)
+
+
+class ScanExporter:
+    """
+    Buffers scanned entries and appends them to the history as new Parquet files,
+    one per (date, subreddit) per flush. Entries exported before (same source and
+    entry_id) are dropped at flush time.
+    """
+
+    def __init__(self, export_dir=None, batch_rows=BATCH_ROWS):
+        # Fail before the scan rather than after it
+        self.pa = require_pyarrow()
+        self.schema = row_schema(self.pa)
+        self.export_dir = export_dir or config.data_path(EXPORT_SUBDIR)
+        self.batch_rows = batch_rows
+        self.rows = []
+        self.written = 0
+        self.skipped = 0
+        self._seen = None
+
+    def add(self, source, subreddit, entry_id, title, published_at, keywords, title_hits=0, body_hits=0,
+            score=None, relevant=False, duplicate=False):
+        """
+        Records one scanned entry. keywords are the distinct keywords it matched (empty if
+        none), title_hits/body_hits the number of hits per field, published_at a unix timestamp.
+        Only matched entries count as relevant.
+        """
+        self.rows.append((time.time(), source, subreddit.lower(), entry_id, title,
+                          None if published_at is None else int(published_at), list(keywords),
+                          title_hits, body_hits, score, bool(keywords), bool(keywords) and relevant, duplicate))
+        if len(self.rows) >= self.batch_rows:
+            self.flush()
+
+    def _seen_store(self):
+        if self._seen is None:
+            from .feed_state import FeedStateStore
+            self._seen = FeedStateStore(os.path.join(self.export_dir, SEEN_DB_NAME))
+        return self._seen
+
+    def _unseen(self, rows):
+        """
+        Drops the rows of entries exported before, or earlier in this batch.
+        Returns (rows, keys) with the seen-set keys of the rows kept.
+        """
+        keys = [f"{row[1]}:{row[3]}" if row[3] else None for row in rows]
+        store = self._seen_store()
+        unseen = set()
+        for start in range(0, len(keys), SEEN_CHUNK):
+            unseen |= store.filter_unseen(keys[start:start + SEEN_CHUNK])
+        kept, kept_keys = [], []
+        for row, key in zip(rows, keys):
+            if key is None:
+                kept.append(row)
+            elif key in unseen:
+                unseen.discard(key)
+                kept.append(row)
+                kept_keys.append(key)
+        return kept, kept_keys
+
+    def flush(self):
+        if not self.rows:
+            return
+        rows, keys = self._unseen(self.rows)
+        self.skipped += len(self.rows) - len(rows)
+        partitions = {}
+        for row in rows:
+            date = datetime.fromtimestamp(row[0], timezone.utc).strftime("%Y-%m-%d")
+            partitions.setdefault((date, row[2]), []).append(row)
+        for (date, subreddit), rows in partitions.items():
+            columns = list(zip(*rows))
+            table = self.pa.Table.from_pydict({
+                "scanned_at": [int(t) for t in columns[0]],
+                "source": columns[1],
+                "entry_id": columns[3],
+                "title": columns[4],
+                "published_at": columns[5],
+                "keywords": columns[6],
+                "title_hits": columns[7],
+                "body_hits": columns[8],
+                "score": columns[9],
+                "matched": columns[10],
+                "relevant": columns[11],
+                "duplicate": columns[12],
+            }, schema=self.schema)
+            _write_atomic(table, _partition_dir(self.export_dir, date, subreddit))
+        self._seen_store().mark_seen(keys)
+        self.written += len(rows)
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        if self._seen is not None:
+            self._seen.close()
+            self._seen = None
+
+
+def _dataset(pa, export_dir):
+    import pyarrow.dataset as ds
+
+    schema = pa.unify_schemas([row_schema(pa), pa.schema([("date", pa.string()), ("subreddit", pa.string())])])
+    return ds.dataset(export_dir, format="parquet", schema=schema, partitioning=partitioning(pa))
+
+
+def _filter(since=None, until=None, subreddit=None, source=None):
+    import pyarrow.dataset as ds
+
+    conditions = []
+    # Dates are ISO strings, so they compare in order
+    if since:
+        conditions.append(ds.field("date") >= since)
+    if until:
+        conditions.append(ds.field("date") <= until)
+    if subreddit:
+        conditions.append(ds.field("subreddit") == subreddit.lower())
+    if source:
+        conditions.append(ds.field("source") == source)
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def _periods(pa, dates, by):
+    """
+    Maps each 'YYYY-MM-DD' partition date to the first day of its day/week/month.
+    """
+    import pyarrow.compute as pc
+
+    if by == "day":
+        return dates
+    # Only a few distinct dates per query: convert those, then map every row to them
+    distinct = pc.unique(dates)
+    timestamps = pc.strptime(distinct, format="%Y-%m-%d", unit="s")
+    if by == "week":
+        floored = pc.floor_temporal(timestamps, unit="week", week_starts_monday=True)
+    else:
+        floored = pc.floor_temporal(timestamps, unit="month")
+    return pc.take(pc.strftime(floored, format="%Y-%m-%d"), pc.index_in(dates, value_set=distinct))
+
+
+def hit_rates(export_dir=None, since=None, until=None, subreddit=None, source=None, by="week"):
+    """
+    Aggregates the history per (period, subreddit) and per (period, subreddit, keyword).
+    Returns (entries, keywords) as pyarrow tables:
+      entries: period, subreddit, scanned, matched, relevant, duplicates
+      keywords: period, subreddit, keyword, matches, relevant
+    Rates are left to the caller (relevant / matches is the keyword's hit rate).
+    """
+    pa = require_pyarrow()
+    import pyarrow.compute as pc
+
+    export_dir = export_dir or config.data_path(EXPORT_SUBDIR)
+    if not os.path.isdir(export_dir):
+        return None, None
+    table = _dataset(pa, export_dir).to_table(
+        columns=["date", "subreddit", "keywords", "matched", "relevant", "duplicate"],
+        filter=_filter(since, until, subreddit, source),
+    )
+    flags = {name: pc.cast(table[name], pa.int64()) for name in ("matched", "relevant", "duplicate")}
+    table = pa.table({
+        "period": _periods(pa, table["date"], by),
+        "subreddit": table["subreddit"],
+        "keywords": table["keywords"],
+        **flags,
+    })
+
+    entries = table.group_by(["period", "subreddit"]).aggregate([
+        ("matched", "count"), ("matched", "sum"), ("relevant", "sum"), ("duplicate", "sum"),
+    ]).rename_columns(["period", "subreddit", "scanned", "matched", "relevant", "duplicates"]) \
+        .sort_by([("period", "ascending"), ("subreddit", "ascending")])
+
+    # One row per (entry, keyword) of the matched entries
+    matched = table.filter(pc.greater(table["matched"], 0))
+    parents = pc.list_parent_indices(matched["keywords"])
+    exploded = pa.table({
+        "period": pc.take(matched["period"], parents),
+        "subreddit": pc.take(matched["subreddit"], parents),
+        "keyword": pc.list_flatten(matched["keywords"]),
+        "relevant": pc.take(matched["relevant"], parents),
+    })
+    keywords = exploded.group_by(["period", "subreddit", "keyword"]).aggregate([
+        ("relevant", "count"), ("relevant", "sum"),
+    ]).rename_columns(["period", "subreddit", "keyword", "matches", "relevant"]) \
+        .sort_by([("period", "ascending"), ("subreddit", "ascending"), ("matches", "descending")])
+    return entries, keywords
+
+
+def _rate(part, whole):
+    return f"{100.0 * part / whole:.1f}%" if whole else "-"
+
+
+def format_stats(entries, keywords, top=5):
+    if entries is None or not entries.num_rows:
+        return "No scan history exported yet (run the monitors with --export)."
+    by_group = {}
+    for row in keywords.to_pylist():
+        by_group.setdefault((row["period"], row["subreddit"]), []).append(row)
+    lines = []
+    for row in entries.to_pylist():
+        lines.append(f"{row['period']} r/{row['subreddit']}: {row['scanned']:,} scanned, "
+                     f"{row['matched']:,} matched ({_rate(row['matched'], row['scanned'])}), "
+                     f"{row['relevant']:,} relevant ({_rate(row['relevant'], row['scanned'])}), "
+                     f"{row['duplicates']:,} duplicates")
+        for kw in by_group.get((row["period"], row["subreddit"]), [])[:top]:
+            lines.append(f"    {kw['keyword']}: {kw['matches']:,} matches, {kw['relevant']:,} relevant "
+                         f"(hit rate {_rate(kw['relevant'], kw['matches'])})")
+    return "\n".join(lines)
+
+
+def compact(export_dir=None, before=None):
+    """
+    Merges the part files of each partition dated before `before` (default: today, UTC)
+    into one file. Today's partitions are left alone, since monitors are still adding to them.
+    Returns the number of partitions compacted.
+    """
+    pa = require_pyarrow()
+    import pyarrow.parquet as pq
+
+    export_dir = export_dir or config.data_path(EXPORT_SUBDIR)
+    before = before or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    compacted = 0
+    if not os.path.isdir(export_dir):
+        return 0
+    for date_dir in sorted(os.listdir(export_dir)):
+        if not date_dir.startswith("date=") or date_dir[len("date="):] >= before:
+            continue
+        for subreddit_dir in sorted(os.listdir(os.path.join(export_dir, date_dir))):
+            directory = os.path.join(export_dir, date_dir, subreddit_dir)
+            parts = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                           if name.startswith("part-") and name.endswith(".parquet"))
+            if len(parts) < 2:
+                continue
+            table = pa.concat_tables([pq.read_table(path, schema=row_schema(pa)) for path in parts])
+            _write_atomic(table.sort_by("scanned_at"), directory)
+            # Readers listing the directory in between count these rows twice; stats is a report, not a ledger.
+            for path in parts:
+                os.remove(path)
+            compacted += 1
+            print(f"{date_dir}/{subreddit_dir}: {len(parts)} files, {table.num_rows:,} rows merged.")
+    return compacted
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Analyze or compact the exported scan history (Parquet).")
+    parser.add_argument("--dir", help="Export directory (default: scan_history under DATA_DIR)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    stats = commands.add_parser("stats", help="Scanned entries, match and hit rates per period and subreddit")
+    stats.add_argument("--since", help="First scan date, YYYY-MM-DD")
+    stats.add_argument("--until", help="Last scan date, YYYY-MM-DD")
+    stats.add_argument("--subreddit", help="Only this subreddit")
+    stats.add_argument("--source", choices=["rss", "api", "comment"], help="Only entries from this monitor")
+    stats.add_argument("--by", choices=["day", "week", "month"], default="week")
+    stats.add_argument("--top", type=int, default=5, help="Keywords shown per period and subreddit")
+    compact_parser = commands.add_parser("compact", help="Merge each past partition's files into one")
+    compact_parser.add_argument("--before", help="Only partitions dated before this YYYY-MM-DD (default: today)")
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        started = time.time()
+        entries, keywords = hit_rates(args.dir, args.since, args.until, args.subreddit, args.source, args.by)
+        print(format_stats(entries, keywords, args.top))
+        print(f"\n({time.time() - started:.2f}s)")
+    else:
+        print(f"Compacted {compact(args.dir, args.before)} partition(s).")
@@ -0,0 +1,103 @@
+from collections import namedtuple
+from xml.etree.ElementTree import XMLPullParser, ParseError
+
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+_FEED = ATOM_NS + "feed"
+_ENTRY = ATOM_NS + "entry"
+_ID = ATOM_NS + "id"
+_TITLE = ATOM_NS + "title"
+_LINK = ATOM_NS + "link"
+_PUBLISHED = ATOM_NS + "published"
+_UPDATED = ATOM_NS + "updated"
+_CONTENT = ATOM_NS + "content"
+_SUMMARY = ATOM_NS + "summary"
+
+# The only fields the monitors use. summary holds the (HTML) post body.
+FeedEntry = namedtuple("FeedEntry", ["id", "title", "link", "published", "summary"])
+
+
+class FeedParseError(Exception):
+    pass
+
+
+class _NotAtom(Exception):
+    pass
+
+
+def _entry_from_element(elem):
+    link = ""
+    for child in elem.iterfind(_LINK):
+        if child.get("rel", "alternate") == "alternate":
+            link = child.get("href", "")
+            break
+    summary = elem.findtext(_CONTENT)
+    if summary is None:
+        summary = elem.findtext(_SUMMARY, "")
+    return FeedEntry(
+        id=elem.findtext(_ID, ""),
+        title=(elem.findtext(_TITLE, "") or "").strip(),
+        link=link,
+        published=elem.findtext(_PUBLISHED) or elem.findtext(_UPDATED, ""),
+        summary=summary,
+    )
+
+
+def _parse_atom(chunks, received):
+    parser = XMLPullParser(events=("start", "end"))
+    entries = []
+    checked_root = False
+    for chunk in chunks:
+        # Keep a reference (not a copy) in case we must hand the document to feedparser.
+        received.append(chunk)
+        parser.feed(chunk)
+        for event, elem in parser.read_events():
+            if not checked_root:
+                if event != "start" or elem.tag != _FEED:
+                    raise _NotAtom(elem.tag)
+                checked_root = True
+                root = elem
+            elif event == "end" and elem.tag == _ENTRY:
+                entries.append(_entry_from_element(elem))
+                # Drop the finished entry so memory stays flat on large feeds.
+                root.remove(elem)
+    parser.close()
+    if not checked_root:
+        raise _NotAtom(None)
+    return entries
+
+
+def _parse_with_feedparser(data):
+    import feedparser
+
+    feed = feedparser.parse(data)
+    if feed.bozo and not feed.entries:
+        raise FeedParseError(feed.bozo_exception)
+    return [
+        FeedEntry(
+            id=entry.get("id", ""),
+            title=entry.get("title", ""),
+            link=entry.get("link", ""),
+            published=entry.get("published", entry.get("updated", "")),
+            summary=entry.get("summary", ""),
+        )
+        for entry in feed.entries
+    ]
+
+
+def parse_feed(chunks):
+    """
+    Parses a feed from an iterable of byte chunks (e.g. response.iter_content()).
+    Reddit's Atom feeds are parsed incrementally as the bytes arrive; anything
+    else (RSS 2.0, malformed XML) falls back to feedparser on the buffered bytes.
+    Returns a list of FeedEntry.
+    """
+    if isinstance(chunks, (bytes, bytearray)):
+        chunks = [chunks]
+    chunks = iter(chunks)
+    received = []
+    try:
+        return _parse_atom(chunks, received)
+    except (_NotAtom, ParseError):
+        # Read whatever is left of the stream, then let feedparser deal with it.
+        received.extend(chunks)
+        return _parse_with_feedparser(b"".join(received))
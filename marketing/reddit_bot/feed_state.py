@@ -0,0 +1,88 @@
+import time
+from . import config
+from .storage import TTLStore
+
+DB_NAME = "feed_state.db"
+
+# Seen entries older than this are forgotten (Reddit's /new feed only holds ~25 entries,
+# so anything this old can't come back).
+SEEN_TTL_SECONDS = 7 * 24 * 3600
+# Hard cap on stored entry IDs; the oldest are evicted first.
+SEEN_MAX_ENTRIES = 50000
+
+
+class FeedStateStore(TTLStore):
+    """
+    Persists HTTP validators (ETag / Last-Modified) per feed and a bounded
+    set of already-processed entry IDs, so incremental polls only handle new entries.
+    """
+
+    TABLE = "seen_entries"
+    KEY = "entry_id"
+    TIME_COLUMN = "seen_at"
+
+    def __init__(self, db_path=None, ttl_seconds=SEEN_TTL_SECONDS, max_entries=SEEN_MAX_ENTRIES):
+        super().__init__(db_path or config.data_path(DB_NAME), ttl_seconds, max_entries)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS feed_validators (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS seen_entries (
+                entry_id TEXT PRIMARY KEY,
+                seen_at REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_seen_entries_seen_at ON seen_entries(seen_at);
+        """)
+        self.conn.commit()
+
+    def conditional_headers(self, url):
+        """
+        Returns If-None-Match / If-Modified-Since headers for a feed we polled before.
+        """
+        row = self.conn.execute(
+            "SELECT etag, last_modified FROM feed_validators WHERE url = ?", (url,)
+        ).fetchone()
+        headers = {}
+        if row:
+            etag, last_modified = row
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def save_validators(self, url, etag, last_modified):
+        if not etag and not last_modified:
+            return
+        self.conn.execute(
+            "INSERT OR REPLACE INTO feed_validators (url, etag, last_modified, updated_at) VALUES (?, ?, ?, ?)",
+            (url, etag, last_modified, time.time()),
+        )
+        self.conn.commit()
+
+    def filter_unseen(self, entry_ids):
+        """
+        Returns the subset of entry_ids that have not been processed yet.
+        """
+        entry_ids = [e for e in entry_ids if e]
+        if not entry_ids:
+            return set()
+        placeholders = ",".join("?" * len(entry_ids))
+        seen = {
+            row[0]
+            for row in self.conn.execute(
+                f"SELECT entry_id FROM seen_entries WHERE entry_id IN ({placeholders})", entry_ids
+            )
+        }
+        return set(entry_ids) - seen
+
+    def mark_seen(self, entry_ids):
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO seen_entries (entry_id, seen_at) VALUES (?, ?)",
+            [(e, now) for e in entry_ids if e],
+        )
+        self.conn.commit()
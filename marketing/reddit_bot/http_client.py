@@ -0,0 +1,30 @@
+import threading
+from . import config
+
+DEFAULT_POOL_SIZE = 10
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session(pool_size=DEFAULT_POOL_SIZE):
+    """
+    Returns the process-wide requests.Session.
+    Connections are kept alive and pooled, so repeated calls to the same host
+    (e.g. many feeds on www.reddit.com) reuse sockets instead of reconnecting.
+    The pool is grown if a caller asks for more concurrent connections.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    global _session
+    with _session_lock:
+        if _session is None or _session.pool_size < pool_size:
+            session = requests.Session()
+            session.headers["User-Agent"] = config.REDDIT_USER_AGENT
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.pool_size = pool_size
+            _session = session
+        return _session
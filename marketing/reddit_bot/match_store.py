@@ -0,0 +1,279 @@
+import sqlite3
+import time
+from collections import Counter
+from datetime import datetime
+from . import config
+from .storage import connect
+
+DB_NAME = "matches.db"
+
+# Once a corpus has counted this many documents, all its counts are halved, so the
+# document frequencies follow what a subreddit talks about now.
+CORPUS_MAX_DOCS = 20000
+# Entries counted into a corpus are remembered this long, so listings and feeds re-read on
+# every run count each entry once. Entries older than this have left those listings.
+CORPUS_SEEN_SECONDS = 7 * 24 * 3600
+
+
+class MatchStore:
+    """
+    Persistent history of monitor matches in SQLite, with an FTS5 index over
+    title + normalized text for ranked full-text search.
+    """
+
+    def __init__(self, db_path=None):
+        db_path = db_path or config.data_path(DB_NAME)
+        self.conn = connect(db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS matches (
+                id INTEGER PRIMARY KEY,
+                entry_id TEXT UNIQUE,
+                source TEXT NOT NULL,
+                subreddit TEXT NOT NULL,
+                keywords TEXT NOT NULL,
+                title TEXT NOT NULL,
+                link TEXT,
+                published_at REAL,
+                matched_at REAL NOT NULL,
+                text TEXT NOT NULL,
+                score REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_matches_sub_time ON matches(subreddit, matched_at);
+            CREATE INDEX IF NOT EXISTS idx_matches_time ON matches(matched_at);
+            CREATE VIRTUAL TABLE IF NOT EXISTS matches_fts USING fts5(
+                title, text, keywords, content='matches', content_rowid='id'
+            );
+            CREATE TRIGGER IF NOT EXISTS matches_ai AFTER INSERT ON matches BEGIN
+                INSERT INTO matches_fts(rowid, title, text, keywords)
+                VALUES (new.id, new.title, new.text, new.keywords);
+            END;
+            CREATE TRIGGER IF NOT EXISTS matches_ad AFTER DELETE ON matches BEGIN
+                INSERT INTO matches_fts(matches_fts, rowid, title, text, keywords)
+                VALUES ('delete', old.id, old.title, old.text, old.keywords);
+            END;
+            CREATE TABLE IF NOT EXISTS corpus_docs (
+                corpus TEXT NOT NULL,
+                subreddit TEXT NOT NULL,
+                docs REAL NOT NULL,
+                PRIMARY KEY (corpus, subreddit)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS corpus_terms (
+                corpus TEXT NOT NULL,
+                subreddit TEXT NOT NULL,
+                keyword TEXT NOT NULL,
+                df REAL NOT NULL,
+                PRIMARY KEY (corpus, subreddit, keyword)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS corpus_entries (
+                corpus TEXT NOT NULL,
+                entry_id TEXT NOT NULL,
+                counted_at REAL NOT NULL,
+                PRIMARY KEY (corpus, entry_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_corpus_entries_time ON corpus_entries(counted_at);
+        """)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(matches)")}
+        if "score" not in columns:
+            # Databases created before relevance scoring existed
+            self.conn.execute("ALTER TABLE matches ADD COLUMN score REAL")
+        self.conn.commit()
+        self._pending = []
+
+    def add(self, source, subreddit, entry_id, title, link, keywords, text, published_at=None, score=None):
+        """
+        Queues a match; call flush() (or close()) once per scan to write the batch.
+        keywords is a list of keyword strings; published_at a unix timestamp or None.
+        """
+        self._pending.append((
+            entry_id or None, source, subreddit.lower(), ",".join(keywords), title, link,
+            published_at, time.time(), text, score,
+        ))
+
+    def flush(self):
+        if not self._pending:
+            return 0
+        with self.conn:
+            cursor = self.conn.executemany("""
+                INSERT OR IGNORE INTO matches
+                    (entry_id, source, subreddit, keywords, title, link, published_at, matched_at, text, score)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, self._pending)
+        written = cursor.rowcount
+        self._pending = []
+        return written
+
+    def update_corpus(self, entry_ids, subreddits, field_hits, corpus="posts"):
+        """
+        Counts a scanned batch into the per-subreddit document frequencies that scoring takes
+        its IDF from. Every scanned entry counts, matched or not, but only the first time it
+        is seen; posts and comments are kept in separate corpora. entry_ids, subreddits and
+        field_hits have one entry per document (field_hits as for scoring.score_documents).
+        Returns {subreddit: (documents, {keyword: documents with a hit})} after the update,
+        for every subreddit in the batch.
+        """
+        now = time.time()
+        docs = Counter()
+        df = {}
+        with self.conn:
+            self.conn.execute("DELETE FROM corpus_entries WHERE counted_at < ?", (now - CORPUS_SEEN_SECONDS,))
+            for entry_id, subreddit, per_field in zip(entry_ids, subreddits, field_hits):
+                subreddit = subreddit.lower()
+                df.setdefault(subreddit, Counter())
+                if entry_id and not self.conn.execute(
+                    "INSERT OR IGNORE INTO corpus_entries (corpus, entry_id, counted_at) VALUES (?, ?, ?)",
+                    (corpus, entry_id, now),
+                ).rowcount:
+                    continue
+                docs[subreddit] += 1
+                df[subreddit].update({hit.keyword for hits in per_field for hit in hits})
+
+            result = {}
+            for subreddit in df:
+                if docs[subreddit]:
+                    self.conn.execute("""
+                        INSERT INTO corpus_docs (corpus, subreddit, docs) VALUES (?, ?, ?)
+                        ON CONFLICT (corpus, subreddit) DO UPDATE SET docs = docs + excluded.docs
+                    """, (corpus, subreddit, docs[subreddit]))
+                    self.conn.executemany("""
+                        INSERT INTO corpus_terms (corpus, subreddit, keyword, df) VALUES (?, ?, ?, ?)
+                        ON CONFLICT (corpus, subreddit, keyword) DO UPDATE SET df = df + excluded.df
+                    """, [(corpus, subreddit, keyword, hits) for keyword, hits in df[subreddit].items()])
+                row = self.conn.execute("SELECT docs FROM corpus_docs WHERE corpus = ? AND subreddit = ?",
+                                        (corpus, subreddit)).fetchone()
+                total = row[0] if row else 0
+                if total > CORPUS_MAX_DOCS:
+                    self.conn.execute("UPDATE corpus_docs SET docs = docs / 2 WHERE corpus = ? AND subreddit = ?",
+                                      (corpus, subreddit))
+                    self.conn.execute("UPDATE corpus_terms SET df = df / 2 WHERE corpus = ? AND subreddit = ?",
+                                      (corpus, subreddit))
+                    total /= 2
+                frequencies = dict(self.conn.execute(
+                    "SELECT keyword, df FROM corpus_terms WHERE corpus = ? AND subreddit = ?", (corpus, subreddit)
+                ))
+                result[subreddit] = (total, frequencies)
+        return result
+
+    def search(self, query=None, subreddit=None, keyword=None, since=None, until=None, min_score=None, limit=20):
+        """
+        Looks up matches. `query` is an FTS5 expression ranked by bm25;
+        without it, newest matches come first.
+        """
+        where = []
+        params = []
+        if query:
+            sql = """
+                SELECT m.matched_at, m.subreddit, m.keywords, m.title, m.link,
+                       snippet(matches_fts, 1, '[', ']', '...', 12)
+                FROM matches_fts JOIN matches m ON m.id = matches_fts.rowid
+            """
+            where.append("matches_fts MATCH ?")
+            params.append(query)
+            order = "bm25(matches_fts, 10.0, 1.0, 5.0)"
+        else:
+            sql = """
+                SELECT m.matched_at, m.subreddit, m.keywords, m.title, m.link, substr(m.text, 1, 120)
+                FROM matches m
+            """
+            order = "m.matched_at DESC"
+        if subreddit:
+            where.append("m.subreddit = ?")
+            params.append(subreddit.lower())
+        if keyword:
+            # keywords are stored comma separated
+            where.append("(',' || m.keywords || ',') LIKE ?")
+            params.append(f"%,{keyword},%")
+        if min_score is not None:
+            where.append("m.score >= ?")
+            params.append(min_score)
+        if since is not None:
+            where.append("m.matched_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("m.matched_at < ?")
+            params.append(until)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order} LIMIT ?"
+        params.append(limit)
+        return self.conn.execute(sql, params).fetchall()
+
+    def since_id(self, last_id, min_score=None, limit=None, until_id=None):
+        """
+        Returns matches recorded after row id last_id (and up to until_id), oldest first,
+        as dicts (at most limit).
+        """
+        sql = """
+            SELECT id, entry_id, subreddit, keywords, title, link, published_at, matched_at, score
+            FROM matches WHERE id > ?
+        """
+        params = [last_id]
+        if until_id is not None:
+            sql += " AND id <= ?"
+            params.append(until_id)
+        if min_score is not None:
+            sql += " AND score >= ?"
+            params.append(min_score)
+        sql += " ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        columns = ("id", "entry_id", "subreddit", "keywords", "title", "link", "published_at", "matched_at", "score")
+        return [dict(zip(columns, row)) for row in self.conn.execute(sql, params)]
+
+    def max_id(self):
+        return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM matches").fetchone()[0]
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+def parse_date(value):
+    """
+    Accepts YYYY-MM-DD or YYYY-MM-DD HH:MM and returns a unix timestamp.
+    """
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid date: {value} (expected YYYY-MM-DD)")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Search the history of monitor matches.")
+    parser.add_argument("query", nargs="?", help="Full-text query, e.g. 'csv AND merg*' (ranked by relevance)")
+    parser.add_argument("--subreddit", "-s", help="Only matches from this subreddit")
+    parser.add_argument("--keyword", "-k", help="Only matches that hit this keyword")
+    parser.add_argument("--since", help="Start date (YYYY-MM-DD)")
+    parser.add_argument("--until", help="End date, exclusive (YYYY-MM-DD)")
+    parser.add_argument("--min-score", type=float, help="Only matches with at least this relevance score")
+    parser.add_argument("--limit", "-n", type=int, default=20)
+    parser.add_argument("--db", default=None)
+    args = parser.parse_args()
+
+    store = MatchStore(args.db)
+    try:
+        rows = store.search(
+            query=args.query,
+            subreddit=args.subreddit,
+            keyword=args.keyword,
+            since=parse_date(args.since) if args.since else None,
+            until=parse_date(args.until) if args.until else None,
+            min_score=args.min_score,
+            limit=args.limit,
+        )
+    except sqlite3.OperationalError as e:
+        print(f"Invalid query: {e}")
+        rows = []
+    finally:
+        store.close()
+
+    for matched_at, subreddit, keywords, title, link, snippet in rows:
+        when = datetime.fromtimestamp(matched_at).strftime("%Y-%m-%d %H:%M")
+        print(f"\n[{when}] r/{subreddit} ({keywords.replace(',', ', ')})")
+        print(f"{title}")
+        print(f"Link: {link}")
+        print(f"  {snippet}")
+    print(f"\n{len(rows)} result(s).")
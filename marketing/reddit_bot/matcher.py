@@ -0,0 +1,213 @@
+import html
+import re
+from collections import namedtuple
+
+# Default keyword profile used by both monitors.
+# A trailing '*' turns a keyword into a prefix match ("merg*" hits "merge", "merging"),
+# and multi-word entries ("messy data") match as phrases.
+KEYWORDS = ["merge", "combine", "csv", "excel", "messy", "clean"]
+
+# Named keyword profiles. Add a new list here to track a different set of terms.
+KEYWORD_PROFILES = {
+    "default": KEYWORDS,
+}
+
+# Which profiles apply to which subreddit. Subreddits not listed use "default".
+SUBREDDIT_PROFILES = {
+    "excel": ["default"],
+}
+
+Hit = namedtuple("Hit", ["keyword", "start", "end"])
+
+_TAG_RE = re.compile(r"<[^>]*>")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """
+    Strips HTML tags/entities, lowercases and collapses whitespace.
+    Hit offsets returned by the matcher refer to this normalized text.
+    """
+    if not text:
+        return ""
+    if "<" in text:
+        text = _TAG_RE.sub(" ", text)
+    if "&" in text:
+        text = html.unescape(text)
+    return _SPACE_RE.sub(" ", text).strip().lower()
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == "_"
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over every keyword of every profile.
+    One pass over the text finds all hits for all profiles, so the cost
+    depends on the text length, not on how many keywords are configured.
+    """
+
+    def __init__(self, profiles):
+        self.profiles = {name: list(words) for name, words in profiles.items()}
+        # pattern text -> index; one pattern can belong to several profiles
+        self._patterns = []
+        self._prefix = []
+        self._keyword = []
+        self._pattern_profiles = []
+        index = {}
+        for profile, words in self.profiles.items():
+            for word in words:
+                pattern = normalize_text(word)
+                prefix = pattern.endswith("*")
+                if prefix:
+                    pattern = pattern.rstrip("*").rstrip()
+                if not pattern:
+                    continue
+                key = (pattern, prefix)
+                if key not in index:
+                    index[key] = len(self._patterns)
+                    self._patterns.append(pattern)
+                    self._prefix.append(prefix)
+                    self._keyword.append(word)
+                    self._pattern_profiles.append(set())
+                self._pattern_profiles[index[key]].add(profile)
+        self._build()
+
+    def _build(self):
+        goto = [{}]
+        out = [[]]
+        for idx, pattern in enumerate(self._patterns):
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(idx)
+
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                candidate = goto[f].get(ch, 0)
+                fail[nxt] = candidate if candidate != nxt else 0
+                out[nxt] = out[nxt] + out[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def _scan(self, text):
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        patterns = self._patterns
+        prefix = self._prefix
+        state = 0
+        n = len(text)
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not out[state]:
+                continue
+            end = i + 1
+            for idx in out[state]:
+                start = end - len(patterns[idx])
+                if start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if not prefix[idx] and end < n and _is_word_char(text[end]):
+                    continue
+                yield idx, start, end
+
+    def find_all(self, text):
+        """
+        Returns every Hit in already-normalized text, honouring word boundaries.
+        """
+        return [Hit(self._keyword[idx], start, end) for idx, start, end in self._scan(text)]
+
+    def match(self, text, normalized=False):
+        """
+        Matches text against all profiles in one pass.
+        Returns {profile_name: [Hit, ...]} for profiles with at least one hit.
+        """
+        if not normalized:
+            text = normalize_text(text)
+        results = {}
+        for idx, start, end in self._scan(text):
+            hit = Hit(self._keyword[idx], start, end)
+            for profile in self._pattern_profiles[idx]:
+                results.setdefault(profile, []).append(hit)
+        return results
+
+    def match_subreddit(self, subreddit_name, text, normalized=False):
+        """
+        Returns the hits for the profiles assigned to a subreddit.
+        """
+        wanted = set(profiles_for(subreddit_name))
+        if not normalized:
+            text = normalize_text(text)
+        return [
+            Hit(self._keyword[idx], start, end)
+            for idx, start, end in self._scan(text)
+            if self._pattern_profiles[idx] & wanted
+        ]
+
+    def keywords_for(self, subreddit_name):
+        words = []
+        for profile in profiles_for(subreddit_name):
+            for word in self.profiles.get(profile, []):
+                if word not in words:
+                    words.append(word)
+        return words
+
+
+def profiles_for(subreddit_name):
+    return SUBREDDIT_PROFILES.get((subreddit_name or "").lower(), ["default"])
+
+
+_default_matcher = None
+
+
+def get_matcher():
+    """
+    Returns the process-wide matcher compiled from KEYWORD_PROFILES.
+    """
+    global _default_matcher
+    if _default_matcher is None:
+        _default_matcher = KeywordMatcher(KEYWORD_PROFILES)
+    return _default_matcher
+
+
+def unique_keywords(hits):
+    seen = []
+    for hit in hits:
+        if hit.keyword not in seen:
+            seen.append(hit.keyword)
+    return seen
+
+
+def match_fields(matcher, subreddit_name, title, body):
+    """
+    Normalizes and matches title and body separately (for field-weighted scoring).
+    Returns (title_text, body_text, title_hits, body_hits).
+    """
+    title_text = normalize_text(title)
+    body_text = normalize_text(body)
+    return (
+        title_text,
+        body_text,
+        matcher.match_subreddit(subreddit_name, title_text, normalized=True),
+        matcher.match_subreddit(subreddit_name, body_text, normalized=True),
+    )
@@ -0,0 +1,259 @@
+import atexit
+import bisect
+import fcntl
+import os
+import threading
+import time
+from . import config
+from .storage import read_json, write_json, write_text
+
+METRICS_SUBDIR = "metrics"
+# Set REDDIT_BOT_METRICS=0 to turn every hook into a no-op.
+ENABLED = os.getenv("REDDIT_BOT_METRICS", "1") != "0"
+
+# Latency bucket upper bounds in milliseconds (the last bucket is open ended).
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000]
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram. Buckets are the same everywhere, so snapshots
+    from separate runs can simply be added together before taking percentiles.
+    """
+
+    def __init__(self, counts=None, total_ms=0.0):
+        self.counts = list(counts) if counts else [0] * (len(BUCKETS_MS) + 1)
+        self.total_ms = total_ms
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.total_ms += ms
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total_ms += other.total_ms
+
+    def percentile(self, q):
+        """
+        Estimates the q-th percentile (0-100) by interpolating inside the bucket it falls in.
+        """
+        total = self.count
+        if not total:
+            return None
+        rank = q / 100.0 * total
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                low = BUCKETS_MS[i - 1] if i > 0 else 0.0
+                high = BUCKETS_MS[i] if i < len(BUCKETS_MS) else BUCKETS_MS[-1] * 2
+                return low + (high - low) * (rank - seen) / n
+            seen += n
+        return float(BUCKETS_MS[-1])
+
+    def to_dict(self):
+        return {"counts": self.counts, "total_ms": self.total_ms}
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("registry", "stage", "started")
+
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.stage, (time.perf_counter() - self.started) * 1000.0)
+        if exc_type is not None:
+            self.registry.error(self.stage)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.errors = {}
+        self.started = time.time()
+
+    def observe(self, stage, ms):
+        with self.lock:
+            hist = self.histograms.get(stage)
+            if hist is None:
+                hist = self.histograms[stage] = Histogram()
+            hist.observe(ms)
+
+    def incr(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def error(self, stage):
+        with self.lock:
+            self.errors[stage] = self.errors.get(stage, 0) + 1
+
+
+_registry = Registry()
+_job = None
+
+
+def timer(stage):
+    """
+    Context manager timing one operation of a stage (fetch, parse, match, reply, notify, ...).
+    An exception escaping the block also counts as an error for that stage.
+    """
+    if not ENABLED:
+        return _NULL_TIMER
+    return _Timer(_registry, stage)
+
+
+def incr(name, n=1):
+    if ENABLED:
+        _registry.incr(name, n)
+
+
+def error(stage):
+    if ENABLED:
+        _registry.error(stage)
+
+
+def init(job):
+    """
+    Names the current run's job and writes its metrics when the process exits.
+    """
+    global _job
+    if not ENABLED or _job is not None:
+        return
+    _job = job
+    atexit.register(flush)
+
+
+def snapshot_path(job, ext="json"):
+    return config.data_path(METRICS_SUBDIR, f"{job}.{ext}")
+
+
+def flush():
+    """
+    Adds this run's numbers to the job's cumulative snapshot (JSON) and rewrites its
+    Prometheus textfile. The snapshot is reset whenever the daily report consumes it.
+    """
+    if not ENABLED or _job is None:
+        return
+    with _registry.lock:
+        histograms = dict(_registry.histograms)
+        counters = dict(_registry.counters)
+        errors = dict(_registry.errors)
+        run_seconds = time.time() - _registry.started
+        _registry.histograms, _registry.counters, _registry.errors = {}, {}, {}
+        _registry.started = time.time()
+
+    os.makedirs(config.data_path(METRICS_SUBDIR), exist_ok=True)
+    path = snapshot_path(_job)
+    with open(path + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        data = read_json(path) or {"job": _job, "since": time.time(), "runs": 0, "run_seconds": 0.0,
+                               "histograms": {}, "counters": {}, "errors": {}}
+        data["runs"] += 1
+        data["run_seconds"] += run_seconds
+        data["updated"] = time.time()
+        for stage, hist in histograms.items():
+            merged = Histogram(**data["histograms"].get(stage, {}))
+            merged.merge(hist)
+            data["histograms"][stage] = merged.to_dict()
+        for name, n in counters.items():
+            data["counters"][name] = data["counters"].get(name, 0) + n
+        for stage, n in errors.items():
+            data["errors"][stage] = data["errors"].get(stage, 0) + n
+        write_json(path, data)
+        write_text(snapshot_path(_job, "prom"), to_prometheus(data))
+
+
+def to_prometheus(data):
+    """
+    Renders a snapshot in the node_exporter textfile format.
+    """
+    job = data["job"]
+    lines = [
+        "# TYPE reddit_bot_stage_latency_ms histogram",
+    ]
+    for stage, raw in sorted(data["histograms"].items()):
+        hist = Histogram(**raw)
+        cumulative = 0
+        for bound, n in zip(BUCKETS_MS + ["+Inf"], hist.counts):
+            cumulative += n
+            lines.append(f'reddit_bot_stage_latency_ms_bucket{{job="{job}",stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'reddit_bot_stage_latency_ms_sum{{job="{job}",stage="{stage}"}} {hist.total_ms:.3f}')
+        lines.append(f'reddit_bot_stage_latency_ms_count{{job="{job}",stage="{stage}"}} {hist.count}')
+    lines.append("# TYPE reddit_bot_items_total counter")
+    for name, n in sorted(data["counters"].items()):
+        lines.append(f'reddit_bot_items_total{{job="{job}",name="{name}"}} {n}')
+    lines.append("# TYPE reddit_bot_errors_total counter")
+    for stage, n in sorted(data["errors"].items()):
+        lines.append(f'reddit_bot_errors_total{{job="{job}",stage="{stage}"}} {n}')
+    lines.append("# TYPE reddit_bot_runs_total counter")
+    lines.append(f'reddit_bot_runs_total{{job="{job}"}} {data["runs"]}')
+    return "\n".join(lines) + "\n"
+
+
+def collect_snapshots(reset=False):
+    """
+    Returns every job's snapshot. With reset, the snapshots are moved aside so the
+    next report covers only the runs after this one.
+    """
+    metrics_dir = config.data_path(METRICS_SUBDIR)
+    if not os.path.isdir(metrics_dir):
+        return []
+    snapshots = []
+    for name in sorted(os.listdir(metrics_dir)):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(metrics_dir, name)
+        with open(path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            data = read_json(path)
+            if data is None:
+                continue
+            snapshots.append(data)
+            if reset:
+                os.replace(path, path + ".prev")
+    return snapshots
+
+
+def summarize(data):
+    """
+    Turns a snapshot into report lines: per-stage p50/p95/p99 and error counts, plus throughput.
+    """
+    lines = []
+    entries = data["counters"].get("entries", 0)
+    throughput = f" · {entries / data['run_seconds']:.1f} entries/s" if entries and data["run_seconds"] else ""
+    lines.append(f"**{data['job']}** · {data['runs']} runs · {entries} entries{throughput}")
+    for stage, raw in sorted(data["histograms"].items()):
+        hist = Histogram(**raw)
+        errors = data["errors"].get(stage, 0)
+        err = f" · ❗{errors} errors" if errors else ""
+        lines.append(
+            f"- {stage}: n={hist.count} p50={hist.percentile(50):.0f}ms "
+            f"p95={hist.percentile(95):.0f}ms p99={hist.percentile(99):.0f}ms{err}"
+        )
+    others = {k: v for k, v in data["counters"].items() if k != "entries"}
+    if others:
+        lines.append("- " + ", ".join(f"{k}={v}" for k, v in sorted(others.items())))
+    return "\n".join(lines)
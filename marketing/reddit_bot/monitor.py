@@ -1,86 +1,406 @@
-import praw
 import time
 import os
-from . import config
+from . import config, metrics
+from .match_store import MatchStore
+from .matcher import get_matcher, match_fields, unique_keywords
+from .rate_limit import priority
+from .reddit_client import get_reddit
+from .reply_rules import RuleTable
+from .scoring import score_documents, rank, text_length, DEFAULT_MIN_SCORE
+from .storage import read_json, write_json
 
-KEYWORDS = ["merge", "combine", "csv", "excel", "messy", "clean"]
+INBOX_CHECKPOINT_NAME = "inbox_checkpoint.json"
+# Reddit accepts up to 25 fullnames per read_message call
+MARK_READ_BATCH = 25
+COMMENT_CHECKPOINT_NAME = "comment_checkpoint.json"
+# Comments read per scan at most; the listing serves them 100 per request.
+DEFAULT_COMMENT_LIMIT = 300
+# Reddit accepts up to 100 fullnames per /api/info call
+INFO_BATCH = 100
 
-def monitor_subreddit(subreddit_name="excel", limit=10):
+@priority("scan")
+def monitor_subreddit(subreddit_name="excel", limit=10, min_score=DEFAULT_MIN_SCORE, dedupe=True, export=False):
     """
     Scans a subreddit for relevant posts to 'Solve'.
+    Matches are scored as one batch and printed best first.
+    With dedupe, matches repeating a post matched earlier (crossposts, reposts) are skipped.
+    With export, every scanned submission and its outcome is appended to the Parquet scan history.
     """
     valid, msg = config.validate_config()
     if not valid:
         print(f"Error: {msg}")
         return
 
-    reddit = praw.Reddit(
-        client_id=config.REDDIT_CLIENT_ID,
-        client_secret=config.REDDIT_CLIENT_SECRET,
-        user_agent=config.REDDIT_USER_AGENT,
-        username=config.REDDIT_USERNAME,
-        password=config.REDDIT_PASSWORD
-    )
+    reddit = get_reddit()
 
-    print(f"Scanning r/{subreddit_name} for keywords: {KEYWORDS}...")
+    matcher = get_matcher()
+    print(f"Scanning r/{subreddit_name} for keywords: {matcher.keywords_for(subreddit_name)}...")
     subreddit = reddit.subreddit(subreddit_name)
-    
-    for submission in subreddit.new(limit=limit):
-        text = (submission.title + " " + submission.selftext).lower()
-        if any(kw in text for kw in KEYWORDS):
-            print(f"\n[MATCH] {submission.title}")
+    store = MatchStore()
+    index = None
+    if dedupe:
+        from .dedupe import DedupeIndex
+        index = DedupeIndex()
+    exporter = None
+    if export:
+        from .export import ScanExporter
+        exporter = ScanExporter()
+
+    try:
+        with metrics.timer("fetch"):
+            submissions = list(subreddit.new(limit=limit))
+        if not submissions:
+            print("No posts found.")
+            return
+        with metrics.timer("match"):
+            scanned = [
+                (submission, *match_fields(matcher, subreddit_name, submission.title, submission.selftext))
+                for submission in submissions
+            ]
+        metrics.incr("entries", len(scanned))
+        corpus = store.update_corpus([submission.fullname for submission, _, _, _, _ in scanned],
+                                     [subreddit_name] * len(scanned),
+                                     [(title_hits, body_hits) for _, _, _, title_hits, body_hits in scanned])
+        if index is not None:
+            kept = _drop_duplicates(scanned, subreddit_name, index)
+            if exporter is not None:
+                kept_ids = {id(item) for item in kept}
+                for item in scanned:
+                    if id(item) not in kept_ids:
+                        _export_submission(exporter, subreddit_name, item, duplicate=True)
+            scanned = kept
+
+        with metrics.timer("score"):
+            scores = score_documents(
+                [(title_hits, body_hits) for _, _, _, title_hits, body_hits in scanned],
+                [(text_length(title_text), text_length(body_text)) for _, title_text, body_text, _, _ in scanned],
+                corpora=[corpus[subreddit_name.lower()]] * len(scanned),
+            )
+        for score, (submission, title_text, body_text, title_hits, body_hits) in zip(scores, scanned):
+            if title_hits or body_hits:
+                store.add("api", subreddit_name, submission.fullname, submission.title,
+                          f"https://www.reddit.com{submission.permalink}", unique_keywords(title_hits + body_hits),
+                          title_text + " " + body_text, submission.created_utc, float(score))
+                metrics.incr("matches")
+
+        ranked = rank(scanned, scores, min_score)
+        metrics.incr("relevant", len(ranked))
+        if exporter is not None:
+            relevant = {id(item) for _, item in ranked}
+            for score, item in zip(scores, scanned):
+                _export_submission(exporter, subreddit_name, item, float(score), id(item) in relevant)
+        for score, (submission, _, _, title_hits, body_hits) in ranked:
+            print(f"\n[MATCH {score:.2f}] {submission.title}")
+            print(f"Keywords: {', '.join(unique_keywords(title_hits + body_hits))}")
             print(f"Link: {submission.url}")
             print("------------------------------------------------")
+    finally:
+        store.close()
+        if index is not None:
+            index.close()
+        if exporter is not None:
+            exporter.close()
+
+def _export_submission(exporter, subreddit_name, item, score=None, relevant=False, duplicate=False):
+    submission, _, _, title_hits, body_hits = item
+    exporter.add("api", subreddit_name, submission.fullname, submission.title, submission.created_utc,
+                 unique_keywords(title_hits + body_hits), len(title_hits), len(body_hits), score, relevant, duplicate)
+
+def _drop_duplicates(scanned, subreddit_name, index):
+    """
+    Removes matched submissions that repeat a post matched before, printing where each was first seen.
+    """
+    kept = []
+    for item in scanned:
+        submission, title_text, body_text, title_hits, body_hits = item
+        original = None
+        if title_hits or body_hits:
+            original = index.check(submission.fullname, subreddit_name, submission.title,
+                                   f"https://www.reddit.com{submission.permalink}", title_text + " " + body_text)
+        if original is None:
+            kept.append(item)
+        else:
+            print(f"[DUPLICATE] {submission.title} (first seen in r/{original['subreddit']}: {original['link']})")
+    metrics.incr("duplicates", len(scanned) - len(kept))
+    return kept
+
+def _load_comment_checkpoint(key):
+    return read_json(config.data_path(COMMENT_CHECKPOINT_NAME), {}).get(key)
+
+def _save_comment_checkpoint(key, last_id):
+    path = config.data_path(COMMENT_CHECKPOINT_NAME)
+    checkpoints = read_json(path, {})
+    checkpoints[key] = last_id
+    write_json(path, checkpoints)
+
+def _new_comments(reddit, subreddit_names, last_id, limit):
+    """
+    Yields comments of all subreddit_names newer than last_id (the base-36 id as an int), newest first.
+    Reads at most limit comments and stops at the first one an earlier scan already covered.
+    """
+    for comment in reddit.subreddit("+".join(subreddit_names)).comments(limit=limit):
+        if last_id is not None and int(comment.id, 36) <= last_id:
+            return
+        yield comment
+
+def resolve_parents(reddit, fullnames, cache):
+    """
+    Returns {fullname: {"title", "body", "permalink"}} for submissions/comments by fullname.
+    Cached ones are reused; the rest are fetched with one /api/info request per INFO_BATCH and cached.
+    """
+    wanted = set(fullnames)
+    parents = cache.get_many(wanted)
+    missing = sorted(wanted - parents.keys())
+    fetched = {}
+    for i in range(0, len(missing), INFO_BATCH):
+        with metrics.timer("lookup"):
+            for thing in reddit.info(fullnames=missing[i:i + INFO_BATCH]):
+                fetched[thing.fullname] = {
+                    "title": getattr(thing, "title", None),
+                    "body": getattr(thing, "selftext", None) or getattr(thing, "body", None) or "",
+                    "permalink": f"https://www.reddit.com{thing.permalink}",
+                }
+    cache.put_many(fetched)
+    parents.update(fetched)
+    metrics.incr("parent_cache_hits", len(wanted) - len(missing))
+    return parents
+
+@priority("scan")
+def monitor_comments(subreddit_names=("excel",), limit=DEFAULT_COMMENT_LIMIT, min_score=DEFAULT_MIN_SCORE, reddit=None,
+                     export=False):
+    """
+    Scans new comments across subreddit_names for relevant questions, through one combined
+    r/a+b+c comment listing. Only comments newer than the previous scan are matched.
+    Matched comments get their thread and the comment they reply to as context, looked up in
+    batches through a persistent cache. A scan therefore costs at most limit/100 listing
+    requests plus one lookup per 100 uncached parents, however busy the subreddits are.
+    With export, every scanned comment and its outcome is appended to the Parquet scan history.
+    Returns the number of comments scanned.
+    """
+    valid, msg = config.validate_config()
+    if not valid:
+        print(f"Error: {msg}")
+        return 0
+
+    if reddit is None:
+        reddit = get_reddit()
+    subreddit_names = list(subreddit_names)
+    key = "+".join(sorted(name.lower() for name in subreddit_names))
+    last_id = _load_comment_checkpoint(key)
+    matcher = get_matcher()
+    print(f"Scanning new comments in r/{'+'.join(subreddit_names)}...")
+
+    with metrics.timer("fetch"):
+        comments = list(_new_comments(reddit, subreddit_names, last_id, limit))
+    if last_id is not None and len(comments) >= limit:
+        print(f"Warning: more than {limit} new comments since the last scan; older ones were skipped. "
+              f"Scan more often or raise --limit.")
+    metrics.incr("entries", len(comments))
+
+    with metrics.timer("match"):
+        scanned = []
+        all_hits = []
+        for comment in comments:
+            subreddit_name = str(comment.subreddit)
+            _, body_text, _, body_hits = match_fields(matcher, subreddit_name, "", comment.body)
+            all_hits.append(([], body_hits))
+            if body_hits:
+                scanned.append((comment, subreddit_name, body_text, body_hits))
+    metrics.incr("matches", len(scanned))
+
+    exporter = None
+    if export:
+        from .export import ScanExporter
+        exporter = ScanExporter()
+    store = MatchStore()
+    from .parent_cache import ParentCache
+    cache = ParentCache()
+    try:
+        parent_ids = [comment.link_id for comment, _, _, _ in scanned]
+        parent_ids += [comment.parent_id for comment, _, _, _ in scanned if comment.parent_id.startswith("t1_")]
+        parents = resolve_parents(reddit, parent_ids, cache)
+
+        # Only matched comments are scored, but every comment read counts towards the IDF.
+        corpora = store.update_corpus([comment.fullname for comment in comments],
+                                      [str(comment.subreddit) for comment in comments], all_hits, corpus="comments")
+        with metrics.timer("score"):
+            scores = score_documents(
+                [([], body_hits) for _, _, _, body_hits in scanned],
+                [(0, text_length(body_text)) for _, _, body_text, _ in scanned],
+                corpora=[corpora[subreddit_name.lower()] for _, subreddit_name, _, _ in scanned],
+            )
+        for score, (comment, subreddit_name, body_text, body_hits) in zip(scores, scanned):
+            thread = parents.get(comment.link_id) or {}
+            store.add("comment", subreddit_name, comment.fullname,
+                      f"Re: {thread.get('title') or getattr(comment, 'link_title', '')}",
+                      f"https://www.reddit.com{comment.permalink}", unique_keywords(body_hits), body_text,
+                      comment.created_utc, float(score))
+
+        ranked = rank(scanned, scores, min_score)
+        metrics.incr("relevant", len(ranked))
+        if exporter is not None:
+            # Unmatched comments have no score; all_hits lines up with comments
+            scores_by_name = {comment.fullname: float(score) for score, (comment, _, _, _) in zip(scores, scanned)}
+            relevant = {comment.fullname for _, (comment, _, _, _) in ranked}
+            for comment, (_, body_hits) in zip(comments, all_hits):
+                thread = parents.get(comment.link_id) or {}
+                exporter.add("comment", str(comment.subreddit), comment.fullname,
+                             f"Re: {thread.get('title') or getattr(comment, 'link_title', '')}", comment.created_utc,
+                             unique_keywords(body_hits), 0, len(body_hits),
+                             scores_by_name.get(comment.fullname), comment.fullname in relevant)
+        for score, (comment, subreddit_name, _, body_hits) in ranked:
+            thread = parents.get(comment.link_id) or {}
+            print(f"\n[MATCH {score:.2f}] r/{subreddit_name} comment by u/{comment.author}: {comment.body[:200]}")
+            print(f"Thread: {thread.get('title') or getattr(comment, 'link_title', '')}")
+            replied_to = parents.get(comment.parent_id)
+            if comment.parent_id.startswith("t1_") and replied_to:
+                print(f"Replying to: {replied_to['body'][:200]}")
+            print(f"Keywords: {', '.join(unique_keywords(body_hits))}")
+            print(f"Link: https://www.reddit.com{comment.permalink}")
+            print("------------------------------------------------")
+    finally:
+        store.close()
+        cache.close()
+        if exporter is not None:
+            exporter.close()
+
+    if comments:
+        _save_comment_checkpoint(key, max(int(comment.id, 36) for comment in comments))
+    print(f"Scanned {len(comments)} new comments, {len(scanned)} keyword matches.")
+    return len(comments)
+
+def _load_inbox_checkpoint():
+    return read_json(config.data_path(INBOX_CHECKPOINT_NAME))
+
+def _save_inbox_checkpoint(checkpoint):
+    write_json(config.data_path(INBOX_CHECKPOINT_NAME), checkpoint)
+
+def _clear_inbox_checkpoint():
+    path = config.data_path(INBOX_CHECKPOINT_NAME)
+    if os.path.exists(path):
+        os.remove(path)
+
+def _mark_read(reddit, fullnames):
+    """
+    Marks messages read with one request per MARK_READ_BATCH fullnames.
+    """
+    for i in range(0, len(fullnames), MARK_READ_BATCH):
+        with metrics.timer("mark_read"):
+            reddit.post("api/read_message/", data={"id": ",".join(fullnames[i:i + MARK_READ_BATCH])})
+
+def _unread_messages(reddit, checkpoint):
+    """
+    Yields (message, already_handled) newest first, one listing page (100 items) at a time.
+    Messages inside the range a previous, interrupted run got through are flagged as already handled.
+    """
+    for message in reddit.inbox.unread(limit=None):
+        handled = (
+            checkpoint is not None
+            and checkpoint["last_created"] <= message.created_utc <= checkpoint["newest_created"]
+        )
+        yield message, handled
 
-def check_inbox_and_reply():
+@priority("inbox")
+def check_inbox_and_reply(send_replies=False, rules=None, reddit=None):
     """
-    Checks inbox for unread replies and auto-replies (Simple Rule-based).
+    Checks inbox for unread replies and auto-replies using the rules in reply_rules.json.
+    Messages are handled as listing pages arrive; progress is checkpointed after every message
+    so an interrupted run resumes where it stopped. Replied messages are marked read in batches.
+    Without send_replies, replies are only printed (dry run).
+    Uses the shared client from reddit_client unless a praw.Reddit is passed in.
+    Returns the number of messages handled.
     """
     valid, msg = config.validate_config()
-    if not valid: return
-
-    reddit = praw.Reddit(
-        client_id=config.REDDIT_CLIENT_ID,
-        client_secret=config.REDDIT_CLIENT_SECRET,
-        user_agent=config.REDDIT_USER_AGENT,
-        username=config.REDDIT_USERNAME,
-        password=config.REDDIT_PASSWORD
-    )
+    if not valid: return 0
+
+    if reddit is None:
+        reddit = get_reddit()
     
+    if rules is None:
+        rules = RuleTable()
+
     print("Checking inbox for new messages...")
-    # Get unread messages
-    unread = list(reddit.inbox.unread(limit=None))
-    print(f"Found {len(unread)} unread messages.")
-    
-    for message in unread:
+    checkpoint = _load_inbox_checkpoint()
+    to_mark = []
+    if checkpoint is not None:
+        print(f"Resuming after {checkpoint['last_id']} from an interrupted run.")
+        if send_replies and checkpoint.get("pending_read"):
+            _mark_read(reddit, checkpoint["pending_read"])
+        checkpoint["pending_read"] = []
+
+    handled_count = 0
+    current = None
+    for message, already_handled in _unread_messages(reddit, checkpoint):
+        # The listing cursor only moves past messages we've already seen, so the
+        # previous batch can be marked read without disturbing pagination.
+        if len(to_mark) >= MARK_READ_BATCH:
+            _mark_read(reddit, to_mark)
+            to_mark = []
+
+        if already_handled:
+            continue
+
+        handled_count += 1
+        metrics.incr("entries")
         print(f"New message from {message.author}: {message.body}")
-        
-        # Simple Auto-Reply Logic
-        body_lower = message.body.lower()
-        reply_text = None
-        
-        if "link" in body_lower or "url" in body_lower:
-            reply_text = "Here is the link to the tool: [Your URL Here]. It runs 100% locally!"
-        elif "price" in body_lower or "cost" in body_lower:
-            reply_text = "It is completely free to use right now!"
-        elif "safe" in body_lower or "security" in body_lower:
-            reply_text = "Yes, it is safe. All processing happens in your browser, no data is uploaded to any server."
+        rule, reply_text = rules.reply_for(message.body, author=message.author, subject=getattr(message, "subject", ""))
             
         if reply_text:
-            print(f"-> Replying: {reply_text}")
-            # Uncomment to enable actual replying
-            # message.reply(reply_text)
-            # message.mark_read()
+            print(f"-> Replying ({rule.name}): {reply_text}")
+            if send_replies:
+                with metrics.timer("reply"):
+                    message.reply(reply_text)
+                metrics.incr("replies")
+                to_mark.append(message.fullname)
         else:
             print("-> No auto-reply rule matched.")
 
+        if current is None:
+            current = {"newest_created": message.created_utc}
+        current.update(last_id=message.fullname, last_created=message.created_utc, pending_read=to_mark)
+        _save_inbox_checkpoint(current)
+
+    if send_replies and to_mark:
+        _mark_read(reddit, to_mark)
+    _clear_inbox_checkpoint()
+    print(f"Handled {handled_count} unread messages.")
+    return handled_count
+
 if __name__ == "__main__":
     import argparse
+    from .profiling import add_profile_argument, profiled
     parser = argparse.ArgumentParser()
-    parser.add_argument("--mode", choices=["scan", "inbox"], default="scan")
+    parser.add_argument("--mode", choices=["scan", "inbox", "comments"], default="scan")
+    parser.add_argument("--subreddit", action="append", help="Subreddit to scan (repeatable, default: excel)")
+    parser.add_argument("--limit", type=int, default=DEFAULT_COMMENT_LIMIT, help="Comments mode: max new comments read per run")
+    parser.add_argument("--min-score", type=float, default=DEFAULT_MIN_SCORE, help="Only print matches scoring at least this much")
+    parser.add_argument("--digest", action="store_true", help="Send a Feishu digest of new matches once the digest window has passed")
+    parser.add_argument("--trends", action="store_true", help="Scan/comments mode: update keyword trends and alert on spikes")
+    parser.add_argument("--send", action="store_true", help="Inbox mode: actually reply and mark replied messages read")
+    parser.add_argument("--no-dedupe", action="store_true", help="Scan mode: report crossposts and reposts of earlier matches again")
+    parser.add_argument("--export", action="store_true", help="Scan/comments mode: append every scanned entry to the Parquet scan history (needs pyarrow)")
+    add_profile_argument(parser)
     args = parser.parse_args()
     
-    if args.mode == "scan":
-        monitor_subreddit()
-    elif args.mode == "inbox":
-        check_inbox_and_reply()
+    metrics.init(f"monitor_{args.mode}")
+    with profiled(f"monitor_{args.mode}", args.profile):
+        if args.mode == "scan":
+            for name in args.subreddit or ["excel"]:
+                monitor_subreddit(name, min_score=args.min_score, dedupe=not args.no_dedupe, export=args.export)
+            if args.digest:
+                from .digest import send_digest
+                send_digest(min_score=args.min_score)
+            if args.trends:
+                from .trends import check_trends
+                check_trends()
+        elif args.mode == "inbox":
+            check_inbox_and_reply(send_replies=args.send)
+        elif args.mode == "comments":
+            monitor_comments(args.subreddit or ["excel"], limit=args.limit, min_score=args.min_score,
+                             export=args.export)
+            if args.digest:
+                from .digest import send_digest
+                send_digest(min_score=args.min_score)
+            if args.trends:
+                from .trends import check_trends
+                check_trends()
@@ -1,46 +1,313 @@
-import feedparser
 import time
-import ssl
-from . import config
-
-# Bypass SSL verification for RSS feeds
-if hasattr(ssl, '_create_unverified_context'):
-    ssl._create_default_https_context = ssl._create_unverified_context
-
-KEYWORDS = ["merge", "combine", "csv", "excel", "messy", "clean"]
-
-def monitor_subreddit_rss(subreddit_name="excel"):
-    """
-    Scans a subreddit using RSS (No Login Required).
-    """
-    rss_url = f"https://www.reddit.com/r/{subreddit_name}/new/.rss"
-    print(f"Scanning {rss_url} for keywords: {KEYWORDS}...")
-    
-    feed = feedparser.parse(rss_url)
-    
-    if feed.bozo:
-        print(f"Error parsing RSS: {feed.bozo_exception}")
-        return
-
-    found_count = 0
-    for entry in feed.entries:
-        # Check title and content (summary)
-        # Note: entry.summary usually contains HTML, so simple keyword check works but might match tags.
-        text = (entry.title + " " + getattr(entry, 'summary', '')).lower()
-        
-        if any(kw in text for kw in KEYWORDS):
-            found_count += 1
-            print(f"\n[MATCH] {entry.title}")
-            print(f"Link: {entry.link}")
-            print(f"Date: {entry.published}")
-            print("------------------------------------------------")
-            
-    print(f"Scan complete. Found {found_count} relevant posts.")
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from . import config, enrichment, metrics
+from .feed_parser import parse_feed, FeedParseError
+from .http_client import get_session
+from .match_store import MatchStore
+from .matcher import get_matcher, match_fields, unique_keywords
+from .scoring import score_documents, rank, text_length, DEFAULT_MIN_SCORE
+
+# Bytes handed to the parser per read from the socket
+STREAM_CHUNK_SIZE = 16 * 1024
+
+RSS_URL_TEMPLATE = "https://www.reddit.com/r/{}/new/.rss"
+DEFAULT_CONCURRENCY = 8
+
+_SUBREDDIT_IN_URL = re.compile(r"/r/([^/]+)")
+
+ScanResult = namedtuple("ScanResult", ["subreddit", "entry", "title_text", "body_text", "title_hits", "body_hits"])
+
+def feed_for(line):
+    """
+    Turns a subreddit name ("excel", "r/excel") or a feed URL into (subreddit, url).
+    """
+    line = line.strip()
+    if line.startswith("http://") or line.startswith("https://"):
+        match = _SUBREDDIT_IN_URL.search(line)
+        return (match.group(1) if match else line), line
+    name = line[2:] if line.startswith("r/") else line
+    return name, RSS_URL_TEMPLATE.format(name)
+
+def load_feeds(path):
+    """
+    Reads one subreddit name or feed URL per line. Blank lines and '#' comments are ignored.
+    """
+    feeds = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                feeds.append(feed_for(line))
+    return feeds
+
+def fetch_feed(rss_url, headers=None, session=None):
+    """
+    Downloads a feed over the shared keep-alive session and parses it while it streams in.
+    Extra headers carry the saved ETag/Last-Modified so an unchanged feed comes back as an empty 304.
+    Returns (list of FeedEntry or None if not modified, validators).
+    """
+    import urllib3
+
+    session = session or get_session()
+    # Bypass SSL verification for RSS feeds
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    with metrics.timer("fetch"):
+        response = session.get(rss_url, headers=headers, timeout=30, verify=False, stream=True)
+    with response:
+        if response.status_code == 304:
+            metrics.incr("not_modified")
+            return None, None
+        if not response.ok:
+            metrics.error("fetch")
+        response.raise_for_status()
+
+        validators = (response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        # The body is still streaming in, so "parse" includes the download of the body.
+        with metrics.timer("parse"):
+            entries = parse_feed(response.iter_content(STREAM_CHUNK_SIZE))
+        return entries, validators
+
+def published_timestamp(value):
+    """
+    Converts an Atom/RSS date string to a unix timestamp (None if unparseable).
+    """
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+def scan_feed(subreddit_name, entries, matcher, state=None):
+    """
+    Matches the entries of one parsed feed.
+    Returns a ScanResult for every (new) entry, matched or not - the whole batch feeds the scoring IDF.
+    """
+    total = len(entries)
+    if state is not None:
+        unseen = state.filter_unseen([entry.id for entry in entries])
+        entries = [entry for entry in entries if not entry.id or entry.id in unseen]
+        print(f"r/{subreddit_name}: {len(entries)} new entries out of {total}.")
+
+    results = []
+    with metrics.timer("match"):
+        for entry in entries:
+            # Check title and content (summary)
+            # entry.summary is HTML, so tags are stripped before matching.
+            results.append(ScanResult(subreddit_name, entry, *match_fields(matcher, subreddit_name, entry.title, entry.summary)))
+    metrics.incr("entries", len(results))
+
+    if state is not None:
+        state.mark_seen([entry.id for entry in entries])
+    return results
+
+def drop_duplicates(results, dedupe):
+    """
+    Removes matched entries that repeat a post matched before (crossposts, edited reposts),
+    printing where each one was first seen. Unmatched entries are kept.
+    """
+    kept = []
+    for r in results:
+        original = None
+        if r.title_hits or r.body_hits:
+            original = dedupe.check(r.entry.id or r.entry.link, r.subreddit, r.entry.title, r.entry.link,
+                                    r.title_text + " " + r.body_text)
+        if original is None:
+            kept.append(r)
+        else:
+            print(f"[DUPLICATE] r/{r.subreddit}: {r.entry.title} (first seen in r/{original['subreddit']}: {original['link']})")
+    metrics.incr("duplicates", len(results) - len(kept))
+    return kept
+
+def export_result(exporter, r, score=None, relevant=False, duplicate=False):
+    exporter.add("rss", r.subreddit, r.entry.id or r.entry.link, r.entry.title, published_timestamp(r.entry.published),
+                 unique_keywords(r.title_hits + r.body_hits), len(r.title_hits), len(r.body_hits),
+                 score, relevant, duplicate)
+
+def report_matches(results, store=None, min_score=DEFAULT_MIN_SCORE, enrich=False, exporter=None, corpora=None):
+    """
+    Scores the scanned batch in one go, prints matches at or above min_score (best first)
+    and queues every match in the store with its score.
+    corpora ({subreddit: corpus}, see MatchStore.update_corpus) supplies the IDF; without it
+    the batch itself does.
+    With enrich, the printed matches (and only those) get their votes, comment count and flair,
+    fetched in bulk and cached (see enrichment).
+    With an exporter (see export), every scanned entry is recorded with its score and outcome.
+    Returns the number of printed matches.
+    """
+    with metrics.timer("score"):
+        scores = score_documents(
+            [(r.title_hits, r.body_hits) for r in results],
+            [(text_length(r.title_text), text_length(r.body_text)) for r in results],
+            corpora=[corpora[r.subreddit.lower()] for r in results] if corpora is not None else None,
+        )
+    if store is not None:
+        for score, r in zip(scores, results):
+            if r.title_hits or r.body_hits:
+                store.add("rss", r.subreddit, r.entry.id, r.entry.title, r.entry.link,
+                          unique_keywords(r.title_hits + r.body_hits), r.title_text + " " + r.body_text,
+                          published_timestamp(r.entry.published), float(score))
+
+    ranked = rank(results, scores, min_score)
+    metrics.incr("relevant", len(ranked))
+    if exporter is not None:
+        relevant = {id(r) for _, r in ranked}
+        for score, r in zip(scores, results):
+            export_result(exporter, r, float(score), id(r) in relevant)
+    details = {}
+    if enrich and ranked:
+        details = enrichment.enrich([r.entry.id for _, r in ranked])
+    for score, r in ranked:
+        print(f"\n[MATCH {score:.2f}] r/{r.subreddit}: {r.entry.title}")
+        print(f"Keywords: {', '.join(unique_keywords(r.title_hits + r.body_hits))}")
+        if r.entry.id in details:
+            print(f"Reddit: {enrichment.describe(details[r.entry.id])}")
+        print(f"Link: {r.entry.link}")
+        print(f"Date: {r.entry.published}")
+        print("------------------------------------------------")
+    return len(ranked)
+
+def monitor_subreddit_rss(subreddit_name="excel", incremental=False, concurrency=DEFAULT_CONCURRENCY, feeds_file=None,
+                          min_score=DEFAULT_MIN_SCORE, dedupe=True, enrich=True, export=False):
+    """
+    Scans one or more subreddits using RSS (No Login Required).
+    subreddit_name may be a single name or a list; feeds_file adds one subreddit/feed URL per line.
+    Feeds are fetched concurrently (at most `concurrency` at once) and matched as each one arrives;
+    matches are then scored together and only those at or above min_score are printed.
+    In incremental mode, unchanged feeds and already-processed entries are skipped.
+    With dedupe, matches repeating a post matched earlier (in any subreddit) are reported once only.
+    With enrich, reported matches are shown with their votes, comment count and flair.
+    With export, every scanned entry and its outcome is appended to the Parquet scan history.
+    Returns {"feeds": {url: new entries, 0 if not modified, None on error},
+             "entries": n, "matches": n, "duplicates": n, "relevant": n}.
+    """
+    import requests
+
+    names = [subreddit_name] if isinstance(subreddit_name, str) else list(subreddit_name or [])
+    feeds = [feed_for(name) for name in names]
+    if feeds_file:
+        feeds.extend(load_feeds(feeds_file))
+    # Drop duplicate URLs, keeping order
+    feeds = list({url: (name, url) for name, url in feeds}.values())
+    summary = {"feeds": {url: None for _, url in feeds}, "entries": 0, "matches": 0, "duplicates": 0, "relevant": 0}
+    if not feeds:
+        print("No feeds to scan.")
+        return summary
+
+    matcher = get_matcher()
+    concurrency = max(1, min(concurrency, len(feeds)))
+    print(f"Scanning {len(feeds)} feed(s) with concurrency {concurrency}...")
+    for name, url in feeds:
+        print(f"  {url} keywords: {matcher.keywords_for(name)}")
+
+    state = None
+    if incremental:
+        from .feed_state import FeedStateStore
+        state = FeedStateStore()
+    index = None
+    if dedupe:
+        from .dedupe import DedupeIndex
+        index = DedupeIndex()
+    exporter = None
+    if export:
+        from .export import ScanExporter
+        exporter = ScanExporter()
+
+    store = MatchStore()
+    session = get_session(concurrency)
+    results = []
+    found_count = matched = duplicates = 0
+    started = time.time()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = {}
+            for name, url in feeds:
+                headers = state.conditional_headers(url) if state is not None else None
+                futures[pool.submit(fetch_feed, url, headers, session)] = (name, url)
+
+            # Parse and match on this thread as each download completes;
+            # the state store is only ever touched from here.
+            for future in as_completed(futures):
+                name, url = futures[future]
+                try:
+                    entries, validators = future.result()
+                except requests.RequestException as e:
+                    print(f"Error fetching RSS for r/{name}: {e}")
+                    continue
+                except FeedParseError as e:
+                    print(f"Error parsing RSS for r/{name}: {e}")
+                    continue
+
+                if entries is None:
+                    print(f"r/{name}: feed not modified since last scan.")
+                    summary["feeds"][url] = 0
+                    continue
+
+                scanned = scan_feed(name, entries, matcher, state)
+                summary["feeds"][url] = len(scanned)
+                results.extend(scanned)
+                if state is not None:
+                    # Only record the validators once every entry has been handled.
+                    state.save_validators(url, *validators)
+
+        matched = sum(1 for r in results if r.title_hits or r.body_hits)
+        metrics.incr("matches", matched)
+        # Duplicates are counted too: they were scanned like any other post.
+        corpora = store.update_corpus([r.entry.id or r.entry.link for r in results], [r.subreddit for r in results],
+                                      [(r.title_hits, r.body_hits) for r in results])
+        if index is not None:
+            scanned_count = len(results)
+            kept = drop_duplicates(results, index)
+            if exporter is not None:
+                kept_ids = {id(r) for r in kept}
+                for r in results:
+                    if id(r) not in kept_ids:
+                        export_result(exporter, r, duplicate=True)
+            results = kept
+            duplicates = scanned_count - len(results)
+        found_count = report_matches(results, store, min_score, enrich, exporter, corpora)
+    finally:
+        # One batched write for every match of this scan
+        store.close()
+        if state is not None:
+            state.close()
+        if index is not None:
+            index.close()
+        if exporter is not None:
+            exporter.close()
+
+    print(f"Scan complete in {time.time() - started:.1f}s. Found {found_count} relevant posts "
+          f"({matched} keyword matches, {duplicates} duplicates of earlier posts).")
+    summary.update(entries=len(results) + duplicates, matches=matched, duplicates=duplicates, relevant=found_count)
+    return summary
 
 if __name__ == "__main__":
     import argparse
+    from .profiling import add_profile_argument, profiled
     parser = argparse.ArgumentParser()
-    parser.add_argument("--subreddit", default="excel")
+    parser.add_argument("--subreddit", action="append", help="Subreddit to scan (repeatable, default: excel)")
+    parser.add_argument("--feeds-file", help="File with one subreddit name or feed URL per line")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Max feeds fetched at once")
+    parser.add_argument("--incremental", action="store_true", help="Skip unchanged feeds and entries already processed")
+    parser.add_argument("--min-score", type=float, default=DEFAULT_MIN_SCORE, help="Only print matches scoring at least this much")
+    parser.add_argument("--digest", action="store_true", help="Send a Feishu digest of new matches once the digest window has passed")
+    parser.add_argument("--trends", action="store_true", help="Update keyword trends and send a Feishu alert on spikes")
+    parser.add_argument("--no-dedupe", action="store_true", help="Report crossposts and reposts of earlier matches again")
+    parser.add_argument("--no-enrich", action="store_true", help="Don't fetch votes, comment count and flair of reported matches")
+    parser.add_argument("--export", action="store_true", help="Append every scanned entry to the Parquet scan history (needs pyarrow)")
+    add_profile_argument(parser)
     args = parser.parse_args()
-    
-    monitor_subreddit_rss(args.subreddit)
+
+    metrics.init("monitor_rss")
+    subreddits = args.subreddit or ([] if args.feeds_file else ["excel"])
+    with profiled("monitor_rss", args.profile):
+        monitor_subreddit_rss(subreddits, incremental=args.incremental, concurrency=args.concurrency,
+                              feeds_file=args.feeds_file, min_score=args.min_score, dedupe=not args.no_dedupe,
+                              enrich=not args.no_enrich, export=args.export)
+        if args.digest:
+            from .digest import send_digest
+            send_digest(min_score=args.min_score)
+        if args.trends:
+            from .trends import check_trends
+            check_trends()
@@ -0,0 +1,240 @@
+import atexit
+import json
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from . import config, metrics
+from .storage import write_json
+
+SPOOL_SUBDIR = os.path.join("spool", "feishu")
+# (connect, read) seconds - a dead webhook must never hang a cron job
+TIMEOUT = (3.05, 10)
+MAX_ATTEMPTS = 4
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+# How long process exit waits for queued messages before leaving them in the spool
+EXIT_FLUSH_TIMEOUT = 30.0
+# Feishu error codes (sent with HTTP 200) worth retrying: 11232 is its rate limit.
+# Any other code (bad signature, bad card, keyword check failed) fails the same way every time.
+RETRYABLE_CODES = {11232}
+# A payload being delivered is renamed to <name>.json.sending-<pid> first, so processes
+# sharing the spool never send it twice. Claims of dead processes, or older than this
+# (far longer than a delivery with all its retries takes), go back to the spool.
+CLAIM_SUFFIX = ".sending-"
+CLAIM_STALE_SECONDS = 10 * 60
+
+
+class PermanentError(Exception):
+    """
+    The webhook rejected the payload itself; retrying won't help.
+    """
+
+
+class FeishuNotifier:
+    """
+    Fire-and-forget delivery of Feishu webhook payloads.
+
+    send() writes the payload to an on-disk spool and hands it to a background
+    thread, so the caller never waits on the network. The thread posts it over
+    a pooled session with strict timeouts, retrying with jittered exponential
+    backoff. Delivered payloads are removed from the spool; undelivered ones stay
+    there and are retried when the next notifier starts (i.e. on the next run), or
+    when a long-running process calls drain_spool() again. A payload is claimed by
+    renaming it before it is posted, so only one process ever sends it.
+    """
+
+    def __init__(self, webhook_url=None, spool_dir=None, session=None,
+                 timeout=TIMEOUT, max_attempts=MAX_ATTEMPTS, backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX):
+        self.webhook_url = webhook_url or config.FEISHU_WEBHOOK_URL
+        self.spool_dir = spool_dir or config.data_path(SPOOL_SUBDIR)
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._session = session
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        # Spool paths queued and not handled yet, so draining again doesn't queue them twice
+        self._pending = set()
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.drain_spool()
+
+    @property
+    def session(self):
+        if self._session is None:
+            from .http_client import get_session
+            self._session = get_session()
+        return self._session
+
+    def send(self, payload):
+        """
+        Queues a payload for delivery and returns immediately.
+        """
+        path = os.path.join(self.spool_dir, f"{time.time():.6f}-{uuid.uuid4().hex[:8]}.json")
+        write_json(path, payload, ensure_ascii=False)
+        self._enqueue(path)
+        return path
+
+    def drain_spool(self):
+        """
+        Re-queues undelivered payloads from the spool, oldest first, skipping those already queued
+        and those another live process is delivering. Returns the number queued.
+        """
+        for name in os.listdir(self.spool_dir):
+            if CLAIM_SUFFIX in name and self._stale_claim(os.path.join(self.spool_dir, name)):
+                try:
+                    os.rename(os.path.join(self.spool_dir, name),
+                              os.path.join(self.spool_dir, name.split(CLAIM_SUFFIX)[0]))
+                except FileNotFoundError:
+                    # Another process released it first
+                    pass
+        names = sorted(name for name in os.listdir(self.spool_dir) if name.endswith(".json"))
+        queued = sum(1 for name in names if self._enqueue(os.path.join(self.spool_dir, name)))
+        if queued:
+            print(f"Retrying {queued} undelivered Feishu message(s) from the spool.")
+        return queued
+
+    def flush(self, timeout=EXIT_FLUSH_TIMEOUT):
+        """
+        Waits up to `timeout` seconds for queued payloads. Returns True if everything was handled;
+        anything still pending stays in the spool for the next run.
+        """
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def post(self, payload):
+        """
+        One synchronous delivery attempt. Raises on failure.
+        """
+        with metrics.timer("notify"):
+            self._post(payload)
+
+    def _post(self, payload):
+        response = self.session.post(self.webhook_url, json=payload, timeout=self.timeout)
+        if response.status_code == 429 or response.status_code >= 500:
+            raise IOError(f"HTTP {response.status_code}: {response.text[:200]}")
+        if response.status_code >= 400:
+            raise PermanentError(f"HTTP {response.status_code}: {response.text[:200]}")
+        try:
+            body = response.json()
+        except ValueError:
+            return
+        # Feishu reports errors with HTTP 200 and a non-zero code
+        code = body.get("code", body.get("StatusCode", 0))
+        if code:
+            message = f"Feishu error {code}: {body.get('msg', body.get('StatusMessage', ''))}"
+            if code in RETRYABLE_CODES:
+                raise IOError(message)
+            raise PermanentError(message)
+
+    def _stale_claim(self, claim):
+        """
+        Whether a claimed payload was left behind: its process is gone, or it has been
+        claimed for longer than any delivery takes.
+        """
+        try:
+            pid = int(claim.rsplit(CLAIM_SUFFIX, 1)[1])
+            age = time.time() - os.path.getmtime(claim)
+        except (ValueError, OSError):
+            return False
+        if age > CLAIM_STALE_SECONDS:
+            return True
+        if pid == os.getpid():
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        return False
+
+    def deliver(self, path):
+        """
+        Delivers one spooled payload with retries. Returns True when delivered (or when
+        another notifier got to it first).
+        """
+        claim = f"{path}{CLAIM_SUFFIX}{os.getpid()}"
+        try:
+            os.rename(path, claim)
+        except FileNotFoundError:
+            # Already delivered or being delivered by another notifier
+            return True
+        # The claim's age counts from now, not from when the payload was spooled
+        os.utime(claim)
+        try:
+            with open(claim, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except ValueError:
+            os.replace(claim, path + ".failed")
+            print(f"Discarding unreadable spooled message: {path}")
+            return False
+
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self.post(payload)
+            except PermanentError as e:
+                os.replace(claim, path + ".failed")
+                print(f"Feishu rejected message ({e}); kept as {path}.failed")
+                return False
+            except Exception as e:
+                metrics.incr("notify_retries" if attempt < self.max_attempts else "notify_failures")
+                if attempt == self.max_attempts:
+                    os.replace(claim, path)
+                    print(f"Failed to send Feishu message after {attempt} attempts: {e} (left in the spool for a retry)")
+                    return False
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+                time.sleep(random.uniform(0, delay))
+            else:
+                os.remove(claim)
+                metrics.incr("notifications")
+                print("Feishu message sent successfully.")
+                return True
+
+    def _enqueue(self, path):
+        with self._lock:
+            if path in self._pending:
+                return False
+            self._pending.add(path)
+            self._queue.put(path)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name="feishu-notifier", daemon=True)
+                self._thread.start()
+        return True
+
+    def _worker(self):
+        while True:
+            path = self._queue.get()
+            try:
+                self.deliver(path)
+            except Exception as e:
+                print(f"Feishu delivery error: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(path)
+                self._queue.task_done()
+
+
+_notifier = None
+_notifier_lock = threading.Lock()
+
+
+def get_notifier():
+    """
+    Returns the process-wide notifier for FEISHU_WEBHOOK_URL. Pending messages get up to
+    EXIT_FLUSH_TIMEOUT seconds at interpreter exit; the rest wait in the spool.
+    """
+    global _notifier
+    with _notifier_lock:
+        if _notifier is None:
+            _notifier = FeishuNotifier()
+            atexit.register(_notifier.flush)
+        return _notifier
@@ -0,0 +1,61 @@
+import time
+from . import config
+from .storage import TTLStore
+
+DB_NAME = "comment_parents.db"
+
+# Busy threads keep collecting comments for a day or two; their context rarely changes meanwhile.
+PARENT_TTL_SECONDS = 2 * 24 * 3600
+PARENT_MAX_ENTRIES = 20000
+# Context kept per parent; enough to show what a comment is answering.
+MAX_BODY_CHARS = 500
+
+
+class ParentCache(TTLStore):
+    """
+    Caches the context of comment parents (submissions and comments) by fullname,
+    so comments in the same thread don't look up their parents again on later scans.
+    """
+
+    TABLE = "parents"
+    KEY = "fullname"
+    TIME_COLUMN = "fetched_at"
+
+    def __init__(self, db_path=None, ttl_seconds=PARENT_TTL_SECONDS, max_entries=PARENT_MAX_ENTRIES):
+        super().__init__(db_path or config.data_path(DB_NAME), ttl_seconds, max_entries)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS parents (
+                fullname TEXT PRIMARY KEY,
+                title TEXT,
+                body TEXT NOT NULL,
+                permalink TEXT,
+                fetched_at REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_parents_fetched_at ON parents(fetched_at);
+        """)
+        self.conn.commit()
+
+    def get_many(self, fullnames):
+        """
+        Returns {fullname: {"title", "body", "permalink"}} for the cached, unexpired fullnames.
+        """
+        fullnames = list(set(fullnames))
+        if not fullnames:
+            return {}
+        placeholders = ",".join("?" * len(fullnames))
+        rows = self.conn.execute(
+            f"SELECT fullname, title, body, permalink FROM parents WHERE fullname IN ({placeholders}) AND fetched_at >= ?",
+            fullnames + [time.time() - self.ttl_seconds],
+        )
+        return {row[0]: {"title": row[1], "body": row[2], "permalink": row[3]} for row in rows}
+
+    def put_many(self, parents):
+        """
+        Stores {fullname: {"title", "body", "permalink"}}.
+        """
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO parents (fullname, title, body, permalink, fetched_at) VALUES (?, ?, ?, ?, ?)",
+            [(fullname, p["title"], p["body"][:MAX_BODY_CHARS], p["permalink"], now) for fullname, p in parents.items()],
+        )
+        self.conn.commit()
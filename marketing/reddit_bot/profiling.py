@@ -0,0 +1,181 @@
+"""
+Profiling for the reddit_bot entry points.
+
+Every __main__ block accepts --profile. The run is then executed under cProfile
+with tracemalloc tracing, and three files are written to logs/profiles/ named
+after the run ID (<job>-<YYYYmmdd-HHMMSS>-<pid>):
+
+    <run_id>.prof         pstats data (open with `python -m pstats` or snakeviz)
+    <run_id>.tracemalloc  tracemalloc snapshot
+    <run_id>.txt          top functions by cumulative time and top allocation sites
+
+cProfile only sees the main thread: downloads running on monitor_rss's fetch
+workers show up as time waiting in as_completed. tracemalloc covers all threads.
+
+Two runs can be compared with:
+
+    python -m marketing.reddit_bot.profiling diff <old run_id or path> <new run_id or path>
+"""
+import contextlib
+import os
+import time
+from datetime import datetime
+
+PROFILES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "profiles")
+# Stack depth recorded per allocation; deeper is more precise but slower.
+TRACEMALLOC_FRAMES = 10
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 20
+
+
+def add_profile_argument(parser):
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile this run (cProfile + tracemalloc) and write the results to logs/profiles/")
+
+
+def new_run_id(job):
+    return f"{job}-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}"
+
+
+def profiled(job, enabled=True, profiles_dir=PROFILES_DIR):
+    """
+    Context manager profiling the enclosed block when enabled; a no-op otherwise.
+    """
+    if not enabled:
+        return contextlib.nullcontext()
+    return _profile(job, profiles_dir)
+
+
+def _snapshot_filters():
+    import tracemalloc
+    return [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ]
+
+
+@contextlib.contextmanager
+def _profile(job, profiles_dir):
+    import cProfile
+    import tracemalloc
+
+    run_id = new_run_id(job)
+    os.makedirs(profiles_dir, exist_ok=True)
+    base = os.path.join(profiles_dir, run_id)
+
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        yield run_id
+    finally:
+        profiler.disable()
+        wall = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(_snapshot_filters())
+        tracemalloc.stop()
+
+        profiler.dump_stats(base + ".prof")
+        snapshot.dump(base + ".tracemalloc")
+        with open(base + ".txt", 'w', encoding='utf-8') as f:
+            f.write(_summary(run_id, profiler, snapshot, wall, peak))
+        print(f"Profile written to {base}.{{prof,tracemalloc,txt}}")
+
+
+def _summary(run_id, profiler, snapshot, wall, peak):
+    import io
+    import pstats
+
+    out = io.StringIO()
+    out.write(f"Run: {run_id}\nWall time: {wall:.3f}s\nPeak traced memory: {peak / 1024:,.0f} KB\n\n")
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+    out.write(f"Top {TOP_ALLOCATIONS} allocation sites (still allocated at the end of the run):\n")
+    for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+        out.write(f"  {stat}\n")
+    return out.getvalue()
+
+
+def _resolve(ref, ext, profiles_dir=PROFILES_DIR):
+    """
+    Accepts a run ID, or a path to any of a run's files, and returns the path of its `ext` file.
+    """
+    for suffix in (".prof", ".tracemalloc", ".txt"):
+        if ref.endswith(suffix):
+            ref = ref[:-len(suffix)]
+            break
+    if os.sep not in ref and not os.path.exists(ref + ext):
+        ref = os.path.join(profiles_dir, ref)
+    return ref + ext
+
+
+def _function_times(path):
+    import pstats
+
+    stats = pstats.Stats(path).stats
+    total = sum(tt for _, _, tt, _, _ in stats.values())
+    return {_label(func): (nc, tt, ct) for func, (_, nc, tt, ct, _) in stats.items()}, total
+
+
+def _label(func):
+    filename, line, name = func
+    if filename == "~":
+        return name
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+
+def diff_profiles(old, new, top=20, profiles_dir=PROFILES_DIR):
+    """
+    Returns a text report of the largest CPU (cumulative time per function) and
+    memory (allocated size per line) changes between two profiled runs.
+    """
+    import tracemalloc
+
+    lines = []
+    old_funcs, old_total = _function_times(_resolve(old, ".prof", profiles_dir))
+    new_funcs, new_total = _function_times(_resolve(new, ".prof", profiles_dir))
+    change = (new_total / old_total - 1.0) * 100 if old_total else 0.0
+    lines.append(f"CPU: {old_total:.3f}s -> {new_total:.3f}s ({change:+.0f}%)")
+    lines.append(f"{'cumtime old':>12}{'cumtime new':>12}{'delta':>10}{'calls new':>11}  function")
+    deltas = []
+    for label in old_funcs.keys() | new_funcs.keys():
+        _, _, old_ct = old_funcs.get(label, (0, 0.0, 0.0))
+        nc, _, new_ct = new_funcs.get(label, (0, 0.0, 0.0))
+        deltas.append((new_ct - old_ct, old_ct, new_ct, nc, label))
+    deltas.sort(key=lambda d: -abs(d[0]))
+    for delta, old_ct, new_ct, nc, label in deltas[:top]:
+        lines.append(f"{old_ct:>12.4f}{new_ct:>12.4f}{delta:>+10.4f}{nc:>11}  {label}")
+
+    old_mem = _resolve(old, ".tracemalloc", profiles_dir)
+    new_mem = _resolve(new, ".tracemalloc", profiles_dir)
+    if os.path.exists(old_mem) and os.path.exists(new_mem):
+        stats = tracemalloc.Snapshot.load(new_mem).compare_to(tracemalloc.Snapshot.load(old_mem), "lineno")
+        old_size = sum(s.size - s.size_diff for s in stats)
+        new_size = sum(s.size for s in stats)
+        lines.append("")
+        lines.append(f"Memory still allocated at exit: {old_size / 1024:,.0f} KB -> {new_size / 1024:,.0f} KB")
+        for stat in stats[:top]:
+            lines.append(f"  {stat}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Inspect profiles written by --profile.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    diff_parser = sub.add_parser("diff", help="Compare two profiled runs")
+    diff_parser.add_argument("old", help="Run ID or profile path of the reference run")
+    diff_parser.add_argument("new", help="Run ID or profile path of the run to check")
+    diff_parser.add_argument("--top", type=int, default=20)
+    sub.add_parser("list", help="List profiled runs")
+    args = parser.parse_args()
+
+    if args.command == "diff":
+        print(diff_profiles(args.old, args.new, args.top))
+    elif args.command == "list":
+        if os.path.isdir(PROFILES_DIR):
+            for name in sorted(os.listdir(PROFILES_DIR)):
+                if name.endswith(".prof"):
+                    print(name[:-len(".prof")])
@@ -1,11 +1,10 @@
-import praw
-import os
-import sys
 import argparse
-import re
 from . import config
+from .rate_limit import priority
+from .reddit_client import get_reddit
+from .template_library import get_library
 
-def parse_template(file_path):
+def parse_template(file_path, **values):
     """
     Parses a markdown file to extract Title and Body.
     Expected format:
@@ -13,37 +12,18 @@ def parse_template(file_path):
     
     **Body**:
     My body here...
+
+    Parsed templates are cached by the template library (see template_library.py);
+    {{ placeholders }} are filled from `values` and the template's front matter.
     """
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"Template not found: {file_path}")
-        
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-        
-    # Regex to find title
-    title_match = re.search(r'\*\*Title\*\*:\s*(.+)', content)
-    if not title_match:
+    library = get_library()
+    template = library.get(file_path)
+    library.save()
+    if template.title is None:
         raise ValueError("Could not find '**Title**:' in template")
-    
-    title = title_match.group(1).strip()
-    
-    # Extract body (everything after **Body**:)
-    body_match = re.search(r'\*\*Body\*\*:\s*(.+)', content, re.DOTALL)
-    if not body_match:
-        # Fallback: try to find where Body starts and take everything after
-        if "**Body**" in content:
-            parts = content.split("**Body**")
-            if len(parts) > 1:
-                body = parts[1].lstrip(": \n").strip()
-            else:
-                raise ValueError("Could not extract body")
-        else:
-            raise ValueError("Could not find '**Body**:' in template")
-    else:
-        body = body_match.group(1).strip()
-        
-    return title, body
+    return template.render(**values)
 
+@priority("publish")
 def publish_post(template_path, subreddit_name="test", dry_run=False):
     # 1. Validate Config
     valid, msg = config.validate_config()
@@ -68,18 +48,10 @@ def publish_post(template_path, subreddit_name="test", dry_run=False):
         print("[DRY RUN] Post would be submitted now.")
         return
 
-    # 3. Connect to Reddit
+    # 3. Connect to Reddit (the token is cached between runs; bad credentials fail on submit)
     try:
-        reddit = praw.Reddit(
-            client_id=config.REDDIT_CLIENT_ID,
-            client_secret=config.REDDIT_CLIENT_SECRET,
-            user_agent=config.REDDIT_USER_AGENT,
-            username=config.REDDIT_USERNAME,
-            password=config.REDDIT_PASSWORD
-        )
-        
-        # Verify auth
-        print(f"Authenticated as: {reddit.user.me()}")
+        reddit = get_reddit()
+        print(f"Posting as: u/{config.REDDIT_USERNAME}")
         
         # 4. Submit
         subreddit = reddit.subreddit(subreddit_name)
@@ -90,11 +62,14 @@ def publish_post(template_path, subreddit_name="test", dry_run=False):
         print(f"FAILED to submit post: {e}")
 
 if __name__ == "__main__":
+    from .profiling import add_profile_argument, profiled
     parser = argparse.ArgumentParser(description="Publish a Reddit post from a template.")
     parser.add_argument("template", help="Path to the markdown template file")
     parser.add_argument("--subreddit", "-s", default="test", help="Subreddit to post to (default: test)")
     parser.add_argument("--dry-run", action="store_true", help="Preview without posting")
+    add_profile_argument(parser)
     
     args = parser.parse_args()
     
-    publish_post(args.template, args.subreddit, args.dry_run)
+    with profiled("publisher", args.profile):
+        publish_post(args.template, args.subreddit, args.dry_run)
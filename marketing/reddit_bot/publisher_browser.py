@@ -1,6 +1,4 @@
 import asyncio
-from playwright.async_api import async_playwright
-from playwright_stealth.stealth import Stealth
 import os
 import argparse
 import re
@@ -81,6 +79,10 @@ async def publish_post(template_path, subreddit_name, dry_run=False):
         print("[DRY RUN] Skipping browser automation.")
         return
 
+    # Only a real run needs the browser stack
+    from playwright.async_api import async_playwright
+    from playwright_stealth.stealth import Stealth
+
     async with async_playwright() as p:
         # Launch browser with stealth args
         launch_args = {
@@ -0,0 +1,231 @@
+"""
+Reddit API quota shared by every bot process on this machine.
+
+Reddit allows an OAuth client about 1000 requests per 10 minute window and reports
+what is left in X-Ratelimit-Remaining / X-Ratelimit-Reset on every response. praw
+paces each process on its own; when the monitor, inbox and publisher run at the same
+time they would each spend the whole quota. Here the quota lives in one SQLite
+database (data/rate_limit.db):
+
+- a token bucket paces requests evenly over what is left of the window,
+- requests wait in a queue ordered by priority (inbox/publish before scans before
+  backlog crawls), and lower priorities must leave a reserve for higher ones,
+- every response's headers re-sync the shared counters with Reddit's view.
+
+Every call made through reddit_client.get_reddit() goes through RateLimitedRequestor.
+"""
+import contextlib
+import os
+import threading
+import time
+from . import config
+from .storage import connect
+
+DB_NAME = "rate_limit.db"
+# Reddit's documented limit for OAuth clients, used until the first response tells us better.
+WINDOW_LIMIT = 1000
+WINDOW_SECONDS = 600
+# Requests that may go out back to back before pacing kicks in.
+BURST = 10
+
+PRIORITIES = {"inbox": 0, "publish": 0, "scan": 1, "backlog": 2}
+DEFAULT_PRIORITY = "scan"
+# Share of the window's quota a priority has to leave for the ones above it.
+RESERVE = {0: 0.0, 1: 0.025, 2: 0.1}
+# Waiters that haven't checked in for this long belong to a dead process.
+STALE_WAITER_SECONDS = 10.0
+MAX_WAIT_STEP = 1.0
+# First poll interval of a waiter queued behind others; doubles on every poll after that.
+QUEUE_POLL = 0.02
+
+_context = threading.local()
+
+
+@contextlib.contextmanager
+def priority(name):
+    """
+    Runs the enclosed Reddit calls (of this thread) at the given priority.
+    Also works as a function decorator: @priority("inbox").
+    """
+    previous = getattr(_context, "priority", None)
+    _context.priority = name
+    try:
+        yield
+    finally:
+        _context.priority = previous
+
+
+def current_priority():
+    return getattr(_context, "priority", None) or DEFAULT_PRIORITY
+
+
+class RateLimiter:
+    def __init__(self, db_path=None, window_limit=WINDOW_LIMIT, window_seconds=WINDOW_SECONDS, burst=BURST):
+        db_path = db_path or config.data_path(DB_NAME)
+        self.window_limit = window_limit
+        self.window_seconds = window_seconds
+        self.burst = burst
+        self._lock = threading.Lock()
+        # Shared by this process's threads under _lock; other processes are kept out by BEGIN IMMEDIATE.
+        self.conn = connect(db_path, isolation_level=None, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS bucket (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                tokens REAL NOT NULL,
+                remaining REAL NOT NULL,
+                reset_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS waiters (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                priority INTEGER NOT NULL,
+                pid INTEGER NOT NULL,
+                heartbeat REAL NOT NULL
+            );
+        """)
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            else:
+                self.conn.execute("COMMIT")
+
+    def _bucket(self, conn, now):
+        """
+        Reads the bucket and refills it for the time passed. Returns (tokens, remaining, reset_at).
+        """
+        row = conn.execute("SELECT tokens, remaining, reset_at, updated_at FROM bucket WHERE id = 1").fetchone()
+        if row is None or now >= row[2]:
+            # New window
+            remaining = float(self.window_limit)
+            reset_at = now + self.window_seconds
+            tokens = float(self.burst) if row is None else row[0]
+            updated_at = now if row is None else row[3]
+        else:
+            tokens, remaining, reset_at, updated_at = row
+        rate = remaining / max(1.0, reset_at - now)
+        tokens = min(float(self.burst), remaining, tokens + max(0.0, now - updated_at) * rate)
+        return tokens, remaining, reset_at
+
+    def _save(self, conn, tokens, remaining, reset_at, now):
+        conn.execute(
+            "INSERT OR REPLACE INTO bucket (id, tokens, remaining, reset_at, updated_at) VALUES (1, ?, ?, ?, ?)",
+            (tokens, remaining, reset_at, now),
+        )
+
+    def acquire(self, priority_name=None):
+        """
+        Blocks until this request may be sent: it is first in line for its priority,
+        no higher priority is waiting, and the bucket has a token to spare.
+        Returns the seconds spent waiting.
+        """
+        level = PRIORITIES.get(priority_name or current_priority(), PRIORITIES[DEFAULT_PRIORITY])
+        started = time.time()
+        with self._transaction() as conn:
+            waiter_id = conn.execute(
+                "INSERT INTO waiters (priority, pid, heartbeat) VALUES (?, ?, ?)", (level, os.getpid(), started)
+            ).lastrowid
+        backoff = QUEUE_POLL
+        try:
+            while True:
+                now = time.time()
+                with self._transaction() as conn:
+                    conn.execute("DELETE FROM waiters WHERE heartbeat < ?", (now - STALE_WAITER_SECONDS,))
+                    conn.execute("UPDATE waiters SET heartbeat = ? WHERE id = ?", (now, waiter_id))
+                    head = conn.execute("SELECT id FROM waiters ORDER BY priority, id LIMIT 1").fetchone()
+                    tokens, remaining, reset_at = self._bucket(conn, now)
+                    reserve = RESERVE.get(level, 0.0) * self.window_limit
+                    if head and head[0] == waiter_id and tokens >= 1.0 and remaining - 1.0 >= reserve:
+                        self._save(conn, tokens - 1.0, remaining - 1.0, reset_at, now)
+                        conn.execute("DELETE FROM waiters WHERE id = ?", (waiter_id,))
+                        return now - started
+                    self._save(conn, tokens, remaining, reset_at, now)
+                    ahead = 0
+                    if head and head[0] != waiter_id:
+                        ahead = conn.execute(
+                            "SELECT COUNT(*) FROM waiters WHERE priority < ? OR (priority = ? AND id < ?)",
+                            (level, level, waiter_id),
+                        ).fetchone()[0]
+
+                if remaining - 1.0 < reserve:
+                    wait = reset_at - now
+                else:
+                    # Time until the bucket holds a token for everyone ahead of us and for us
+                    wait = (ahead + 1.0 - tokens) * max(1.0, reset_at - now) / max(remaining, 1.0)
+                if ahead:
+                    # The ones ahead may take a while to claim their tokens; back off instead
+                    # of hitting the database every few milliseconds.
+                    wait = max(wait, backoff)
+                    backoff *= 2
+                time.sleep(min(MAX_WAIT_STEP, max(0.005, wait)))
+        except BaseException:
+            with self._transaction() as conn:
+                conn.execute("DELETE FROM waiters WHERE id = ?", (waiter_id,))
+            raise
+
+    def update(self, headers):
+        """
+        Re-syncs the shared quota with Reddit's X-Ratelimit-Remaining / X-Ratelimit-Reset.
+        """
+        try:
+            remaining = float(headers["x-ratelimit-remaining"])
+            reset_in = float(headers["x-ratelimit-reset"])
+        except (KeyError, TypeError, ValueError):
+            return
+        now = time.time()
+        with self._transaction() as conn:
+            tokens, _, _ = self._bucket(conn, now)
+            self._save(conn, min(tokens, remaining), remaining, now + reset_in, now)
+
+    def status(self):
+        now = time.time()
+        with self._transaction() as conn:
+            tokens, remaining, reset_at = self._bucket(conn, now)
+            waiting = conn.execute("SELECT priority, COUNT(*) FROM waiters GROUP BY priority").fetchall()
+        return {"tokens": tokens, "remaining": remaining, "reset_in": reset_at - now, "waiting": dict(waiting)}
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter()
+        return _limiter
+
+
+def requestor_class():
+    """
+    Returns a prawcore Requestor subclass that waits for the shared quota before every
+    request and feeds the rate-limit headers of every response back into it.
+    Pass it to praw.Reddit(requestor_class=...).
+    """
+    import prawcore
+
+    class RateLimitedRequestor(prawcore.Requestor):
+        def request(self, *args, **kwargs):
+            limiter = get_limiter()
+            limiter.acquire()
+            response = super().request(*args, **kwargs)
+            limiter.update(response.headers)
+            return response
+
+    return RateLimitedRequestor
+
+
+if __name__ == "__main__":
+    status = get_limiter().status()
+    print(f"Remaining: {status['remaining']:.0f} requests, window resets in {status['reset_in']:.0f}s, "
+          f"bucket {status['tokens']:.1f}/{BURST}")
+    for level, count in sorted(status["waiting"].items()):
+        names = "/".join(name for name, value in PRIORITIES.items() if value == level) or level
+        print(f"Waiting at priority {names}: {count}")
@@ -0,0 +1,141 @@
+import hashlib
+import threading
+import time
+from . import config
+from .storage import read_json, write_json
+
+# OAuth access token of the script app, shared by short-lived runs. Readable by the owner only.
+TOKEN_CACHE_NAME = "reddit_token.json"
+# A cached token is only reused while it has at least this many seconds left.
+MIN_TOKEN_SECONDS = 60
+# The cache sets private prawcore authorizer attributes; these are the majors it was checked
+# against (2.x: wall-clock expiry, 3.x/4.x: monotonic). Other versions use the plain authorizer.
+PRAWCORE_MAJORS = (2, 3, 4)
+
+_reddit = None
+_reddit_lock = threading.Lock()
+
+
+def get_reddit(**kwargs):
+    """
+    Returns the process-wide praw.Reddit for the configured script app, creating it on first use.
+    The access token is cached in TOKEN_CACHE_NAME under DATA_DIR, so a new process skips the token
+    request until the cached token expires (praw fetches a new one on a 401 as usual).
+    Requests share the machine-wide quota in rate_limit unless another requestor_class is given.
+    kwargs are passed to praw.Reddit the first time only.
+    """
+    global _reddit
+    with _reddit_lock:
+        if _reddit is None:
+            import praw
+            from .rate_limit import requestor_class
+            kwargs.setdefault("requestor_class", requestor_class())
+            reddit = praw.Reddit(
+                client_id=config.REDDIT_CLIENT_ID,
+                client_secret=config.REDDIT_CLIENT_SECRET,
+                user_agent=config.REDDIT_USER_AGENT,
+                username=config.REDDIT_USERNAME,
+                password=config.REDDIT_PASSWORD,
+                **kwargs
+            )
+            _install_token_cache(reddit)
+            _reddit = reddit
+        return _reddit
+
+
+def _cache_key():
+    # Tokens belong to one app and account; a config change must not pick up the old token.
+    return hashlib.sha256(f"{config.REDDIT_CLIENT_ID}:{config.REDDIT_USERNAME}".encode("utf-8")).hexdigest()[:16]
+
+
+def _seconds_left(authorizer):
+    if getattr(authorizer, "access_token", None) is None:
+        return 0.0
+    if hasattr(authorizer, "_expiration_timestamp_ns"):
+        # prawcore >= 3 tracks expiry on the monotonic clock
+        return (authorizer._expiration_timestamp_ns - time.monotonic_ns()) / 1e9
+    return getattr(authorizer, "_expiration_timestamp", 0.0) - time.time()
+
+
+def _prawcore_supported():
+    import prawcore
+    try:
+        major = int(str(prawcore.__version__).split(".")[0])
+    except (AttributeError, ValueError):
+        return False
+    return major in PRAWCORE_MAJORS
+
+
+def _is_valid(authorizer):
+    try:
+        return bool(authorizer.is_valid())
+    except (AttributeError, TypeError):
+        return False
+
+
+def _set_token(authorizer, token, expires_at, scopes):
+    seconds_left = expires_at - time.time()
+    authorizer.access_token = token
+    authorizer.scopes = set(scopes)
+    # Both spellings: monotonic nanoseconds (prawcore >= 3) and wall-clock seconds (older releases)
+    authorizer._expiration_timestamp_ns = time.monotonic_ns() + int(seconds_left * 1e9)
+    authorizer._expiration_timestamp = expires_at
+
+
+def load_token(authorizer, path=None):
+    """
+    Puts a cached, still valid token on the authorizer. Returns True if one was used.
+    """
+    path = path or config.data_path(TOKEN_CACHE_NAME)
+    cached = read_json(path)
+    if not cached:
+        return False
+    if cached.get("key") != _cache_key() or cached.get("expires_at", 0) - time.time() < MIN_TOKEN_SECONDS:
+        return False
+    _set_token(authorizer, cached["access_token"], cached["expires_at"], cached.get("scopes", ["*"]))
+    if not _is_valid(authorizer):
+        # The authorizer doesn't read the expiry we set; let it fetch a token as usual
+        authorizer.access_token = None
+        authorizer.scopes = None
+        return False
+    return True
+
+
+def save_token(authorizer, path=None):
+    path = path or config.data_path(TOKEN_CACHE_NAME)
+    seconds_left = _seconds_left(authorizer)
+    if seconds_left <= 0:
+        return
+    # Owner-only from the start, so the token is never world-readable
+    write_json(path, {
+        "key": _cache_key(),
+        "access_token": authorizer.access_token,
+        "expires_at": time.time() + seconds_left,
+        "scopes": sorted(authorizer.scopes or ["*"]),
+    }, mode=0o600)
+
+
+def _install_token_cache(reddit):
+    """
+    Seeds the script authorizer from the cache and saves every token it fetches afterwards.
+    """
+    core = getattr(reddit, "_authorized_core", None)
+    authorizer = getattr(core, "_authorizer", None)
+    if authorizer is None or not hasattr(authorizer, "refresh") or not hasattr(authorizer, "is_valid"):
+        return
+    if not _prawcore_supported():
+        import prawcore
+        print(f"Reddit token cache disabled: untested prawcore {getattr(prawcore, '__version__', '?')}")
+        return
+    load_token(authorizer)
+
+    refresh = authorizer.refresh
+
+    def refresh_and_save():
+        refresh()
+        try:
+            save_token(authorizer)
+        except OSError as e:
+            print(f"Could not cache Reddit token: {e}")
+
+    authorizer.refresh = refresh_and_save
@@ -0,0 +1,132 @@
+import json
+import os
+import time
+from collections import namedtuple
+from string import Template
+from .matcher import KeywordMatcher
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reply_rules.json")
+# How often (seconds) the rules file is stat'ed for changes
+RELOAD_CHECK_INTERVAL = 2.0
+
+# reply is a string.Template; $author and $subject are filled in per message.
+Rule = namedtuple("Rule", ["name", "priority", "keywords", "reply"])
+
+
+class RuleError(Exception):
+    pass
+
+
+def load_rules(path):
+    """
+    Reads and validates the rules file. Returns a list of Rule.
+    Raises RuleError for anything but {"rules": [{name, priority, keywords, reply}, ...]}
+    with the right types, so a bad edit can't turn into surprising rules.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    if not isinstance(data, dict):
+        raise RuleError("The rules file must be a JSON object with a 'rules' list")
+    raw_rules = data.get("rules", [])
+    if not isinstance(raw_rules, list):
+        raise RuleError("'rules' must be a list")
+    rules = []
+    names = set()
+    for i, raw in enumerate(raw_rules):
+        if not isinstance(raw, dict):
+            raise RuleError(f"Rule {i} must be an object")
+        name = raw.get("name") or f"rule_{i}"
+        if not isinstance(name, str):
+            raise RuleError(f"Rule {i}: 'name' must be a string")
+        if name in names:
+            raise RuleError(f"Duplicate rule name: {name}")
+        priority = raw.get("priority", 0)
+        # bool is an int subclass, but "priority": true is a mistake
+        if not isinstance(priority, int) or isinstance(priority, bool):
+            raise RuleError(f"Rule '{name}': 'priority' must be an integer")
+        keywords = raw.get("keywords")
+        if not isinstance(keywords, list) or not keywords \
+                or not all(isinstance(keyword, str) and keyword.strip() for keyword in keywords):
+            raise RuleError(f"Rule '{name}': 'keywords' must be a non-empty list of strings")
+        reply = raw.get("reply")
+        if not isinstance(reply, str) or not reply:
+            raise RuleError(f"Rule '{name}': 'reply' must be a non-empty string")
+        names.add(name)
+        rules.append(Rule(name, priority, keywords, Template(reply)))
+    return rules
+
+
+class CompiledRules:
+    """
+    All rules compiled into one keyword automaton: a message is scanned once,
+    and the highest-priority rule with a hit wins (earlier rules win ties).
+    """
+
+    def __init__(self, rules):
+        self.rules = {rule.name: rule for rule in rules}
+        self._order = {rule.name: (-rule.priority, i) for i, rule in enumerate(rules)}
+        self.matcher = KeywordMatcher({rule.name: rule.keywords for rule in rules})
+
+    def pick(self, text):
+        """
+        Returns the winning Rule for text, or None.
+        """
+        matched = self.matcher.match(text)
+        if not matched:
+            return None
+        return self.rules[min(matched, key=self._order.__getitem__)]
+
+
+class RuleTable:
+    """
+    Rules loaded from a JSON file and recompiled whenever the file changes,
+    so a long-running worker picks up edits without a restart.
+    A broken edit is reported and the previous rules stay active.
+    """
+
+    def __init__(self, path=DEFAULT_RULES_PATH, check_interval=RELOAD_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._mtime = None
+        self._checked_at = 0.0
+        self._compiled = None
+        self._reload_if_changed(force=True)
+
+    def _reload_if_changed(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            if self._compiled is None:
+                raise RuleError(f"Cannot read rules file {self.path}: {e}")
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            compiled = CompiledRules(load_rules(self.path))
+        except (OSError, ValueError, RuleError) as e:
+            if self._compiled is None:
+                raise RuleError(f"Invalid rules file {self.path}: {e}")
+            print(f"Ignoring invalid rules file {self.path}: {e}")
+        else:
+            if self._compiled is not None:
+                print(f"Reloaded {len(compiled.rules)} auto-reply rules from {self.path}")
+            self._compiled = compiled
+        self._mtime = mtime
+
+    def pick(self, text):
+        self._reload_if_changed()
+        return self._compiled.pick(text)
+
+    def reply_for(self, message_body, **fields):
+        """
+        Returns (rule, rendered reply) for the winning rule, or (None, None).
+        """
+        rule = self.pick(message_body)
+        if rule is None:
+            return None, None
+        return rule, rule.reply.safe_substitute(fields)
@@ -1,10 +1,9 @@
 import os
-import sys
 import subprocess
-import requests
-import json
+import time
 from datetime import datetime
-from . import config
+from . import config, metrics
+from .notifier import get_notifier
 
 def get_crontab_info():
     try:
@@ -26,6 +25,80 @@ def get_crontab_info():
     except Exception as e:
         return f"Error retrieving crontab: {e}"
 
+def build_card(title, elements, template="blue"):
+    """
+    Wraps card elements into a Feishu interactive message payload.
+    """
+    return {
+        "msg_type": "interactive",
+        "card": {
+            "config": {
+                "wide_screen_mode": True
+            },
+            "header": {
+                "title": {
+                    "tag": "plain_text",
+                    "content": title
+                },
+                "template": template
+            },
+            "elements": elements
+        }
+    }
+
+def get_run_info(hours=24):
+    """
+    Summarizes the job runs recorded in the run ledger (by the daemon) over the last `hours`.
+    Returns None when nothing was recorded, e.g. when the jobs run from cron instead.
+    """
+    from .run_ledger import RunLedger
+
+    ledger = RunLedger()
+    try:
+        summaries = ledger.summary(time.time() - hours * 3600)
+    finally:
+        ledger.close()
+    if not summaries:
+        return None
+
+    lines = []
+    for s in summaries:
+        failed = s["runs"] - s["ok"]
+        status = "✅" if s["last_outcome"] == "ok" else "❌"
+        lines.append(
+            f"{status} **{s['job']}**: {s['runs']} runs ({failed} failed), {s['items']} items, "
+            f"avg {s['avg_duration']:.1f}s / max {s['max_duration']:.1f}s, "
+            f"last {datetime.fromtimestamp(s['last_started']):%m-%d %H:%M}"
+        )
+        if s["last_outcome"] != "ok" and s["last_note"]:
+            lines.append(f"  last error: {s['last_note']}")
+    return "\n".join(lines)
+
+def get_metrics_info():
+    """
+    Summarizes the per-stage metrics every job recorded since the previous report,
+    and starts the next reporting period.
+    """
+    snapshots = metrics.collect_snapshots(reset=True)
+    if not snapshots:
+        return "No metrics recorded since the last report."
+    return "\n\n".join(metrics.summarize(data) for data in snapshots)
+
+def get_trend_info():
+    """
+    Lists the busiest (subreddit, keyword) series of the last hours from the trend store.
+    """
+    from .trends import WINDOW_HOURS, current_trends
+
+    rows = current_trends(top=5)
+    if not rows:
+        return "No keyword trends recorded yet."
+    lines = []
+    for row in rows:
+        baseline = f"usually {row['expected']:.1f}, z {row['z']:+.1f}" if row["z"] is not None else "no baseline yet"
+        lines.append(f"r/{row['subreddit']} · {row['keyword']}: {row['recent']} in {WINDOW_HOURS}h ({baseline})")
+    return "\n".join(lines)
+
 def send_feishu_report():
     webhook_url = config.FEISHU_WEBHOOK_URL
     if not webhook_url:
@@ -37,96 +110,111 @@ def send_feishu_report():
     project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     script_path = os.path.abspath(__file__)
     
-    # Get Task Info
-    cron_info = get_crontab_info()
-    if cron_info == "Unable to read system crontab (Permission Denied or Empty). Please check manually.":
-        # Simulate what the cron WOULD be based on cron_setup.sh
-        cron_info = f"""(System crontab not readable)\nExpected Tasks based on setup:\n0 9 * * * python3 {project_root}/marketing/reddit_bot/report_tasks.py"""
+    # Get Task Info: what the daemon actually ran, or what cron is set up to run
+    run_info = get_run_info()
+    if run_info is not None:
+        tasks_title = "**📋 Job Runs (last 24h):**"
+        tasks_info = run_info
+    else:
+        tasks_title = "**📋 Active Crontab Tasks:**"
+        cron_info = get_crontab_info()
+        if cron_info == "Unable to read system crontab (Permission Denied or Empty). Please check manually.":
+            # Simulate what the cron WOULD be based on cron_setup.sh
+            cron_info = f"""(System crontab not readable)\nExpected Tasks based on setup:\n0 9 * * * python3 {project_root}/marketing/reddit_bot/report_tasks.py"""
+        tasks_info = f"```{cron_info}```"
     
+    metrics_info = get_metrics_info()
+    trend_info = get_trend_info()
+
     # Check if services are PAUSED
     paused_status = "🟢 Running"
     paused_file = os.path.join(os.path.dirname(__file__), "PAUSED")
     if os.path.exists(paused_file):
         paused_status = "🔴 PAUSED (Maintenance Mode)"
 
-    payload = {
-        "msg_type": "interactive",
-        "card": {
-            "config": {
-                "wide_screen_mode": True
-            },
-            "header": {
-                "title": {
-                    "tag": "plain_text",
-                    "content": "🤖 Daily Server Task Report"
-                },
-                "template": "blue"
-            },
-            "elements": [
+    payload = build_card("🤖 Daily Server Task Report", [
+        {
+            "tag": "div",
+            "fields": [
                 {
-                    "tag": "div",
-                    "fields": [
-                        {
-                            "is_short": True,
-                            "text": {
-                                "tag": "lark_md",
-                                "content": f"**Time:**\n{current_time}"
-                            }
-                        },
-                        {
-                            "is_short": True,
-                            "text": {
-                                "tag": "lark_md",
-                                "content": f"**Status:**\n{paused_status}"
-                            }
-                        }
-                    ]
-                },
-                {
-                    "tag": "div",
+                    "is_short": True,
                     "text": {
                         "tag": "lark_md",
-                        "content": f"**Project Root:**\n`{project_root}`"
+                        "content": f"**Time:**\n{current_time}"
                     }
                 },
                 {
-                    "tag": "hr"
-                },
-                {
-                    "tag": "div",
+                    "is_short": True,
                     "text": {
                         "tag": "lark_md",
-                        "content": "**📋 Active Crontab Tasks:**"
+                        "content": f"**Status:**\n{paused_status}"
                     }
-                },
-                {
-                    "tag": "div",
-                    "text": {
-                        "tag": "lark_md",
-                        "content": f"```{cron_info}```"
-                    }
-                },
+                }
+            ]
+        },
+        {
+            "tag": "div",
+            "text": {
+                "tag": "lark_md",
+                "content": f"**Project Root:**\n`{project_root}`"
+            }
+        },
+        {
+            "tag": "hr"
+        },
+        {
+            "tag": "div",
+            "text": {
+                "tag": "lark_md",
+                "content": tasks_title
+            }
+        },
+        {
+            "tag": "div",
+            "text": {
+                "tag": "lark_md",
+                "content": tasks_info
+            }
+        },
+        {
+            "tag": "hr"
+        },
+        {
+            "tag": "div",
+            "text": {
+                "tag": "lark_md",
+                "content": f"**📈 Pipeline Metrics (since last report):**\n{metrics_info}"
+            }
+        },
+        {
+            "tag": "div",
+            "text": {
+                "tag": "lark_md",
+                "content": f"**🔥 Keyword Trends:**\n{trend_info}"
+            }
+        },
+        {
+            "tag": "note",
+            "elements": [
                 {
-                    "tag": "note",
-                    "elements": [
-                        {
-                            "tag": "plain_text",
-                            "content": f"Report generated by: {script_path}"
-                        }
-                    ]
+                    "tag": "plain_text",
+                    "content": f"Report generated by: {script_path}"
                 }
             ]
         }
-    }
+    ])
 
-    try:
-        response = requests.post(webhook_url, json=payload)
-        if response.status_code == 200:
-            print("Feishu report sent successfully.")
-        else:
-            print(f"Failed to send Feishu report: {response.text}")
-    except Exception as e:
-        print(f"Error sending report: {e}")
+    # Delivered in the background with retries; undelivered reports are spooled for the next run.
+    get_notifier().send(payload)
+    print("Feishu report queued.")
 
 if __name__ == "__main__":
-    send_feishu_report()
+    import argparse
+    from .profiling import add_profile_argument, profiled
+    parser = argparse.ArgumentParser(description="Send the daily task report to Feishu.")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    metrics.init("report_tasks")
+    with profiled("report_tasks", args.profile):
+        send_feishu_report()
@@ -0,0 +1,116 @@
+import contextlib
+import time
+from . import config
+from .storage import connect
+
+DB_NAME = "runs.db"
+# Runs older than this are dropped from the ledger.
+RETENTION_SECONDS = 30 * 24 * 3600
+
+
+class Run:
+    """
+    Handle for a run in progress; the job sets items (and optionally a note) before it returns.
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.items = 0
+        self.note = None
+
+
+class RunLedger:
+    """
+    Records every scheduled job run (start, duration, items handled, outcome) in SQLite,
+    so the daily report can show what actually ran instead of what cron is supposed to run.
+    """
+
+    def __init__(self, db_path=None):
+        db_path = db_path or config.data_path(DB_NAME)
+        self.conn = connect(db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY,
+                job TEXT NOT NULL,
+                started_at REAL NOT NULL,
+                duration REAL NOT NULL,
+                items INTEGER NOT NULL DEFAULT 0,
+                outcome TEXT NOT NULL,
+                note TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_runs_job_started ON runs(job, started_at);
+            CREATE TABLE IF NOT EXISTS feed_schedule (
+                url TEXT PRIMARY KEY,
+                interval REAL NOT NULL,
+                rate REAL NOT NULL,
+                last_polled REAL NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+    @contextlib.contextmanager
+    def record(self, job):
+        """
+        Times the enclosed block and stores it as one run. An exception marks the run
+        as failed (with the error as its note) and is re-raised.
+        """
+        run = Run(job)
+        started = time.time()
+        outcome = "ok"
+        try:
+            yield run
+        except BaseException as e:
+            outcome = "error"
+            run.note = f"{type(e).__name__}: {e}"[:500]
+            raise
+        finally:
+            self.conn.execute(
+                "INSERT INTO runs (job, started_at, duration, items, outcome, note) VALUES (?, ?, ?, ?, ?, ?)",
+                (job, started, time.time() - started, run.items, outcome, run.note),
+            )
+            self.conn.commit()
+
+    def summary(self, since):
+        """
+        Per-job totals since a unix timestamp, as dicts ordered by job name.
+        """
+        rows = self.conn.execute("""
+            SELECT job, COUNT(*), SUM(outcome = 'ok'), SUM(items), AVG(duration), MAX(duration), MAX(started_at)
+            FROM runs WHERE started_at >= ? GROUP BY job ORDER BY job
+        """, (since,)).fetchall()
+        summaries = []
+        for job, runs, ok, items, avg_duration, max_duration, last_started in rows:
+            last = self.conn.execute(
+                "SELECT outcome, note FROM runs WHERE job = ? ORDER BY started_at DESC LIMIT 1", (job,)
+            ).fetchone()
+            summaries.append({
+                "job": job, "runs": runs, "ok": ok, "items": items, "avg_duration": avg_duration,
+                "max_duration": max_duration, "last_started": last_started,
+                "last_outcome": last[0], "last_note": last[1],
+            })
+        return summaries
+
+    def load_feed_schedule(self):
+        """
+        Returns {url: (interval, rate, last_polled)} as saved by the daemon.
+        """
+        return {
+            url: (interval, rate, last_polled)
+            for url, interval, rate, last_polled in self.conn.execute(
+                "SELECT url, interval, rate, last_polled FROM feed_schedule"
+            )
+        }
+
+    def save_feed_schedule(self, url, interval, rate, last_polled):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO feed_schedule (url, interval, rate, last_polled) VALUES (?, ?, ?, ?)",
+            (url, interval, rate, last_polled),
+        )
+        self.conn.commit()
+
+    def prune(self):
+        self.conn.execute("DELETE FROM runs WHERE started_at < ?", (time.time() - RETENTION_SECONDS,))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,108 @@
+# numpy is imported inside the functions so CLI startup doesn't pay for it.
+
+# BM25F parameters. A keyword in the title counts more than one buried in the body.
+FIELDS = ("title", "body")
+FIELD_WEIGHTS = (2.5, 1.0)
+K1 = 1.2
+B = 0.75
+
+# Posts scoring below this are still stored, but not printed for review.
+DEFAULT_MIN_SCORE = 1.5
+
+# Scoring against a corpus assumes this many documents without any hit on top of the
+# ones counted, about one feed page. Until a subreddit's corpus has grown, a keyword is
+# then treated as rare instead of as common as the few posts seen so far make it look.
+PRIOR_DOCS = 25
+
+
+def text_length(text):
+    """
+    Token count used for length normalization.
+    """
+    return text.count(" ") + 1 if text else 0
+
+
+def score_documents(field_hits, field_lengths, field_weights=FIELD_WEIGHTS, k1=K1, b=B, corpora=None):
+    """
+    Scores a whole batch of documents at once with BM25F.
+
+    field_hits: one entry per document, each a sequence with one list of matcher Hits per field
+                (same order as FIELDS). Documents without hits score 0.
+    field_lengths: (n_docs, n_fields) token counts.
+    corpora: optional, one (n_docs, {keyword: document frequency}) per document, usually its
+             subreddit's entry from MatchStore.update_corpus.
+
+    IDF comes from the corpus (or, without one, from the batch itself), so a keyword that
+    shows up in every post ("excel" in r/excel) adds little, while a rare one ("merge") stands
+    out. A batch is only a reliable corpus when it is large: scored alone, a single new post
+    makes each of its keywords look as common as possible.
+    Returns a float array of scores, one per document.
+    """
+    import numpy as np
+
+    n_docs = len(field_hits)
+    if n_docs == 0:
+        return np.zeros(0)
+    lengths = np.asarray(field_lengths, dtype=float).reshape(n_docs, -1)
+
+    # Flatten every hit into parallel (doc, field, keyword) index arrays - the only Python loop.
+    vocab = {}
+    docs, fields, terms = [], [], []
+    for d, per_field in enumerate(field_hits):
+        for f, hits in enumerate(per_field):
+            for hit in hits:
+                docs.append(d)
+                fields.append(f)
+                terms.append(vocab.setdefault(hit.keyword, len(vocab)))
+    if not docs:
+        return np.zeros(n_docs)
+    docs = np.array(docs)
+    fields = np.array(fields)
+    terms = np.array(terms)
+    n_terms = len(vocab)
+
+    # Per-field length normalization, then field-weighted term frequency.
+    avg = lengths.mean(axis=0)
+    avg[avg == 0] = 1.0
+    norm = 1.0 - b + b * lengths / avg
+    contrib = np.asarray(field_weights, dtype=float)[fields] / norm[docs, fields]
+
+    # Sparse (doc, term) tf matrix kept as flat keys.
+    keys, inverse = np.unique(docs * n_terms + terms, return_inverse=True)
+    tf = np.bincount(inverse, weights=contrib)
+    key_docs = keys // n_terms
+    key_terms = keys % n_terms
+
+    if corpora is None:
+        df = np.bincount(key_terms, minlength=n_terms)
+        idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))[key_terms]
+    else:
+        # Documents of one subreddit share their corpus: build a (corpus, term) df table
+        # once and gather from it, instead of looking up every (doc, term) pair.
+        index, unique = {}, []
+        for corpus in corpora:
+            if id(corpus) not in index:
+                index[id(corpus)] = len(unique)
+                unique.append(corpus)
+        doc_corpus = np.array([index[id(corpus)] for corpus in corpora])
+        corpus_docs = np.array([docs_counted for docs_counted, _ in unique], dtype=float) + PRIOR_DOCS
+        df_table = np.array([[frequencies.get(keyword, 0) for keyword in vocab] for _, frequencies in unique],
+                            dtype=float)
+        key_corpus = doc_corpus[key_docs]
+        df = df_table[key_corpus, key_terms]
+        idf = np.log(1.0 + (corpus_docs[key_corpus] - df + 0.5) / (df + 0.5))
+
+    term_scores = idf * tf * (k1 + 1.0) / (tf + k1)
+    return np.bincount(key_docs, weights=term_scores, minlength=n_docs)
+
+
+def rank(items, scores, min_score=DEFAULT_MIN_SCORE):
+    """
+    Returns [(score, item), ...] at or above min_score, best first.
+    """
+    import numpy as np
+
+    scores = np.asarray(scores)
+    order = np.argsort(-scores, kind="stable")
+    keep = order[scores[order] >= min_score]
+    return [(float(scores[i]), items[i]) for i in keep]
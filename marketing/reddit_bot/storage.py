@@ -0,0 +1,84 @@
+"""
+Persistence helpers shared by the bot's stores, caches and checkpoint files.
+"""
+import json
+import os
+import sqlite3
+import time
+
+
+def connect(db_path, **kwargs):
+    """
+    Opens a SQLite database in WAL mode (readers don't block the writer), creating its
+    directory first. kwargs are passed on to sqlite3.connect.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30, **kwargs)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def write_text(path, text, mode=None):
+    """
+    Replaces path with text through a temporary file, so readers see the old or the new
+    content, never half of it. With mode, the file is created with those permissions.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    if mode is None:
+        f = open(tmp_path, 'w', encoding='utf-8')
+    else:
+        # Created with the mode from the start, so the content is never exposed, even briefly
+        f = os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode), 'w', encoding='utf-8')
+        os.chmod(tmp_path, mode)
+    with f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def write_json(path, data, mode=None, **kwargs):
+    """
+    write_text for JSON; kwargs are passed on to json.dumps.
+    """
+    write_text(path, json.dumps(data, **kwargs), mode)
+
+
+def read_json(path, default=None):
+    """
+    Returns the JSON in path, or default if it is missing or unreadable.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+class TTLStore:
+    """
+    Base for SQLite caches whose rows expire. Subclasses name their TABLE, its KEY column
+    and the TIME_COLUMN rows are stamped with, and create the table in __init__.
+    close() evicts expired rows, then the oldest ones beyond max_entries.
+    """
+
+    TABLE = None
+    KEY = None
+    TIME_COLUMN = None
+
+    def __init__(self, db_path, ttl_seconds, max_entries):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.conn = connect(db_path)
+
+    def prune(self):
+        self.conn.execute(f"DELETE FROM {self.TABLE} WHERE {self.TIME_COLUMN} < ?", (time.time() - self.ttl_seconds,))
+        self.conn.execute(f"""
+            DELETE FROM {self.TABLE} WHERE {self.KEY} IN (
+                SELECT {self.KEY} FROM {self.TABLE} ORDER BY {self.TIME_COLUMN} DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+        self.conn.commit()
+
+    def close(self):
+        self.prune()
+        self.conn.close()
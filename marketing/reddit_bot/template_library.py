@@ -0,0 +1,234 @@
+import hashlib
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from . import config
+from .storage import read_json, write_json
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "content_templates")
+INDEX_NAME = "template_index.json"
+
+_TITLE_RE = re.compile(r'\*\*Title\*\*:\s*(.+)')
+_PLACEHOLDER_RE = re.compile(r'\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}')
+_FRONT_MATTER_LINE_RE = re.compile(r'[A-Za-z_][A-Za-z0-9_-]*\s*:')
+# Bumped whenever parsing changes, so templates cached by an older parser are parsed again.
+PARSER_VERSION = 2
+
+
+class Template:
+    """
+    A parsed content template.
+    title is None for plain templates (no **Title**/**Body** markers, e.g. tweets).
+    Placeholders like {{ url }} are split out once so render() is a simple join.
+    """
+
+    def __init__(self, path, title, body, metadata):
+        self.path = path
+        self.title = title
+        self.body = body
+        self.metadata = metadata
+        self._title_parts = _compile(title or "")
+        self._body_parts = _compile(body)
+        self.placeholders = sorted({
+            name for parts in (self._title_parts, self._body_parts) for is_var, name, _ in parts if is_var
+        })
+
+    def render(self, **values):
+        """
+        Fills placeholders (front-matter values are the defaults). Returns (title, body).
+        Unknown placeholders are left as they are.
+        """
+        values = {**self.metadata, **values}
+        return _render(self._title_parts, values) if self.title is not None else None, _render(self._body_parts, values)
+
+    def to_dict(self):
+        return {"title": self.title, "body": self.body, "metadata": self.metadata}
+
+
+def _compile(text):
+    parts = []
+    pos = 0
+    for match in _PLACEHOLDER_RE.finditer(text):
+        if match.start() > pos:
+            parts.append((False, None, text[pos:match.start()]))
+        parts.append((True, match.group(1), match.group(0)))
+        pos = match.end()
+    if pos < len(text):
+        parts.append((False, None, text[pos:]))
+    return parts
+
+
+def _render(parts, values):
+    return "".join(str(values[name]) if is_var and name in values else raw for is_var, name, raw in parts)
+
+
+def _split_front_matter(content):
+    """
+    Splits an optional leading front matter block from the content: a '---' line, only
+    'key: value' lines (blank lines and '#' comments allowed), then a closing '---' line.
+    Anything else, like a template that opens with a '---' horizontal rule, is left untouched.
+    """
+    lines = content.split("\n")
+    if lines[0].rstrip() != "---":
+        return {}, content
+    metadata = {}
+    for i, line in enumerate(lines[1:], 1):
+        stripped = line.strip()
+        if stripped == "---":
+            return metadata, "\n".join(lines[i + 1:]).lstrip("\n")
+        if not stripped or stripped.startswith("#"):
+            continue
+        if not _FRONT_MATTER_LINE_RE.match(stripped):
+            return {}, content
+        key, value = stripped.split(":", 1)
+        metadata[key.strip()] = value.strip().strip('"\'')
+    return {}, content
+
+
+def parse_content(path, content):
+    """
+    Parses template text. Expected format (front matter optional):
+    ---
+    subreddit: excel
+    ---
+    **Title**: My Title Here
+
+    **Body**:
+    My body here...
+    """
+    metadata, content = _split_front_matter(content)
+    has_title = "**Title**" in content
+    has_body = "**Body**" in content
+    if not has_title and not has_body:
+        return Template(path, None, content.strip(), metadata)
+
+    title_match = _TITLE_RE.search(content)
+    if not title_match:
+        raise ValueError("Could not find '**Title**:' in template")
+    if not has_body:
+        raise ValueError("Could not find '**Body**:' in template")
+    # Body is everything after the **Body** marker
+    body = content.split("**Body**", 1)[1].lstrip(": \n").strip()
+    return Template(path, title_match.group(1).strip(), body, metadata)
+
+
+class TemplateLibrary:
+    """
+    Parsed templates cached by path. A file is only re-read when its mtime/size change,
+    and only re-parsed when its content hash changes. The cache is persisted to
+    INDEX_NAME under DATA_DIR so separate runs (repeated --dry-run checks) skip parsing too.
+    """
+
+    def __init__(self, index_path=None):
+        self.index_path = index_path or config.data_path(INDEX_NAME)
+        self._lock = threading.Lock()
+        self._templates = {}
+        self._index = None
+        self._dirty = False
+
+    def _load_index(self):
+        if self._index is not None:
+            return
+        self._index = {}
+        if self.index_path:
+            self._index = read_json(self.index_path, {})
+
+    def save(self):
+        with self._lock:
+            if not self._dirty or not self.index_path:
+                return
+            write_json(self.index_path, self._index)
+            self._dirty = False
+
+    def get(self, file_path):
+        """
+        Returns the Template for file_path, parsing it only if it changed.
+        """
+        path = os.path.abspath(file_path)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Template not found: {file_path}")
+        stamp = [st.st_mtime_ns, st.st_size]
+
+        with self._lock:
+            self._load_index()
+            cached = self._templates.get(path)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+            entry = self._index.get(path)
+            if entry is not None and entry.get("parser") != PARSER_VERSION:
+                entry = None
+            if entry is not None and entry["stamp"] == stamp:
+                template = Template(path, **entry["template"])
+                self._templates[path] = (stamp, template)
+                return template
+
+        with open(path, 'rb') as f:
+            raw = f.read()
+        digest = hashlib.sha1(raw).hexdigest()
+
+        with self._lock:
+            entry = self._index.get(path)
+            if entry is not None and entry.get("parser") == PARSER_VERSION and entry["sha1"] == digest:
+                # Touched but unchanged
+                template = Template(path, **entry["template"])
+            else:
+                template = parse_content(path, raw.decode('utf-8'))
+            self._index[path] = {"stamp": stamp, "sha1": digest, "parser": PARSER_VERSION,
+                                 "template": template.to_dict()}
+            self._templates[path] = (stamp, template)
+            self._dirty = True
+            return template
+
+    def validate_all(self, directory=TEMPLATES_DIR, workers=8):
+        """
+        Parses every *.md template in directory in parallel.
+        Returns [(path, Template or None, error or None), ...] sorted by path.
+        """
+        paths = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".md")
+        )
+
+        def check(path):
+            try:
+                return path, self.get(path), None
+            except (OSError, ValueError, UnicodeDecodeError) as e:
+                return path, None, str(e)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(paths) or 1))) as pool:
+            results = list(pool.map(check, paths))
+        self.save()
+        return results
+
+
+_library = None
+
+
+def get_library():
+    global _library
+    if _library is None:
+        _library = TemplateLibrary()
+    return _library
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Parse and validate every content template.")
+    parser.add_argument("--dir", default=TEMPLATES_DIR, help="Templates directory")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    failed = 0
+    for path, template, error in get_library().validate_all(args.dir, args.workers):
+        name = os.path.relpath(path, args.dir)
+        if error:
+            failed += 1
+            print(f"[ERROR] {name}: {error}")
+        elif template.title is None:
+            print(f"[OK] {name}: plain template ({len(template.body)} chars)")
+        else:
+            extra = f", placeholders: {', '.join(template.placeholders)}" if template.placeholders else ""
+            print(f"[OK] {name}: {template.title[:60]}{extra}")
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,56 @@
+"""
+Run from the repository root: python -m pytest marketing/reddit_bot/tests
+"""
+import math
+import time
+
+import pytest
+
+from marketing.reddit_bot import daemon as daemon_module
+from marketing.reddit_bot.daemon import MIN_POLL_SECONDS, Daemon, FeedSchedule
+from marketing.reddit_bot.run_ledger import RunLedger
+
+
+@pytest.fixture
+def make_daemon(tmp_path, monkeypatch):
+    monkeypatch.setattr(daemon_module, "RunLedger", lambda: RunLedger(str(tmp_path / "runs.db")))
+
+    def make():
+        d = Daemon([("excel", "https://www.reddit.com/r/excel/new/.rss")], inbox_interval=0, report_time=None)
+        d.spool_due = math.inf
+        return d
+
+    return make
+
+
+def test_failed_scan_backs_off(make_daemon, monkeypatch):
+    calls = []
+
+    def failing_scan(urls, **kwargs):
+        calls.append(urls)
+        raise OSError("database is locked")
+
+    monkeypatch.setattr(daemon_module, "monitor_subreddit_rss", failing_scan)
+    d = make_daemon()
+    start = time.time()
+    for second in range(5):
+        d.run_once(start + second)
+    assert len(calls) == 1
+
+    feed = d.feeds[0]
+    assert feed.next_due == pytest.approx(start + MIN_POLL_SECONDS, abs=5)
+    d.run_once(feed.next_due)
+    assert len(calls) == 2
+    # The second failure waits twice as long
+    assert feed.next_due == pytest.approx(time.time() + 2 * MIN_POLL_SECONDS, abs=5)
+
+
+def test_success_after_failure_resets_backoff():
+    feed = FeedSchedule("excel", "url", interval=600, last_polled=1000.0)
+    feed.failed(1600.0)
+    feed.failed(1900.0)
+    assert feed.next_due == 1900.0 + 2 * MIN_POLL_SECONDS
+    feed.update(4, 2500.0)
+    assert feed.failures == 0
+    assert feed.last_polled == 2500.0
+    assert feed.next_due == 2500.0 + feed.interval
@@ -0,0 +1,58 @@
+"""
+Run from the repository root: python -m pytest marketing/reddit_bot/tests
+"""
+import time
+
+from marketing.reddit_bot.dedupe import DedupeIndex, minhash, similarity, tokens
+
+QUESTION = "How can I merge several CSV exports into one workbook and remove duplicate customer rows automatically"
+REPOST = "How can I merge several CSV exports into one workbook and remove duplicate customer rows quickly"
+OTHER = "Pivot table refuses to refresh after upgrading Office, slicers show stale values from last month"
+
+
+def test_similarity_estimates_overlap():
+    assert similarity(minhash(tokens(QUESTION)), minhash(tokens(QUESTION))) == 1.0
+    assert similarity(minhash(tokens(QUESTION)), minhash(tokens(OTHER))) < 0.25
+
+
+def test_tokens_drop_stopwords_and_html():
+    assert tokens("<p>How do I <b>merge</b> the CSV?</p>") == {"merge", "csv"}
+
+
+def test_repost_points_at_the_first_copy(tmp_path):
+    index = DedupeIndex(str(tmp_path / "dedupe.db"))
+    assert index.check("t3_a", "Excel", "Merge CSVs", "https://r/a", QUESTION) is None
+    original = index.check("t3_b", "excel", "Merge CSVs?", "https://r/b", REPOST)
+    assert original["entry_id"] == "t3_a"
+    assert original["subreddit"] == "excel"
+    assert original["similarity"] >= index.threshold
+    # A third copy is reported against the first, not the second
+    assert index.check("t3_c", "vba", "Merge CSVs!", "https://r/c", REPOST)["entry_id"] == "t3_a"
+    assert index.check("t3_d", "excel", "Pivot", "https://r/d", OTHER) is None
+
+
+def test_seen_again_keeps_its_verdict(tmp_path):
+    index = DedupeIndex(str(tmp_path / "dedupe.db"))
+    index.check("t3_a", "excel", "Merge CSVs", None, QUESTION)
+    assert index.check("t3_a", "excel", "Merge CSVs", None, QUESTION) is None
+    index.check("t3_b", "excel", "Merge CSVs?", None, REPOST)
+    assert index.check("t3_b", "excel", "Merge CSVs?", None, REPOST)["entry_id"] == "t3_a"
+
+
+def test_short_texts_are_never_flagged(tmp_path):
+    index = DedupeIndex(str(tmp_path / "dedupe.db"))
+    assert index.check("t3_a", "excel", "Help", None, "excel help please") is None
+    assert index.check("t3_b", "excel", "Help", None, "excel help please") is None
+    assert index.check("", "excel", "Help", None, QUESTION) is None
+
+
+def test_expired_posts_are_forgotten(tmp_path):
+    db_path = str(tmp_path / "dedupe.db")
+    index = DedupeIndex(db_path)
+    index.check("t3_a", "excel", "Merge CSVs", None, QUESTION)
+    index.conn.execute("UPDATE posts SET seen_at = ?", (time.time() - index.ttl_seconds - 1,))
+    index.conn.commit()
+    index.close()
+    index = DedupeIndex(db_path)
+    assert index.conn.execute("SELECT COUNT(*) FROM lsh_bands").fetchone()[0] == 0
+    assert index.check("t3_b", "excel", "Merge CSVs?", None, REPOST) is None
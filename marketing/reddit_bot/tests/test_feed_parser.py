@@ -0,0 +1,99 @@
+"""
+Run from the repository root: python -m pytest marketing/reddit_bot/tests
+"""
+import os
+
+import pytest
+
+from marketing.reddit_bot.feed_parser import FeedEntry, FeedParseError, parse_feed
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "benchmarks", "fixtures", "reddit_excel_new.atom")
+
+ATOM = b"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>newest submissions : excel</title>
+  <entry>
+    <id>t3_aaa</id>
+    <title> Merge two sheets </title>
+    <link rel="self" href="https://example.com/self"/>
+    <link href="https://www.reddit.com/r/excel/comments/aaa/"/>
+    <updated>2026-10-18T08:00:00+00:00</updated>
+    <published>2026-10-18T07:00:00+00:00</published>
+    <content type="html">&lt;p&gt;How do I merge?&lt;/p&gt;</content>
+  </entry>
+  <entry>
+    <id>t3_bbb</id>
+    <title>Clean CSV</title>
+    <link rel="alternate" href="https://www.reddit.com/r/excel/comments/bbb/"/>
+    <updated>2026-10-18T09:00:00+00:00</updated>
+    <summary>Only a summary</summary>
+  </entry>
+</feed>
+"""
+
+RSS = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Blog</title>
+  <item>
+    <guid>post-1</guid>
+    <title>Combine workbooks</title>
+    <link>https://blog.example.com/post-1</link>
+    <pubDate>Sat, 18 Oct 2026 07:00:00 GMT</pubDate>
+    <description>Merging many files</description>
+  </item>
+</channel></rss>
+"""
+
+
+def chunked(data, size):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+def test_atom_fields():
+    first, second = parse_feed(ATOM)
+    assert first == FeedEntry(
+        id="t3_aaa",
+        title="Merge two sheets",
+        link="https://www.reddit.com/r/excel/comments/aaa/",
+        published="2026-10-18T07:00:00+00:00",
+        summary="<p>How do I merge?</p>",
+    )
+    # Falls back to <updated> and <summary>
+    assert second.published == "2026-10-18T09:00:00+00:00"
+    assert second.summary == "Only a summary"
+
+
+@pytest.mark.parametrize("size", [1, 7, 4096])
+def test_atom_in_chunks(size):
+    assert parse_feed(chunked(ATOM, size)) == parse_feed(ATOM)
+
+
+def test_recorded_reddit_feed():
+    with open(FIXTURE, "rb") as f:
+        data = f.read()
+    entries = parse_feed(chunked(data, 1024))
+    assert entries
+    assert all(entry.id and entry.title and entry.link.startswith("https://www.reddit.com/") for entry in entries)
+
+
+def test_rss_falls_back_to_feedparser():
+    pytest.importorskip("feedparser")
+    [entry] = parse_feed(chunked(RSS, 16))
+    assert entry.id == "post-1"
+    assert entry.title == "Combine workbooks"
+    assert entry.link == "https://blog.example.com/post-1"
+    assert entry.summary == "Merging many files"
+
+
+def test_broken_atom_falls_back_with_every_chunk():
+    pytest.importorskip("feedparser")
+    # Unescaped '&' is an XML error halfway through; feedparser still gets the whole document
+    broken = ATOM.replace(b"<title>Clean CSV</title>", b"<title>Clean & CSV</title>")
+    entries = parse_feed(chunked(broken, 64))
+    assert [entry.id for entry in entries] == ["t3_aaa", "t3_bbb"]
+
+
+def test_garbage_raises():
+    pytest.importorskip("feedparser")
+    with pytest.raises(FeedParseError):
+        parse_feed(b"\x00\x01 not a feed")
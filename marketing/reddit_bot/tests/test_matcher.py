@@ -0,0 +1,85 @@
+"""
+Run from the repository root: python -m pytest marketing/reddit_bot/tests
+"""
+import pytest
+
+from marketing.reddit_bot import matcher as matcher_module
+from marketing.reddit_bot.matcher import KeywordMatcher, match_fields, normalize_text, unique_keywords
+
+
+def keywords(hits):
+    return [hit.keyword for hit in hits]
+
+
+def test_word_boundaries():
+    m = KeywordMatcher({"default": ["clean", "csv"]})
+    assert keywords(m.find_all("unclean data")) == []
+    assert keywords(m.find_all("cleaned up")) == []
+    assert keywords(m.find_all("csvs")) == []
+    assert keywords(m.find_all("clean, then csv.")) == ["clean", "csv"]
+
+
+def test_hit_offsets_refer_to_the_text():
+    m = KeywordMatcher({"default": ["csv"]})
+    text = "merge a csv file"
+    [hit] = m.find_all(text)
+    assert text[hit.start:hit.end] == "csv"
+
+
+def test_prefix_keyword():
+    m = KeywordMatcher({"default": ["merg*"]})
+    assert keywords(m.find_all("merging sheets, merged sheets")) == ["merg*", "merg*"]
+    # Still anchored at the start of a word
+    assert m.find_all("emerge") == []
+
+
+def test_phrase_keyword():
+    m = KeywordMatcher({"default": ["messy data"]})
+    assert keywords(m.find_all("such messy data")) == ["messy data"]
+    assert m.find_all("messy spreadsheet data") == []
+    assert keywords(m.match("Such MESSY\n data")["default"]) == ["messy data"]
+
+
+def test_overlapping_keywords():
+    m = KeywordMatcher({"default": ["data", "messy data", "data clean*"]})
+    assert sorted(keywords(m.find_all("messy data cleaning"))) == ["data", "data clean*", "messy data"]
+
+
+def test_normalize_strips_html_and_entities():
+    assert normalize_text("<p>Merge &amp; <b>Clean</b></p>\n\n CSV") == "merge & clean csv"
+    assert normalize_text(None) == ""
+
+
+def test_html_is_not_matched():
+    m = KeywordMatcher({"default": ["table"]})
+    assert m.match('<table class="x">no match here</table>') == {}
+
+
+def test_match_groups_hits_by_profile():
+    m = KeywordMatcher({"default": ["csv"], "finance": ["csv", "ledger"]})
+    result = m.match("csv ledger")
+    assert keywords(result["default"]) == ["csv"]
+    assert keywords(result["finance"]) == ["csv", "ledger"]
+
+
+def test_per_subreddit_profiles(monkeypatch):
+    monkeypatch.setitem(matcher_module.SUBREDDIT_PROFILES, "accounting", ["finance"])
+    m = KeywordMatcher({"default": ["excel"], "finance": ["ledger"]})
+    assert keywords(m.match_subreddit("Accounting", "excel ledger")) == ["ledger"]
+    # Subreddits without an entry use the default profile
+    assert keywords(m.match_subreddit("somewhere", "excel ledger")) == ["excel"]
+    assert m.keywords_for("accounting") == ["ledger"]
+
+
+def test_match_fields_and_unique_keywords():
+    m = KeywordMatcher({"default": ["csv", "merge"]})
+    title_text, body_text, title_hits, body_hits = match_fields(m, "excel", "Merge CSV", "<p>csv, csv and csv</p>")
+    assert (title_text, body_text) == ("merge csv", "csv, csv and csv")
+    assert keywords(title_hits) == ["merge", "csv"]
+    assert unique_keywords(body_hits) == ["csv"]
+
+
+@pytest.mark.parametrize("word", ["", "*", "   "])
+def test_empty_keywords_are_ignored(word):
+    m = KeywordMatcher({"default": [word, "csv"]})
+    assert keywords(m.find_all("a csv")) == ["csv"]
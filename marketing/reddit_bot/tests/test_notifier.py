@@ -0,0 +1,82 @@
+"""
+Run from the repository root: python -m pytest marketing/reddit_bot/tests
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from marketing.reddit_bot.notifier import CLAIM_SUFFIX, FeishuNotifier
+
+
+class Response:
+    status_code = 200
+    text = ""
+
+    def json(self):
+        return {"code": 0}
+
+
+class Session:
+    def __init__(self, block=None):
+        self.posted = []
+        self.block = block
+
+    def post(self, url, json=None, timeout=None):
+        if self.block is not None:
+            self.block.wait(5)
+        self.posted.append(json)
+        return Response()
+
+
+def make(spool_dir, session):
+    return FeishuNotifier(webhook_url="https://example.invalid/hook", spool_dir=str(spool_dir), session=session)
+
+
+def spool(spool_dir, name, payload):
+    os.makedirs(spool_dir, exist_ok=True)
+    with open(os.path.join(spool_dir, name), "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+
+
+def test_two_notifiers_send_a_spooled_message_once(tmp_path):
+    spool(tmp_path, "1.000000-a.json", {"text": "hi"})
+    release = threading.Event()
+    first, second = Session(block=release), Session()
+    sender = make(tmp_path, first)
+    # While the first notifier is posting, a second one (another cron job) drains the spool
+    other = make(tmp_path, second)
+    release.set()
+    assert sender.flush(5) and other.flush(5)
+    assert len(first.posted) + len(second.posted) == 1
+    assert os.listdir(tmp_path) == []
+
+
+def test_live_claim_is_left_alone(tmp_path):
+    spool(tmp_path, f"1.000000-a.json{CLAIM_SUFFIX}{os.getppid()}", {"text": "hi"})
+    session = Session()
+    make(tmp_path, session).flush(5)
+    assert session.posted == []
+
+
+def test_claim_of_a_dead_process_is_retried(tmp_path):
+    dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                          capture_output=True, text=True, check=True)
+    spool(tmp_path, f"1.000000-a.json{CLAIM_SUFFIX}{dead.stdout.strip()}", {"text": "hi"})
+    session = Session()
+    assert make(tmp_path, session).flush(5)
+    assert session.posted == [{"text": "hi"}]
+    assert os.listdir(tmp_path) == []
+
+
+def test_failed_delivery_is_released(tmp_path):
+    class Down(Session):
+        def post(self, url, json=None, timeout=None):
+            raise IOError("connection refused")
+
+    notifier = FeishuNotifier(webhook_url="https://example.invalid/hook", spool_dir=str(tmp_path),
+                              session=Down(), max_attempts=2, backoff_base=0.001)
+    notifier.send({"text": "hi"})
+    assert notifier.flush(5)
+    assert [name.endswith(".json") for name in os.listdir(tmp_path)] == [True]
@@ -0,0 +1,72 @@
+"""
+Run from the repository root: python -m pytest marketing/reddit_bot/tests
+"""
+import threading
+import time
+
+import pytest
+
+from marketing.reddit_bot.rate_limit import PRIORITIES, RateLimiter, current_priority, priority
+
+
+@pytest.fixture
+def make_limiter(tmp_path):
+    def make(**kwargs):
+        return RateLimiter(str(tmp_path / "rate_limit.db"), **kwargs)
+    return make
+
+
+def test_burst_then_refill(make_limiter):
+    # 10 requests per second once the burst is spent
+    limiter = make_limiter(window_limit=100, window_seconds=10, burst=3)
+    assert all(limiter.acquire() < 0.05 for _ in range(3))
+    waited = limiter.acquire()
+    assert 0.05 < waited < 0.5
+    assert limiter.status()["remaining"] == pytest.approx(96, abs=0.01)
+
+
+def test_headers_resync_the_quota(make_limiter):
+    limiter = make_limiter(window_limit=100, window_seconds=600, burst=10)
+    limiter.update({"x-ratelimit-remaining": "3", "x-ratelimit-reset": "120"})
+    status = limiter.status()
+    assert status["remaining"] == 3
+    assert status["tokens"] <= 3
+    assert status["reset_in"] == pytest.approx(120, abs=1)
+    # Malformed headers are ignored
+    limiter.update({"x-ratelimit-remaining": "n/a"})
+    assert limiter.status()["remaining"] == 3
+
+
+def test_higher_priority_waiter_goes_first(make_limiter):
+    limiter = make_limiter(window_limit=100, window_seconds=10, burst=5)
+    # Another process waiting at inbox priority
+    with limiter._transaction() as conn:
+        other = conn.execute("INSERT INTO waiters (priority, pid, heartbeat) VALUES (?, ?, ?)",
+                             (PRIORITIES["inbox"], 1, time.time())).lastrowid
+    done = threading.Event()
+    thread = threading.Thread(target=lambda: (limiter.acquire("backlog"), done.set()), daemon=True)
+    thread.start()
+    assert not done.wait(0.3)
+    with limiter._transaction() as conn:
+        conn.execute("DELETE FROM waiters WHERE id = ?", (other,))
+    assert done.wait(3)
+
+
+def test_low_priority_leaves_the_reserve(make_limiter):
+    limiter = make_limiter(window_limit=100, window_seconds=600, burst=10)
+    limiter.update({"x-ratelimit-remaining": "2", "x-ratelimit-reset": "0.3"})
+    # The last requests of the window are kept for the inbox...
+    assert limiter.acquire("inbox") < 0.05
+    # ...so a backlog request waits for the next window
+    assert limiter.acquire("backlog") >= 0.25
+    assert limiter.status()["remaining"] == pytest.approx(99, abs=0.01)
+
+
+def test_priority_context():
+    assert current_priority() == "scan"
+    with priority("inbox"):
+        assert current_priority() == "inbox"
+        with priority("backlog"):
+            assert current_priority() == "backlog"
+        assert current_priority() == "inbox"
+    assert current_priority() == "scan"
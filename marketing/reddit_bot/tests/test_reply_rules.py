@@ -0,0 +1,78 @@
+"""
+Run from the repository root: python -m pytest marketing/reddit_bot/tests
+"""
+import json
+import os
+
+import pytest
+
+from marketing.reddit_bot.reply_rules import RuleError, RuleTable, load_rules
+
+VALID = {
+    "rules": [
+        {"name": "link", "priority": 30, "keywords": ["link*", "url*"], "reply": "Here is the link, $author."},
+        {"name": "price", "priority": 20, "keywords": ["price*"], "reply": "It is free."},
+    ]
+}
+
+# Valid JSON, wrong types
+INVALID = {
+    "priority_null": {"rules": [{"name": "link", "priority": None, "keywords": ["link"], "reply": "x"}]},
+    "priority_bool": {"rules": [{"name": "link", "priority": True, "keywords": ["link"], "reply": "x"}]},
+    "top_level_list": [{"name": "link", "keywords": ["link"], "reply": "x"}],
+    "rules_not_list": {"rules": {"name": "link", "keywords": ["link"], "reply": "x"}},
+    "rule_not_object": {"rules": ["link"]},
+    "keywords_string": {"rules": [{"name": "link", "keywords": "link", "reply": "x"}]},
+    "keywords_not_strings": {"rules": [{"name": "link", "keywords": ["link", 3], "reply": "x"}]},
+    "keywords_empty": {"rules": [{"name": "link", "keywords": [], "reply": "x"}]},
+    "reply_not_string": {"rules": [{"name": "link", "keywords": ["link"], "reply": ["x"]}]},
+    "name_not_string": {"rules": [{"name": 5, "keywords": ["link"], "reply": "x"}]},
+    "duplicate_name": {"rules": [{"name": "a", "keywords": ["x"], "reply": "x"},
+                                 {"name": "a", "keywords": ["y"], "reply": "y"}]},
+}
+
+
+def write(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def test_load_valid_rules(tmp_path):
+    path = tmp_path / "rules.json"
+    write(path, VALID)
+    rules = load_rules(path)
+    assert [rule.name for rule in rules] == ["link", "price"]
+    assert rules[0].priority == 30
+    assert rules[0].keywords == ["link*", "url*"]
+
+
+@pytest.mark.parametrize("case", sorted(INVALID))
+def test_load_rejects_wrong_types(tmp_path, case):
+    path = tmp_path / "rules.json"
+    write(path, INVALID[case])
+    with pytest.raises(RuleError):
+        load_rules(path)
+
+
+@pytest.mark.parametrize("case", sorted(INVALID))
+def test_reload_keeps_previous_rules(tmp_path, case):
+    path = tmp_path / "rules.json"
+    write(path, VALID)
+    table = RuleTable(str(path), check_interval=0)
+    write(path, INVALID[case])
+    # Make sure the edit is seen even on filesystems with coarse mtimes
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    rule, reply = table.reply_for("can you send me the link?", author="bob")
+    assert rule.name == "link"
+    assert reply == "Here is the link, bob."
+    # "keywords": "link" must not become single-letter keywords matching almost anything
+    assert table.pick("hello there") is None
+
+
+def test_invalid_rules_at_startup_raise(tmp_path):
+    path = tmp_path / "rules.json"
+    write(path, INVALID["top_level_list"])
+    with pytest.raises(RuleError):
+        RuleTable(str(path))
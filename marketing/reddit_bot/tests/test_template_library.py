@@ -0,0 +1,54 @@
+"""
+Run from the repository root: python -m pytest marketing/reddit_bot/tests
+"""
+import pytest
+
+from marketing.reddit_bot.template_library import TemplateLibrary, parse_content
+
+
+def test_title_on_the_next_line():
+    template = parse_content("t.md", "**Title**:\nMy Title\n\n**Body**:\nHello")
+    assert template.title == "My Title"
+    assert template.body == "Hello"
+
+
+def test_front_matter():
+    template = parse_content("t.md", "---\nsubreddit: excel\n# comment\nurl: \"https://x\"\n---\n"
+                                     "**Title**: Hi {{ url }}\n\n**Body**:\nText")
+    assert template.metadata == {"subreddit": "excel", "url": "https://x"}
+    assert template.render() == ("Hi https://x", "Text")
+
+
+def test_leading_horizontal_rule_is_not_front_matter():
+    template = parse_content("t.md", "---\n**Title**: Hi\n\n**Body**:\nText\n\n---\nFooter")
+    assert template.metadata == {}
+    assert template.title == "Hi"
+    assert template.body == "Text\n\n---\nFooter"
+
+
+def test_unclosed_rule_is_left_untouched():
+    template = parse_content("t.md", "---\n\nJust a tweet: with a colon")
+    assert template.metadata == {}
+    assert template.body == "---\n\nJust a tweet: with a colon"
+
+
+def test_missing_title_keeps_its_error():
+    with pytest.raises(ValueError, match="Title"):
+        parse_content("t.md", "**Body**:\nText")
+
+
+def test_index_from_an_older_parser_is_ignored(tmp_path):
+    path = tmp_path / "t.md"
+    path.write_text("**Title**:\nMy Title\n\n**Body**:\nHello", encoding="utf-8")
+    index_path = tmp_path / "index.json"
+    library = TemplateLibrary(str(index_path))
+    assert library.get(str(path)).title == "My Title"
+    library.save()
+
+    # Simulate an entry written by an older parser
+    library._index[str(path)]["template"]["title"] = "stale"
+    del library._index[str(path)]["parser"]
+    library._dirty = True
+    library.save()
+
+    assert TemplateLibrary(str(index_path)).get(str(path)).title == "My Title"
@@ -0,0 +1,83 @@
+"""
+Run from the repository root: python -m pytest marketing/reddit_bot/tests
+"""
+import pytest
+
+from marketing.reddit_bot.match_store import MatchStore
+from marketing.reddit_bot.trends import (
+    ALERT_COOLDOWN, BUCKET_SECONDS, MIN_BASELINE_HOURS, RING_BUCKETS, WINDOW_HOURS,
+    KeywordSeries, current_trends, update_trends,
+)
+
+NOW = 1_000_000 * BUCKET_SECONDS + 1800
+NOW_BUCKET = 1_000_000
+
+
+def test_ring_wraps_and_clears_skipped_hours():
+    s = KeywordSeries()
+    s.add(10, 3)
+    s.add(11)
+    assert s.recent(11) == 4
+    # A week later every old slot has been cleared
+    assert s.recent(11 + RING_BUCKETS) == 0
+    s.add(11 + RING_BUCKETS)
+    assert sum(s.counts) == 1
+    # Older than the ring reaches back
+    s.add(11)
+    assert sum(s.counts) == 1
+
+
+def test_stats_need_a_baseline():
+    s = KeywordSeries()
+    s.add(NOW_BUCKET)
+    assert s.stats(NOW_BUCKET, NOW_BUCKET - WINDOW_HOURS - MIN_BASELINE_HOURS + 2) is None
+    recent, expected, sd, z = s.stats(NOW_BUCKET, NOW_BUCKET - WINDOW_HOURS - MIN_BASELINE_HOURS + 1)
+    assert (recent, expected) == (1, 0)
+    assert z == pytest.approx(1.0)
+
+
+def add_match(store, n, hours_ago, keywords=("vlookup",), subreddit="excel"):
+    for i in range(n):
+        store.add("posts", subreddit, f"t3_{hours_ago}_{i}_{keywords[0]}", "title", None, list(keywords), "text",
+                  published_at=NOW - hours_ago * BUCKET_SECONDS)
+
+
+@pytest.fixture
+def matches(tmp_path):
+    store = MatchStore(str(tmp_path / "matches.db"))
+    # A quiet keyword: one match every other hour for three days
+    for hours_ago in range(0, 72, 2):
+        add_match(store, 1, hours_ago, ("pivot",))
+        add_match(store, 1, hours_ago + 72, ("vlookup",))
+    store.flush()
+    yield store
+    store.close()
+
+
+def test_spike_is_reported_once(tmp_path, matches):
+    db_path = str(tmp_path / "trends.db")
+    assert update_trends(now=NOW, db_path=db_path, match_store=matches) == []
+
+    add_match(matches, 12, 1, ("vlookup",))
+    matches.flush()
+    [spike] = update_trends(now=NOW, db_path=db_path, match_store=matches)
+    assert (spike["subreddit"], spike["keyword"], spike["recent"]) == ("excel", "vlookup", 12)
+    assert spike["z"] >= 3
+
+    # Nothing new: not counted again, and the alert is on cooldown
+    assert update_trends(now=NOW + 60, db_path=db_path, match_store=matches) == []
+    assert current_trends(now=NOW, db_path=db_path)[0]["recent"] == 12
+
+    # Still spiking after the cooldown
+    later = NOW + ALERT_COOLDOWN
+    add_match(matches, 12, -ALERT_COOLDOWN // BUCKET_SECONDS, ("vlookup",))
+    matches.flush()
+    assert [s["keyword"] for s in update_trends(now=later, db_path=db_path, match_store=matches)] == ["vlookup"]
+
+
+def test_steady_keyword_does_not_spike(tmp_path, matches):
+    db_path = str(tmp_path / "trends.db")
+    update_trends(now=NOW, db_path=db_path, match_store=matches)
+    rows = {row["keyword"]: row for row in current_trends(now=NOW, db_path=db_path)}
+    assert rows["pivot"]["recent"] == WINDOW_HOURS // 2
+    assert rows["pivot"]["z"] < 3
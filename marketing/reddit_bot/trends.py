@@ -0,0 +1,281 @@
+"""
+Keyword trends and spike alerts.
+
+Follows the match store (the stream every monitor writes to) with a cursor, like the
+digest, and counts matches per (subreddit, keyword) in hourly buckets. Each series
+keeps a fixed ring of the last week of buckets, so memory doesn't grow with time and
+adding a match is O(1).
+
+A series spikes when its last WINDOW_HOURS hold significantly more matches than its
+baseline (the rest of the ring) predicts: z = (recent - expected) / sd, with the
+spread taken from the baseline's hourly variance (at least Poisson). Spikes are sent
+to Feishu as a card, like the daily report, at most once per ALERT_COOLDOWN per series.
+
+    python -m marketing.reddit_bot.trends              # update, alert, print the busiest series
+    python -m marketing.reddit_bot.trends --dry-run    # update and print, send nothing
+"""
+import json
+import math
+import time
+from . import config
+from .storage import connect
+
+DB_NAME = "trends.db"
+
+BUCKET_SECONDS = 3600
+# One week of hourly buckets per series
+RING_BUCKETS = 7 * 24
+WINDOW_HOURS = 6
+# Hours of history a series needs before its baseline is trusted.
+MIN_BASELINE_HOURS = 48
+Z_THRESHOLD = 3.0
+# Fewer matches than this in the window is never a spike, whatever the baseline.
+MIN_SPIKE_COUNT = 5
+ALERT_COOLDOWN = 12 * 3600
+# Matches read from the store per query while catching up.
+READ_BATCH = 5000
+
+
+class KeywordSeries:
+    """
+    Hourly match counts of one (subreddit, keyword) in a ring of RING_BUCKETS.
+    """
+
+    def __init__(self, counts=None, last_bucket=None, last_alert=0.0):
+        self.counts = counts or [0] * RING_BUCKETS
+        self.last_bucket = last_bucket
+        self.last_alert = last_alert
+
+    def advance(self, bucket):
+        """
+        Moves the head of the ring to bucket, clearing the slots of the hours in between.
+        """
+        if self.last_bucket is None or bucket <= self.last_bucket:
+            return
+        for b in range(max(self.last_bucket + 1, bucket - RING_BUCKETS + 1), bucket + 1):
+            self.counts[b % RING_BUCKETS] = 0
+        self.last_bucket = bucket
+
+    def add(self, bucket, n=1):
+        if self.last_bucket is None:
+            self.last_bucket = bucket
+        self.advance(bucket)
+        if bucket <= self.last_bucket - RING_BUCKETS:
+            # Older than the ring reaches back
+            return
+        self.counts[bucket % RING_BUCKETS] += n
+
+    def recent(self, now_bucket):
+        self.advance(now_bucket)
+        return sum(self.counts[b % RING_BUCKETS] for b in range(now_bucket - WINDOW_HOURS + 1, now_bucket + 1))
+
+    def stats(self, now_bucket, history_start):
+        """
+        Returns (recent, expected, sd, z) for the last WINDOW_HOURS against the baseline before it,
+        or None while there is less than MIN_BASELINE_HOURS of history (since history_start, the
+        first bucket the monitors are known to have been running).
+        """
+        if self.last_bucket is None:
+            return None
+        self.advance(now_bucket)
+        start = max(history_start, now_bucket - RING_BUCKETS + 1)
+        window_start = now_bucket - WINDOW_HOURS + 1
+        baseline = [self.counts[b % RING_BUCKETS] for b in range(start, window_start)]
+        if len(baseline) < MIN_BASELINE_HOURS:
+            return None
+        recent = sum(self.counts[b % RING_BUCKETS] for b in range(window_start, now_bucket + 1))
+        mean = sum(baseline) / len(baseline)
+        variance = sum((c - mean) ** 2 for c in baseline) / len(baseline)
+        expected = mean * WINDOW_HOURS
+        # Counts are at least Poisson-noisy; +1 keeps a silent baseline from dividing by zero.
+        sd = math.sqrt(max(variance, mean) * WINDOW_HOURS + 1.0)
+        return recent, expected, sd, (recent - expected) / sd
+
+
+class TrendStore:
+    """
+    Persists every series and the match-store cursor in SQLite. Processes updating at the
+    same time are serialized, so no match is counted twice.
+    """
+
+    def __init__(self, db_path=None):
+        db_path = db_path or config.data_path(DB_NAME)
+        self.conn = connect(db_path, isolation_level=None)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS series (
+                subreddit TEXT NOT NULL,
+                keyword TEXT NOT NULL,
+                counts TEXT NOT NULL,
+                last_bucket INTEGER,
+                last_alert REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (subreddit, keyword)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS cursor (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                last_id INTEGER NOT NULL,
+                first_bucket INTEGER NOT NULL
+            );
+        """)
+
+    def load(self):
+        """
+        Returns (series by (subreddit, keyword), last match id counted, first bucket of history).
+        """
+        series = {}
+        for subreddit, keyword, counts, last_bucket, last_alert in self.conn.execute(
+            "SELECT subreddit, keyword, counts, last_bucket, last_alert FROM series"
+        ):
+            series[(subreddit, keyword)] = KeywordSeries(json.loads(counts), last_bucket, last_alert)
+        row = self.conn.execute("SELECT last_id, first_bucket FROM cursor WHERE id = 1").fetchone()
+        return series, (row[0] if row else 0), (row[1] if row else None)
+
+    def save(self, series, last_id, first_bucket):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO series (subreddit, keyword, counts, last_bucket, last_alert) VALUES (?, ?, ?, ?, ?)",
+            [(sub, kw, json.dumps(s.counts), s.last_bucket, s.last_alert) for (sub, kw), s in series.items()],
+        )
+        self.conn.execute("INSERT OR REPLACE INTO cursor (id, last_id, first_bucket) VALUES (1, ?, ?)",
+                          (last_id, first_bucket))
+
+    def close(self):
+        self.conn.close()
+
+
+def _bucket(timestamp):
+    return int(timestamp // BUCKET_SECONDS)
+
+
+def update_trends(now=None, db_path=None, match_store=None):
+    """
+    Counts every match stored since the last update and returns the series that spike now,
+    as dicts (subreddit, keyword, recent, expected, sd, z), most significant first.
+    A spike is only returned once per ALERT_COOLDOWN per series.
+    """
+    from .match_store import MatchStore
+
+    now = time.time() if now is None else now
+    now_bucket = _bucket(now)
+    store = TrendStore(db_path)
+    matches = match_store or MatchStore()
+    spikes = []
+    try:
+        store.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # On the first run the whole store is read; matches older than the ring are skipped.
+            series, last_id, first_bucket = store.load()
+            first_bucket = now_bucket if first_bucket is None else first_bucket
+            counted = 0
+            while True:
+                batch = matches.since_id(last_id, limit=READ_BATCH)
+                if not batch:
+                    break
+                for match in batch:
+                    bucket = _bucket(match["published_at"] or match["matched_at"])
+                    first_bucket = min(first_bucket, bucket)
+                    for keyword in match["keywords"].split(","):
+                        if keyword:
+                            series.setdefault((match["subreddit"], keyword), KeywordSeries()).add(bucket)
+                counted += len(batch)
+                last_id = batch[-1]["id"]
+
+            for (subreddit, keyword), s in series.items():
+                stats = s.stats(now_bucket, first_bucket)
+                if stats is None:
+                    continue
+                recent, expected, sd, z = stats
+                if z >= Z_THRESHOLD and recent >= MIN_SPIKE_COUNT and now - s.last_alert >= ALERT_COOLDOWN:
+                    s.last_alert = now
+                    spikes.append({"subreddit": subreddit, "keyword": keyword, "recent": recent,
+                                   "expected": expected, "sd": sd, "z": z})
+            store.save(series, last_id, first_bucket)
+        except BaseException:
+            store.conn.execute("ROLLBACK")
+            raise
+        store.conn.execute("COMMIT")
+    finally:
+        store.close()
+        if match_store is None:
+            matches.close()
+    print(f"Trends: {counted} new matches counted, {len(spikes)} spike(s).")
+    spikes.sort(key=lambda spike: -spike["z"])
+    return spikes
+
+
+def current_trends(now=None, db_path=None, top=10):
+    """
+    Returns the busiest series of the last WINDOW_HOURS with their stats, without updating anything.
+    """
+    now_bucket = _bucket(time.time() if now is None else now)
+    store = TrendStore(db_path)
+    try:
+        series, _, first_bucket = store.load()
+    finally:
+        store.close()
+    rows = []
+    for (subreddit, keyword), s in series.items():
+        stats = s.stats(now_bucket, first_bucket) or (s.recent(now_bucket), None, None, None)
+        if stats[0]:
+            rows.append(dict(zip(("subreddit", "keyword", "recent", "expected", "sd", "z"), (subreddit, keyword) + stats)))
+    rows.sort(key=lambda row: -row["recent"])
+    return rows[:top]
+
+
+def format_spike(spike):
+    return (f"r/{spike['subreddit']} · \"{spike['keyword']}\": {spike['recent']} matches in the last {WINDOW_HOURS}h, "
+            f"usually {spike['expected']:.1f} ± {spike['sd']:.1f} (z = {spike['z']:.1f})")
+
+
+def build_spike_card(spikes):
+    from .report_tasks import build_card
+
+    return build_card("📈 Reddit Keyword Spike", [
+        {
+            "tag": "div",
+            "text": {
+                "tag": "lark_md",
+                "content": "\n".join(f"**{format_spike(spike)}**" for spike in spikes)
+            }
+        },
+        {
+            "tag": "note",
+            "elements": [
+                {
+                    "tag": "plain_text",
+                    "content": f"Compared with the last {RING_BUCKETS // 24} days, hourly buckets. "
+                               f"Search them: python -m marketing.reddit_bot search -k <keyword> -s <subreddit>"
+                }
+            ]
+        }
+    ], template="orange")
+
+
+def check_trends(dry_run=False):
+    """
+    Updates the trends and sends one Feishu card for any new spikes. Returns the spikes.
+    """
+    spikes = update_trends()
+    for spike in spikes:
+        print(f"[SPIKE] {format_spike(spike)}")
+    if spikes and not dry_run:
+        if not config.FEISHU_WEBHOOK_URL:
+            print("Spike alert not sent: FEISHU_WEBHOOK_URL not configured in .env")
+        else:
+            from .notifier import get_notifier
+            get_notifier().send(build_spike_card(spikes))
+    return spikes
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Update keyword trends from the match store and alert on spikes.")
+    parser.add_argument("--dry-run", action="store_true", help="Print spikes instead of sending them")
+    parser.add_argument("--top", type=int, default=10, help="Busiest series to print")
+    args = parser.parse_args()
+
+    check_trends(dry_run=args.dry_run)
+    rows = current_trends(top=args.top)
+    if rows:
+        print(f"\nBusiest keywords, last {WINDOW_HOURS}h:")
+    for row in rows:
+        baseline = f"usually {row['expected']:.1f}, z = {row['z']:.1f}" if row["z"] is not None else "no baseline yet"
+        print(f"  r/{row['subreddit']} · {row['keyword']}: {row['recent']} ({baseline})")